@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+@requires: numpy
+
+@summary: This module permits to reduce the samples of multi_logger by
+          blocks, writing min/max/mean/std/count/last of each column instead
+          of every sample
+
+@pep8 : Complains without rules R0902
+"""
+
+import warnings
+
+import numpy
+
+
+# Statistics of each column, in the order of the columns of an aggregate
+STATISTICS = ("min", "max", "mean", "std", "count", "last")
+
+
+class Aggregator(object):
+
+    """
+        Reduce blocks of samples. A block ends after block_size samples, or
+        when a sample comes block_time seconds (or more) after the first
+        sample of the block.
+        Each block gives one row : the time of its last sample, then for each
+        column its min, max, mean, std, count and last value. Values which
+        are not numbers (None, strings ...) are not counted, and a column
+        without any value in a block gets NaN statistics.
+        Samples are copied in a preallocated block, and statistics are
+        computed on whole columns at once.
+    """
+
+    def __init__(self, headers, block_size=None, block_time=None):
+        """
+            - headers : Column names, the first one being the time
+            - block_size (optional) : Number of samples of a block
+            - block_time (optional) : Duration of a block, in seconds
+        """
+        if block_size is None and block_time is None:
+            raise ValueError("Aggregation needs a block size or a block time")
+
+        if block_size is not None and block_size < 1:
+            raise ValueError("Block size must be at least 1")
+
+        self.columns = list(headers[1:])
+        self.block_size = block_size
+        self.block_time = block_time
+        self.headers = [headers[0]] + [column + "_" + statistic
+                                       for column in self.columns
+                                       for statistic in STATISTICS]
+        self.blocks = 0
+
+        capacity = block_size if block_size is not None else 64
+        self._block = numpy.empty((capacity, len(self.columns)))
+        self._size = 0
+        self._t_start = None
+        self._t_last = None
+
+    def _append(self, values):
+        """Copy a sample in the block, growing it if needed."""
+        if self._size == self._block.shape[0]:
+            self._block = numpy.concatenate((self._block,
+                                             numpy.empty_like(self._block)))
+
+        try:
+            self._block[self._size] = values[1:]
+        except (TypeError, ValueError):
+            row = self._block[self._size]
+            for index, value in enumerate(values[1:]):
+                try:
+                    row[index] = value
+                except (TypeError, ValueError):
+                    row[index] = numpy.nan
+
+        if self._size == 0:
+            self._t_start = values[0]
+
+        self._t_last = values[0]
+        self._size += 1
+
+    def _reduce(self):
+        """Return the row of the current block, and empty it."""
+        block = self._block[:self._size]
+        numbers = ~numpy.isnan(block)
+        counts = numbers.sum(axis=0)
+
+        # Last value which is a number of each column (the first one of the
+        # reversed block)
+        last_rows = self._size - 1 - numpy.argmax(numbers[::-1], axis=0)
+        lasts = block[last_rows, numpy.arange(block.shape[1])]
+
+        # Columns without values give NaN, without warnings
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            statistics = (numpy.nanmin(block, axis=0),
+                          numpy.nanmax(block, axis=0),
+                          numpy.nanmean(block, axis=0),
+                          numpy.nanstd(block, axis=0), counts, lasts)
+
+        row = [self._t_last]
+        for column_statistics in zip(*[statistic.tolist()
+                                       for statistic in statistics]):
+            row.extend(column_statistics)
+
+        self._size = 0
+        self.blocks += 1
+
+        return row
+
+    def add(self, values):
+        """
+            Add a sample (time first). Return the row of the block it
+            ends, or None.
+        """
+        row = None
+
+        if self.block_time is not None and self._size > 0 and \
+                values[0] - self._t_start >= self.block_time:
+            row = self._reduce()
+
+        self._append(values)
+
+        if row is None and self.block_size is not None and \
+                self._size >= self.block_size:
+            row = self._reduce()
+
+        return row
+
+    def flush(self):
+        """Return the row of the samples of the unfinished block, or None if
+        there is none."""
+        if self._size == 0:
+            return None
+
+        return self._reduce()
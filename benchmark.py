@@ -0,0 +1,242 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+@requires: numpy for the "aggregate" and "history" modes
+
+@summary: This module measures the performance of multi_logger with
+          simulated sources (see simulated_sources.py), without robot and
+          without PicoLog devices : achievable sampling rate, CPU time per
+          sample and memory growth, for several numbers of ALMemory keys and
+          several output modes.
+          Samples are taken as fast as possible (log1Line in a loop), so the
+          rate is the maximum sustainable rate of the logger.
+
+          Example : python benchmark.py --keys 10 100 1000 --duration 2
+
+@platform : Windows, Linux, OS X
+
+@pep8 : Complains without rules R0914
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+from collections import OrderedDict
+
+import simulated_sources
+
+simulated_sources.install()
+
+import multi_logger
+
+
+DEFAULT_KEYS = (10, 100, 1000)
+DEFAULT_DURATION = 2.0
+WARM_UP_SAMPLES = 10
+
+# Logger arguments of each output mode. FILE is replaced by a file of the
+# temporary directory.
+FILE = object()
+OUTPUT_MODES = OrderedDict([
+    ("none", {"output": None}),
+    ("text", {"output": FILE}),
+    ("binary", {"output": FILE, "output_format": "binary"}),
+    ("gzip", {"output": FILE, "compression": "gzip"}),
+    ("change_only", {"output": FILE, "change_only": True}),
+    ("aggregate", {"output": FILE, "aggregate_samples": 100}),
+    ("concurrent", {"output": FILE, "acquisition": "concurrent"}),
+    ("history", {"output": None, "class_getter": True})])
+
+
+def write_config(path, nb_keys):
+    """Write a configuration file with nb_keys ALMemory keys, CPU load, 4
+    TC08 channels and 2 ADC24 channels."""
+    with open(path, "w") as config_file:
+        config_file.write("[ALMemory]\n")
+        for index in range(nb_keys):
+            config_file.write("Key%d : Device/Simulated/Key%d/Value\n"
+                              % (index, index))
+
+        config_file.write("\n[CPULoad]\nUser : User\nSystem : System\n")
+
+        config_file.write("\n[TC08]\n")
+        for channel in range(1, 5):
+            config_file.write("T%d : %d K\n" % (channel, channel))
+
+        config_file.write("\n[ADC24]\n")
+        for channel in range(1, 3):
+            config_file.write("I%d : %d HRDL_1250_MV single-ended\n"
+                              % (channel, channel))
+
+
+def memory_usage():
+    """Return the resident memory of the process, in bytes (the peak
+    resident memory if /proc is not available)."""
+    try:
+        with open("/proc/self/statm") as statm:
+            pages = int(statm.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE")
+    except (IOError, OSError, ValueError, AttributeError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def cpu_time():
+    """Return the CPU time (user and system) of the process, every thread
+    included, in seconds."""
+    times = os.times()
+    return times[0] + times[1]
+
+
+class _Quiet(object):
+
+    """Context hiding what is printed on stdout (initialisation messages)."""
+
+    def __enter__(self):
+        self.stdout = sys.stdout
+        sys.stdout = open(os.devnull, "w")
+
+    def __exit__(self, *args):
+        sys.stdout.close()
+        sys.stdout = self.stdout
+
+
+def run_case(nb_keys, mode, duration, directory):
+    """
+        Sample as fast as possible during duration seconds, and return a
+        dictionnary of results :
+        - keys, mode : The case
+        - samples : Number of samples taken
+        - rate : Samples per second
+        - cpu_per_sample : CPU time per sample, in seconds (writer thread
+          included)
+        - memory_growth : Growth of the resident memory, in bytes
+        - backlog : Lines waiting to be written at the end of sampling
+    """
+    config_path = os.path.join(directory, "benchmark_%d.cfg" % nb_keys)
+    write_config(config_path, nb_keys)
+
+    options = dict(OUTPUT_MODES[mode])
+    if options["output"] is FILE:
+        options["output"] = os.path.join(directory,
+                                         "benchmark_%d_%s.log" % (nb_keys,
+                                                                  mode))
+
+    with _Quiet():
+        logger = multi_logger.Logger("127.0.0.1", config_path,
+                                     sample_period=0.01, **options)
+
+    for _ in range(WARM_UP_SAMPLES):
+        logger.log1Line()
+
+    memory_start = memory_usage()
+    cpu_start = cpu_time()
+    t_start = time.time()
+    samples = 0
+
+    while time.time() - t_start < duration:
+        logger.log1Line()
+        samples += 1
+
+    elapsed_time = time.time() - t_start
+    cpu_used = cpu_time() - cpu_start
+    memory_growth = memory_usage() - memory_start
+
+    backlog = 0
+    if logger.writer is not None:
+        backlog = logger.writer.backlog
+
+    with _Quiet():
+        logger.stop()
+
+    return OrderedDict([("keys", nb_keys),
+                        ("mode", mode),
+                        ("samples", samples),
+                        ("rate", samples / elapsed_time),
+                        ("cpu_per_sample", cpu_used / max(samples, 1)),
+                        ("memory_growth", memory_growth),
+                        ("backlog", backlog)])
+
+
+def print_result(result):
+    """Print a line of the results table."""
+    print "%6d  %-12s %10.1f %14.1f %14.1f %9d" % (
+        result["keys"], result["mode"], result["rate"],
+        result["cpu_per_sample"] * 1e6, result["memory_growth"] / 1024.0,
+        result["backlog"])
+
+
+def main():
+    """Run the benchmark for every number of keys and every output mode."""
+    parser = argparse.ArgumentParser(
+        description="Benchmark multi_logger with simulated sources")
+
+    parser.add_argument("-k", "--keys", dest="keys", type=int, nargs="+",
+                        default=list(DEFAULT_KEYS),
+                        help="numbers of ALMemory keys (default: 10 100\
+                        1000)")
+
+    parser.add_argument("-m", "--modes", dest="modes", nargs="+",
+                        choices=list(OUTPUT_MODES.keys()),
+                        default=list(OUTPUT_MODES.keys()),
+                        help="output modes (default: all)")
+
+    parser.add_argument("-d", "--duration", dest="duration", type=float,
+                        default=DEFAULT_DURATION,
+                        help="duration of each case, in seconds\
+                        (default: 2 sec)")
+
+    parser.add_argument("-l", "--latency", dest="latency", nargs=3,
+                        action="append", default=[],
+                        metavar=("SOURCE", "LATENCY", "JITTER"),
+                        help="latency and jitter of the calls to a simulated\
+                        source, in seconds (default: 0)")
+
+    parser.add_argument("-s", "--seed", dest="seed", type=int, default=None,
+                        help="seed of the random jitter of the simulated\
+                        sources, to get the same latencies at each run")
+
+    parser.add_argument("--json", dest="json", const=True,
+                        action="store_const", default=False,
+                        help="print one JSON line per case instead of a\
+                        table")
+
+    args = parser.parse_args()
+
+    simulated_sources.seed(args.seed)
+    for source, latency, jitter in args.latency:
+        simulated_sources.set_latency(source, float(latency), float(jitter))
+
+    # probs_config.cfg is read from the current directory
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+    directory = tempfile.mkdtemp(prefix="multi_logger_benchmark_")
+    try:
+        if not args.json:
+            print "  keys  mode               Hz  CPU/sample us      memory kB" \
+                "   backlog"
+
+        for nb_keys in args.keys:
+            for mode in args.modes:
+                try:
+                    result = run_case(nb_keys, mode, args.duration, directory)
+                except ImportError as error:
+                    print "benchmark.py WARNING : " + mode + \
+                        " mode skipped : " + str(error)
+                    continue
+
+                if args.json:
+                    print json.dumps(result)
+                else:
+                    print_result(result)
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
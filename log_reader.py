@@ -0,0 +1,426 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+@requires: numpy
+
+@summary: This module permits to read log files written by multi_logger,
+          and its network output. Text logs are read by time range and by
+          chunks, without loading the whole file.
+
+@pep8 : Complains without rules R0902 and R0913
+"""
+
+import os
+import json
+import struct
+import socket
+import bisect
+
+import numpy
+
+import log_writer
+import log_stream
+
+
+# Number of lines parsed at once by TextLog.chunks. The first chunks are
+# smaller, so a short time range is read without parsing many lines.
+DEFAULT_CHUNK_SIZE = 100000
+FIRST_CHUNK_SIZE = 1000
+
+# Without index, TextLog seeks to a time by bisection on the file, until the
+# remaining part is smaller than this size (in bytes), read line by line
+BISECTION_SIZE = 65536
+
+
+def _to_float(text):
+    """Return the value of a field of a text log, NaN if it is empty or not
+    a number."""
+    try:
+        return float(text)
+    except ValueError:
+        return numpy.nan
+
+
+class BinaryLog(object):
+
+    """
+        Binary log file written by multi_logger with output_format="binary".
+        The records are memory mapped, nothing is copied : data is a
+        (samples, columns) float64 array, and log[column] is a view on one
+        column.
+    """
+
+    def __init__(self, path):
+        """
+            - path : Path of the binary log file
+        """
+        self.path = path
+
+        with open(path, "rb") as log_file:
+            magic = log_file.read(len(log_writer.BINARY_MAGIC))
+            if magic != log_writer.BINARY_MAGIC:
+                raise ValueError(path + " is not a binary multi_logger file")
+
+            (header_size,) = struct.unpack("<I", log_file.read(4))
+            header = json.loads(log_file.read(header_size))
+
+        self.columns = [str(column) for column in header["columns"]]
+        self.offset = len(log_writer.BINARY_MAGIC) + 4 + header_size
+
+        dtype = numpy.dtype(str(header["dtype"]))
+        record_size = dtype.itemsize * len(self.columns)
+
+        # A record being written when logging stopped is ignored
+        nb_records = (os.path.getsize(path) - self.offset) // record_size
+
+        if nb_records > 0:
+            self.data = numpy.memmap(path, dtype=dtype, mode="r",
+                                     offset=self.offset,
+                                     shape=(nb_records, len(self.columns)))
+        else:
+            self.data = numpy.zeros((0, len(self.columns)), dtype=dtype)
+
+    def __len__(self):
+        """Number of samples."""
+        return self.data.shape[0]
+
+    def __getitem__(self, column):
+        """Return the view on the values of a column."""
+        return self.data[:, self.columns.index(column)]
+
+    def to_dict(self):
+        """Return a dictionnary of views, one per column."""
+        return dict((column, self.data[:, index])
+                    for index, column in enumerate(self.columns))
+
+    def read_range(self, t_start=None, t_end=None, columns=None):
+        """
+            Return a dictionnary of views on the samples whose time is
+            between t_start and t_end (included), one per column.
+            - t_start, t_end (optional) : Bounds of the range (default: the
+              beginning and the end of the log)
+            - columns (optional) : Names of the columns (default: all)
+        """
+        times = self.data[:, self.columns.index("Time")]
+        first = 0
+        last = len(times)
+        if t_start is not None:
+            first = numpy.searchsorted(times, t_start, side="left")
+        if t_end is not None:
+            last = numpy.searchsorted(times, t_end, side="right")
+
+        if columns is None:
+            columns = self.columns
+
+        return dict((column, self.data[first:last, self.columns.index(column)])
+                    for column in columns)
+
+
+class TextLog(object):
+
+    """
+        Text log file written by multi_logger (not compressed), read by time
+        range and by chunks of lines, so only the selected part of the file
+        is read and only the selected columns are converted.
+        The time of a sample is found with the index written by multi_logger
+        with --index (<path>.idx, see log_writer.INDEX_EXTENSION), or by
+        bisection on the file without index : both need the times to
+        increase, which is the case in a file written by multi_logger.
+        Values which are empty or not numbers are NaN. A last line being
+        written is ignored.
+    """
+
+    def __init__(self, path):
+        """
+            - path : Path of the text log file
+        """
+        self.path = path
+
+        with open(path, "rb") as log_file:
+            header = log_file.readline()
+            self.offset = log_file.tell()
+
+        if header.startswith(log_writer.BINARY_MAGIC):
+            raise ValueError(path + " is a binary log, use BinaryLog")
+
+        self.columns = [column.strip() for column
+                        in header.rstrip("\r\n").split(",")]
+        self.index = self._read_index(path + log_writer.INDEX_EXTENSION)
+
+    def _read_index(self, index_path):
+        """Return the (times, offsets) lists of the index, or None if there
+        is no index."""
+        if not os.path.exists(index_path):
+            return None
+
+        size = os.path.getsize(self.path)
+        times = []
+        offsets = []
+        with open(index_path, "rb") as index_file:
+            index_file.readline()
+            for line in index_file:
+                if not line.endswith("\n"):
+                    break
+
+                (line_time, offset) = line.split(",")
+                # Entries of lines not written yet are ignored
+                if int(offset) >= size:
+                    break
+
+                times.append(float(line_time))
+                offsets.append(int(offset))
+
+        return (times, offsets)
+
+    def _column_index(self, column):
+        """Return the index of a column, or raise KeyError."""
+        try:
+            return self.columns.index(column)
+        except ValueError:
+            raise KeyError("Unknown column \"" + str(column) + "\" in " +
+                           self.path)
+
+    @staticmethod
+    def _line_time(line):
+        """Return the time of a line, or None if it is not a full line."""
+        if not line.endswith("\n"):
+            return None
+
+        try:
+            return float(line[:line.find(",")])
+        except ValueError:
+            return None
+
+    def _line_after(self, log_file, offset):
+        """Return (time, offset) of the first line beginning at offset or
+        after, or (None, None) if there is none."""
+        log_file.seek(offset - 1)
+        log_file.readline()
+
+        while True:
+            line_offset = log_file.tell()
+            line = log_file.readline()
+            if not line.endswith("\n"):
+                return (None, None)
+
+            line_time = self._line_time(line)
+            if line_time is not None:
+                return (line_time, line_offset)
+
+    def _seek(self, log_file, t_start):
+        """Move log_file to the first line whose time is t_start or
+        later."""
+        start = self.offset
+        if t_start is None:
+            log_file.seek(start)
+            return
+
+        if self.index is not None:
+            (times, offsets) = self.index
+            position = bisect.bisect_right(times, t_start) - 1
+            if position >= 0:
+                start = offsets[position]
+        else:
+            # The line at start is before t_start, the line at or after
+            # end is not
+            end = os.path.getsize(self.path)
+            while end - start > BISECTION_SIZE:
+                middle = (start + end) // 2
+                (line_time, line_offset) = self._line_after(log_file, middle)
+                if line_time is None or line_time >= t_start:
+                    end = middle
+                else:
+                    start = line_offset
+
+        log_file.seek(start)
+        while True:
+            line_offset = log_file.tell()
+            line = log_file.readline()
+            line_time = self._line_time(line)
+            if line_time is None or line_time >= t_start:
+                log_file.seek(line_offset)
+                return
+
+    def _parse(self, lines, indexes):
+        """Return the (lines, columns) array of the columns at indexes."""
+        # Numbers and empty values are parsed by numpy at once. Other values
+        # stop the parsing, and each value is converted.
+        text = "".join(lines).replace(",\n", ",nan\n")
+        text = text.replace(",,", ",nan,").replace(",,", ",nan,")
+        values = numpy.fromstring(text.replace("\n", ","), sep=",")
+        if values.size == len(lines) * len(self.columns):
+            return values.reshape((len(lines), len(self.columns)))[:, indexes]
+
+        fields = [line.split(",") for line in lines]
+        try:
+            return numpy.array([[row[index] for index in indexes]
+                                for row in fields], dtype=float)
+        except ValueError:
+            return numpy.array([[_to_float(row[index]) for index in indexes]
+                                for row in fields], dtype=float)
+
+    def chunks(self, t_start=None, t_end=None, columns=None,
+               chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+            Yield the samples whose time is between t_start and t_end
+            (included), by chunks of at most chunk_size samples : one
+            dictionnary of arrays per chunk, one array per column. Only
+            the chunk being read is in memory.
+            - t_start, t_end (optional) : Bounds of the range (default: the
+              beginning and the end of the log)
+            - columns (optional) : Names of the columns (default: all)
+            - chunk_size (optional) : Maximum number of samples of a chunk
+        """
+        if columns is None:
+            columns = self.columns
+
+        # The time is always parsed, to find the end of the range
+        indexes = [0] + [self._column_index(column) for column in columns]
+
+        with open(self.path, "rb") as log_file:
+            self._seek(log_file, t_start)
+
+            size = min(FIRST_CHUNK_SIZE, chunk_size)
+            finished = False
+            while not finished:
+                lines = []
+                for line in log_file:
+                    if not line.endswith("\n"):
+                        break
+
+                    lines.append(line)
+                    if len(lines) >= size:
+                        break
+
+                if len(lines) < size:
+                    finished = True
+                size = min(2 * size, chunk_size)
+                if not lines:
+                    return
+
+                data = self._parse(lines, indexes)
+                if t_end is not None:
+                    last = numpy.searchsorted(data[:, 0], t_end, side="right")
+                    if last < data.shape[0]:
+                        data = data[:last]
+                        finished = True
+
+                if data.shape[0] > 0:
+                    yield dict((column, data[:, index + 1])
+                               for index, column in enumerate(columns))
+
+    def read_range(self, t_start=None, t_end=None, columns=None):
+        """
+            Return a dictionnary of arrays with the samples whose time is
+            between t_start and t_end (included), one array per column.
+            - t_start, t_end (optional) : Bounds of the range (default: the
+              beginning and the end of the log)
+            - columns (optional) : Names of the columns (default: all)
+        """
+        if columns is None:
+            columns = self.columns
+
+        chunks = list(self.chunks(t_start, t_end, columns))
+        if not chunks:
+            return dict((column, numpy.zeros(0)) for column in columns)
+
+        return dict((column, numpy.concatenate([chunk[column]
+                                                for chunk in chunks]))
+                    for column in columns)
+
+
+class StreamReader(object):
+
+    """
+        Client of the network output of multi_logger (see log_stream).
+        Each read returns the samples of the next frame as a (samples,
+        columns) float64 array. columns is updated when the logger changes
+        its columns.
+    """
+
+    def __init__(self, address, timeout=None):
+        """
+            - address : tcp://HOST:PORT or unix:///PATH of the logger
+            - timeout (optional) : Maximum time waited for data, in seconds
+              (forever if None)
+        """
+        (family, socket_address) = log_stream.parse_address(address)
+
+        self.address = address
+        self.columns = None
+        self.dtype = None
+        self.received = 0
+
+        self._socket = socket.socket(family, socket.SOCK_STREAM)
+        self._socket.settimeout(timeout)
+        self._socket.connect(socket_address)
+
+    def _receive(self, size):
+        """Return size bytes, or None if the logger closed the stream."""
+        chunks = []
+        while size > 0:
+            chunk = self._socket.recv(size)
+            if not chunk:
+                return None
+
+            chunks.append(chunk)
+            size -= len(chunk)
+
+        return "".join(chunks)
+
+    def _set_schema(self, header):
+        """Read the columns from a binary log header."""
+        if not header.startswith(log_writer.BINARY_MAGIC):
+            raise ValueError(self.address + " is not a multi_logger stream")
+
+        offset = len(log_writer.BINARY_MAGIC)
+        (header_size,) = struct.unpack("<I", header[offset:offset + 4])
+        schema = json.loads(header[offset + 4:offset + 4 + header_size])
+
+        self.columns = [str(column) for column in schema["columns"]]
+        self.dtype = numpy.dtype(str(schema["dtype"]))
+
+    def read(self):
+        """
+            Return the samples of the next frame, as a (samples, columns)
+            array, or None when the logger stopped. Raise socket.timeout if
+            nothing came in time.
+        """
+        while True:
+            frame_header = self._receive(log_stream.FRAME_HEADER.size)
+            if frame_header is None:
+                return None
+
+            (frame_type, size) = log_stream.FRAME_HEADER.unpack(frame_header)
+            payload = self._receive(size)
+            if payload is None:
+                return None
+
+            if frame_type == log_stream.STREAM_SCHEMA:
+                self._set_schema(payload)
+                continue
+
+            rows = numpy.frombuffer(payload, dtype=self.dtype)
+            rows = rows.reshape((-1, len(self.columns)))
+            self.received += rows.shape[0]
+
+            return rows
+
+    def __iter__(self):
+        """Yield the arrays of samples until the logger stops."""
+        while True:
+            rows = self.read()
+            if rows is None:
+                return
+
+            yield rows
+
+    def to_dict(self, rows):
+        """Return a dictionnary of views on the columns of rows."""
+        return dict((column, rows[:, index])
+                    for index, column in enumerate(self.columns))
+
+    def close(self):
+        """Close the connection."""
+        self._socket.close()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+@requires: numpy
+
+@summary: This module permits to replay a log file written by multi_logger
+          (text or binary) as if it was sampled again : multi_logger with
+          --replay gives its samples to the real time plot, the history of
+          class_getter and the output, at the time of the file, faster, or
+          as fast as possible. The file is read by chunks, never loaded at
+          once.
+          As fast as possible, the replay measures the throughput of every
+          stage after the acquisition (see multi_logger.Logger.stats).
+          Values are read as floats : integers come back as floats, and
+          values which are not numbers (None, text) as None.
+
+          Example : python multi_logger.py --replay capture.csv --speed 50
+                    --plot
+
+@pep8 : Complains without rules R0902 and R0913
+"""
+
+import time
+import threading
+
+import numpy
+
+import log_writer
+import log_reader
+
+
+# Speed of the replay : 1 is the time of the file, 50 is 50 times faster, 0
+# is as fast as possible
+DEFAULT_REPLAY_SPEED = 1.0
+
+# Maximum number of samples read from the file at once
+REPLAY_CHUNK_SIZE = 10000
+
+
+def open_log(path):
+    """Return the log_reader.BinaryLog or log_reader.TextLog of a log
+    file. Raise ValueError if it is not a log file of multi_logger."""
+    with open(path, "rb") as log_file:
+        binary = log_file.read(len(log_writer.BINARY_MAGIC)) == \
+            log_writer.BINARY_MAGIC
+
+    if binary:
+        return log_reader.BinaryLog(path)
+
+    return log_reader.TextLog(path)
+
+
+def _rows(data):
+    """Return the list of rows of a (samples, columns) array, NaN values
+    being None (empty values of the file)."""
+    rows = data.tolist()
+    if not numpy.isnan(data).any():
+        return rows
+
+    return [[None if value != value else value for value in row]
+            for row in rows]
+
+
+class ReplaySource(object):
+
+    """
+        Samples of a log file, given one by one at the pace of the replay.
+        Each sample is (time, values), values being in the order of the
+        columns of the file after "Time". Empty values (NaN in binary) are
+        None.
+    """
+
+    def __init__(self, path, speed=DEFAULT_REPLAY_SPEED, clock=time.time,
+                 chunk_size=REPLAY_CHUNK_SIZE):
+        """
+            Raise IOError if the file cannot be read, ValueError if it is not
+            a log file of multi_logger.
+            - path : Path of the log file
+            - speed (optional) : Speed of the replay (see
+              DEFAULT_REPLAY_SPEED)
+            - clock (optional) : Clock giving the pace of the replay
+            - chunk_size (optional) : Maximum number of samples read at once
+        """
+        if speed < 0:
+            raise ValueError("Replay speed must be positive or 0")
+
+        self.path = path
+        self.log = open_log(path)
+        self.columns = list(self.log.columns)
+        if not self.columns or self.columns[0] != "Time":
+            raise ValueError(path + " has no \"Time\" first column")
+
+        self.speed = speed
+        self.clock = clock
+        self.chunk_size = chunk_size
+
+        self.rows = 0
+        self.max_lateness = 0.0
+        self.finished = False
+        self.t_start = None
+        self.t_end = None
+
+        self._origin = None
+        self._stopped = threading.Event()
+        self._chunks = self._read_chunks()
+        self._chunk = []
+        self._position = 0
+
+    def _read_chunks(self):
+        """Yield the lists of rows of the file, chunk by chunk."""
+        if isinstance(self.log, log_reader.BinaryLog):
+            for first in xrange(0, len(self.log), self.chunk_size):
+                yield _rows(numpy.asarray(
+                    self.log.data[first:first + self.chunk_size],
+                    dtype=float))
+            return
+
+        for chunk in self.log.chunks(chunk_size=self.chunk_size):
+            yield _rows(numpy.column_stack([chunk[column]
+                                            for column in self.columns]))
+
+    def next_row(self):
+        """Return the next sample (time, values), or None at the end of the
+        file."""
+        while self._position >= len(self._chunk):
+            self._chunk = next(self._chunks, None)
+            self._position = 0
+            if self._chunk is None:
+                self._chunk = []
+                if not self.finished:
+                    self.finished = True
+                    self.t_end = self.clock()
+                return None
+
+        row = self._chunk[self._position]
+        self._position += 1
+        self.rows += 1
+        if self.t_start is None:
+            self.t_start = self.clock()
+
+        return (row[0], row[1:])
+
+    def __iter__(self):
+        """Iterate on the samples, until the end of the file."""
+        return iter(self.next_row, None)
+
+    def wait(self, row_time):
+        """
+            Wait until the time of a sample in the replay, the first sample
+            being replayed now. Return False if the replay is stopped.
+        """
+        if self._stopped.is_set():
+            return False
+
+        if self.speed == 0 or row_time is None:
+            return True
+
+        now = self.clock()
+        if self._origin is None:
+            self._origin = (row_time, now)
+
+        due = self._origin[1] + (row_time - self._origin[0]) / self.speed
+        if due > now:
+            return not self._stopped.wait(due - now)
+
+        self.max_lateness = max(self.max_lateness, now - due)
+        return True
+
+    @property
+    def rate(self):
+        """Number of samples replayed per second, from the first one to the
+        end of the file (or now)."""
+        if self.t_start is None:
+            return 0.0
+
+        t_end = self.clock() if self.t_end is None else self.t_end
+        elapsed_time = t_end - self.t_start
+        return self.rows / elapsed_time if elapsed_time > 0 else 0.0
+
+    def stop(self):
+        """Stop the replay : wait returns False from now."""
+        self._stopped.set()
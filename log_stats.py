@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+@summary: This module permits to measure multi_logger itself : latency
+          histograms of the sources and of the ticks, and the statistics
+          line printed while logging
+
+@pep8 : Complains without rules R0902
+"""
+
+import bisect
+
+
+# Upper bounds of the buckets of a histogram, in seconds : 10 us, 20 us, 40 us
+# ... up to about 10 s. Longer values go to a last bucket.
+HISTOGRAM_EDGES = tuple(1e-5 * 2 ** power for power in range(21))
+
+# Percentiles given by Histogram.summary
+PERCENTILES = (50, 90, 99)
+
+
+class Histogram(object):
+
+    """
+        Histogram of durations, on buckets of exponential width (see
+        HISTOGRAM_EDGES). Adding a value costs one bisection, so every call
+        and every tick can be measured.
+        Percentiles are upper bounds : the upper bound of the bucket where the
+        percentile falls (the maximum for the last bucket).
+    """
+
+    def __init__(self, edges=HISTOGRAM_EDGES):
+        """
+            - edges (optional) : Upper bounds of the buckets, increasing
+        """
+        self.edges = edges
+        self.counts = [0] * (len(edges) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.minimum = None
+        self.maximum = None
+
+    def add(self, value):
+        """Add a duration, in seconds."""
+        self.counts[bisect.bisect_left(self.edges, value)] += 1
+        self.count += 1
+        self.total += value
+
+        if self.minimum is None or value < self.minimum:
+            self.minimum = value
+
+        if self.maximum is None or value > self.maximum:
+            self.maximum = value
+
+    def percentile(self, percent):
+        """Return the upper bound of the <percent> percentile, or None if
+        the histogram is empty."""
+        if self.count == 0:
+            return None
+
+        rank = self.count * percent / 100.0
+        cumulated = 0
+        for index, count in enumerate(self.counts):
+            cumulated += count
+            if cumulated >= rank and count > 0:
+                if index < len(self.edges):
+                    return min(self.edges[index], self.maximum)
+
+                return self.maximum
+
+        return self.maximum
+
+    def buckets(self):
+        """Return the list of (upper bound, count) of the buckets which are
+        not empty. The upper bound of the last bucket is None."""
+        edges = list(self.edges) + [None]
+        return [(edge, count) for edge, count in zip(edges, self.counts)
+                if count > 0]
+
+    def summary(self):
+        """Return a dictionnary with count, mean, min, max and percentiles
+        (p50, p90, p99) in seconds."""
+        summary = {"count": self.count,
+                   "mean": self.total / self.count if self.count else None,
+                   "min": self.minimum,
+                   "max": self.maximum}
+
+        for percent in PERCENTILES:
+            summary["p" + str(percent)] = self.percentile(percent)
+
+        return summary
+
+
+def _milliseconds(duration):
+    """Return a duration in seconds as a string in milli-seconds."""
+    if duration is None:
+        return "-"
+
+    return str(round(duration * 1000, 2))
+
+
+def stats_line(stats):
+    """
+        Return a one line summary of a dictionnary given by Logger.stats :
+        ticks, overruns, tick lateness, source latencies, writer backlog and
+        dropped samples.
+    """
+    jitter = stats["jitter"]
+    items = ["ticks " + str(stats["ticks"]),
+             "overruns " + str(stats["overruns"]),
+             "lateness p99 " + _milliseconds(jitter["p99"]) + " ms"]
+
+    for source, source_stats in sorted(stats["sources"].items()):
+        items.append(source + " p99 " + _milliseconds(source_stats["p99"]) +
+                     " ms max " + _milliseconds(source_stats["max"]) + " ms")
+
+    backlog = sum(writer["backlog"] for writer in stats["writers"].values())
+    dropped = sum(writer["dropped"] for writer in stats["writers"].values())
+    items.append("backlog " + str(backlog))
+    items.append("dropped " + str(dropped +
+                                  stats["consumers"]["dropped"]))
+
+    return ", ".join(items)
+
+
+def pool_stats_line(stats):
+    """
+        Return a one line summary of a dictionnary given by
+        multi_logger.LoggerPool.stats : ticks, overruns, tick lateness,
+        errors and timeouts of each robot, writer backlog and dropped samples.
+    """
+    jitter = stats["jitter"]
+    items = ["ticks " + str(stats["ticks"]),
+             "overruns " + str(stats["overruns"]),
+             "lateness p99 " + _milliseconds(jitter["p99"]) + " ms"]
+
+    for robot_ip in sorted(stats["robots"]):
+        items.append(robot_ip + " errors " + str(stats["errors"][robot_ip]) +
+                     " timeouts " + str(stats["timeouts"][robot_ip]))
+
+    writers = list(stats["writers"].values())
+    consumers = 0
+    for robot_stats in stats["robots"].values():
+        writers.extend(robot_stats["writers"].values())
+        consumers += robot_stats["consumers"]["dropped"]
+
+    items.append("backlog " + str(sum(writer["backlog"]
+                                      for writer in writers)))
+    items.append("dropped " + str(sum(writer["dropped"]
+                                      for writer in writers) + consumers))
+
+    return ", ".join(items)
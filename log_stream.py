@@ -0,0 +1,375 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+@summary: Network output of multi_logger. Samples are published on a TCP or
+          Unix domain socket to any number of subscribers, each one with its
+          own bounded buffer and sending thread, so a slow subscriber never
+          delays sampling.
+
+          Protocol : a sequence of frames, each one being a type (1 byte), a
+          length (little endian uint32) and a payload :
+          - STREAM_SCHEMA : header of a binary log file (see
+            log_writer.binary_header), giving the columns. Sent first, and
+            again when the columns change.
+          - STREAM_ROWS : one or several records of little endian float64,
+            one per sample, in the order of the columns.
+          See log_reader.StreamReader for a client.
+
+@pep8 : Complains without rules R0902 and R0913
+"""
+
+import os
+import sys
+import struct
+import socket
+import threading
+from collections import deque
+
+
+STREAM_SCHEMA = "S"
+STREAM_ROWS = "R"
+FRAME_HEADER = struct.Struct("<cI")
+
+# What to do with a subscriber whose buffer is full :
+# - drop : disconnect it
+# - downsample : send it one sample out of 2, 4, 8 ... until it catches up
+STREAM_POLICIES = ("drop", "downsample")
+DEFAULT_STREAM_POLICY = "downsample"
+DEFAULT_CLIENT_BUFFER_SIZE = 1000
+MAX_DECIMATION = 1024
+
+# Maximum number of records sent in one frame
+MAX_BATCH_SIZE = 500
+
+ADDRESS_SCHEMES = ("tcp://", "unix://")
+
+
+def is_stream_address(output):
+    """Return True if output is a socket address (tcp://HOST:PORT or
+    unix:///PATH) instead of a file path."""
+    return output is not None and output.startswith(ADDRESS_SCHEMES)
+
+
+def parse_address(address):
+    """
+        Return (family, socket address) of a tcp://HOST:PORT or
+        unix:///PATH address. An empty host means every interface.
+        Raise ValueError if the address is invalid.
+    """
+    if address.startswith("tcp://"):
+        (host, _, port) = address[len("tcp://"):].rpartition(":")
+        if not port.isdigit():
+            raise ValueError("Invalid address \"" + address + "\", must be " +
+                             "tcp://HOST:PORT")
+
+        return (socket.AF_INET, (host.strip("[]"), int(port)))
+
+    if address.startswith("unix://"):
+        path = address[len("unix://"):]
+        if not path or not hasattr(socket, "AF_UNIX"):
+            raise ValueError("Invalid address \"" + address + "\", must be " +
+                             "unix:///PATH (not on Windows)")
+
+        return (socket.AF_UNIX, path)
+
+    raise ValueError("Invalid address \"" + address + "\", must begin with " +
+                     " or ".join(ADDRESS_SCHEMES))
+
+
+def frame(frame_type, payload):
+    """Return a frame of the protocol."""
+    return FRAME_HEADER.pack(frame_type, len(payload)) + payload
+
+
+class _Schema(object):
+
+    """Item of the buffer of a subscriber changing the columns."""
+
+    def __init__(self, header):
+        self.header = header
+
+
+class _Subscriber(object):
+
+    """Connection to a subscriber, and its buffer of records to send."""
+
+    def __init__(self, connection, buffer_size, policy):
+        self.connection = connection
+        self.buffer_size = buffer_size
+        self.policy = policy
+        self.decimation = 1
+        self.dropped = 0
+        self.alive = True
+
+        self._items = deque()
+        self._rows = 0
+        self._skipped = 0
+        self._closed = False
+        self._condition = threading.Condition()
+
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+
+    @property
+    def backlog(self):
+        """Number of records waiting to be sent."""
+        return self._rows
+
+    def put_schema(self, header):
+        """Send a new header. Never dropped."""
+        with self._condition:
+            self._items.append(_Schema(header))
+            self._condition.notify()
+
+    def put_record(self, record):
+        """
+            Send a record, or drop it if the buffer is full or with
+            downsampling. Return False if the subscriber has to be
+            disconnected.
+        """
+        with self._condition:
+            if self._rows >= self.buffer_size:
+                if self.policy == "drop":
+                    return False
+
+                self.decimation = min(2 * self.decimation, MAX_DECIMATION)
+                self.dropped += 1
+                return True
+
+            self._skipped += 1
+            if self._skipped < self.decimation:
+                self.dropped += 1
+                return True
+
+            self._skipped = 0
+            if self.decimation > 1 and self._rows < self.buffer_size // 4:
+                self.decimation //= 2
+
+            self._items.append(record)
+            self._rows += 1
+            self._condition.notify()
+
+        return True
+
+    def close(self):
+        """Send the remaining records, then close the connection."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+
+    def _frames(self, items):
+        """Return the frames of a list of items : consecutive records are
+        sent in one frame."""
+        frames = []
+        records = []
+
+        for item in items:
+            if isinstance(item, _Schema):
+                if records:
+                    frames.append(frame(STREAM_ROWS, "".join(records)))
+                    records = []
+                frames.append(frame(STREAM_SCHEMA, item.header))
+            else:
+                records.append(item)
+                if len(records) >= MAX_BATCH_SIZE:
+                    frames.append(frame(STREAM_ROWS, "".join(records)))
+                    records = []
+
+        if records:
+            frames.append(frame(STREAM_ROWS, "".join(records)))
+
+        return frames
+
+    def _run(self):
+        """Send the buffer until the subscriber is closed or disconnects."""
+        try:
+            while True:
+                with self._condition:
+                    while not self._items and not self._closed:
+                        self._condition.wait()
+
+                    if not self._items:
+                        return
+
+                    items = list(self._items)
+                    self._items.clear()
+                    self._rows = 0
+
+                for data in self._frames(items):
+                    self.connection.sendall(data)
+        except socket.error:
+            pass
+        finally:
+            self.alive = False
+            try:
+                self.connection.close()
+            except socket.error:
+                pass
+
+
+class StreamServer(object):
+
+    """
+        Publish binary records to the subscribers connected to a socket.
+        It has the interface of log_writer.BatchedWriter (write, set_header,
+        close and the same counters), so it replaces an output file : write
+        is given records of log_writer.BINARY_TYPE (see
+        multi_logger.SamplingPlan.pack).
+        write never waits for the network : each subscriber has a bounded
+        buffer emptied by its own thread. When it is full, the subscriber is
+        disconnected or downsampled (see STREAM_POLICIES).
+    """
+
+    def __init__(self, address, header,
+                 buffer_size=DEFAULT_CLIENT_BUFFER_SIZE,
+                 policy=DEFAULT_STREAM_POLICY):
+        """
+            - address : tcp://HOST:PORT or unix:///PATH
+            - header : Header of the columns (see log_writer.binary_header)
+            - buffer_size (optional) : Maximum number of records waiting for
+              each subscriber
+            - policy (optional) : What to do with a slow subscriber (see
+              STREAM_POLICIES)
+        """
+        if policy not in STREAM_POLICIES:
+            raise ValueError("Unknown stream policy \"" + str(policy) +
+                             "\". Must be in " + ", ".join(STREAM_POLICIES))
+
+        (family, socket_address) = parse_address(address)
+
+        self.address = address
+        self.header = header
+        self.buffer_size = buffer_size
+        self.policy = policy
+
+        self.backpressure = 0
+        self.dropped = 0
+        self.max_backlog = 0
+        self.written = 0
+        self.connected = 0
+        self.disconnected = 0
+        self.error = None
+        self.closed = False
+
+        self._lock = threading.Lock()
+        self._subscribers = []
+
+        if family == socket.AF_UNIX and os.path.exists(socket_address):
+            os.remove(socket_address)
+
+        self._socket = socket.socket(family, socket.SOCK_STREAM)
+        if family == socket.AF_INET:
+            self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+
+        try:
+            self._socket.bind(socket_address)
+            self._socket.listen(5)
+        except socket.error as error:
+            self._socket.close()
+            raise IOError(str(error))
+
+        self._family = family
+        self._unix_path = socket_address if family == socket.AF_UNIX else None
+        self.socket_address = self._socket.getsockname()
+
+        self._thread = threading.Thread(target=self._accept)
+        self._thread.daemon = True
+        self._thread.start()
+
+    @property
+    def subscribers(self):
+        """Number of subscribers connected."""
+        return len(self._subscribers)
+
+    @property
+    def backlog(self):
+        """Maximum number of records waiting for a subscriber."""
+        return max([subscriber.backlog for subscriber in self._subscribers] or
+                   [0])
+
+    def _accept(self):
+        """Accept subscribers until the server is closed."""
+        while not self.closed:
+            try:
+                (connection, _) = self._socket.accept()
+            except socket.error:
+                return
+
+            if self._family == socket.AF_INET:
+                connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY,
+                                      1)
+
+            subscriber = _Subscriber(connection, self.buffer_size,
+                                     self.policy)
+
+            with self._lock:
+                if self.closed:
+                    connection.close()
+                    return
+
+                subscriber.put_schema(self.header)
+                subscriber._thread.start()
+                self._subscribers.append(subscriber)
+                self.connected += 1
+
+    def write(self, record):
+        """Give a record to every subscriber. Never waits for the
+        network."""
+        if self.closed:
+            return
+
+        with self._lock:
+            for subscriber in list(self._subscribers):
+                dropped = subscriber.dropped
+                if not subscriber.alive or \
+                        not subscriber.put_record(record):
+                    if subscriber.alive:
+                        sys.stderr.write("multi_logger.py WARNING : Slow " +
+                                         "stream subscriber disconnected.\n")
+
+                    subscriber.close()
+                    self._subscribers.remove(subscriber)
+                    self.disconnected += 1
+                    continue
+
+                if subscriber.dropped > dropped:
+                    self.backpressure += 1
+                    self.dropped += 1
+
+                self.max_backlog = max(self.max_backlog, subscriber.backlog)
+
+            self.written += 1
+
+    def set_header(self, header):
+        """Send new columns to every subscriber, after the records already
+        given."""
+        with self._lock:
+            self.header = header
+            for subscriber in self._subscribers:
+                subscriber.put_schema(header)
+
+    def close(self):
+        """Stop accepting subscribers, send the remaining records, and
+        close every connection."""
+        if self.closed:
+            return
+
+        with self._lock:
+            self.closed = True
+            subscribers = list(self._subscribers)
+            self._subscribers = []
+
+        try:
+            self._socket.shutdown(socket.SHUT_RDWR)
+        except socket.error:
+            pass
+        self._socket.close()
+
+        for subscriber in subscribers:
+            subscriber.close()
+        for subscriber in subscribers:
+            subscriber._thread.join(1)
+
+        if self._unix_path is not None and os.path.exists(self._unix_path):
+            os.remove(self._unix_path)
@@ -0,0 +1,726 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+@summary: Output stages of multi_logger. Lines are written to the log file
+          by a dedicated thread, so disk latency does not delay sampling.
+
+@pep8 : Complains without rules R0902 and R0913
+"""
+
+import os
+import sys
+import time
+import json
+import struct
+import zlib
+import bz2
+import operator
+import threading
+from collections import deque
+from Queue import Queue, Full, Empty
+
+
+DEFAULT_BUFFER_SIZE = 10000
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_FLUSH_INTERVAL = 1
+
+# When the file is synchronised to the disk (os.fsync) :
+# - never : let the operating system decide
+# - flush : after each flush of a batch
+# - close : when the writer is closed
+FSYNC_POLICIES = ("never", "flush", "close")
+DEFAULT_FSYNC = "never"
+
+# Binary format : BINARY_MAGIC, header length (uint32), JSON header padded
+# with spaces to a multiple of 8 bytes, then one record of little endian
+# float64 per sample.
+BINARY_MAGIC = "MLOGBIN1"
+BINARY_BYTE_ORDER = "<"
+BINARY_TYPE = "d"
+
+# Compression of the output file. "lzma" needs Python 3 or backports.lzma
+COMPRESSIONS = ("none", "gzip", "bz2", "lzma")
+COMPRESSION_EXTENSIONS = {"none": "", "gzip": ".gz", "bz2": ".bz2",
+                          "lzma": ".xz"}
+DEFAULT_COMPRESSION = "none"
+
+# With change only output, maximum time between two full rows, in seconds
+DEFAULT_KEYFRAME_PERIOD = 60
+
+# With change only output, a value which is missing (None or NaN) is written
+# as EMPTY_VALUE ("nan" in text), where an empty field is an unchanged value
+EMPTY_VALUE = float("nan")
+
+# Triggered capture : comparisons of a trigger, and the default time kept
+# before and after each event, in seconds
+TRIGGER_OPERATORS = {">": operator.gt, ">=": operator.ge,
+                     "<": operator.lt, "<=": operator.le,
+                     "==": operator.eq, "!=": operator.ne}
+DEFAULT_PRE_TRIGGER = 5
+DEFAULT_POST_TRIGGER = 5
+
+# Index of a text log : <segment>.idx, one line "time,offset" at most every
+# index interval (seconds of the Time column), offset being the position in
+# bytes of the first line of a batch of lines with this time. See
+# log_reader.TextLog.
+INDEX_EXTENSION = ".idx"
+INDEX_HEADER = "Time,Offset\n"
+DEFAULT_INDEX_INTERVAL = 10
+
+_CLOSE = object()
+
+
+class _NewHeader(object):
+
+    """Item of the buffer of BatchedWriter changing the header."""
+
+    def __init__(self, header):
+        self.header = header
+
+
+def binary_header(headers):
+    """Return the header of a binary log file whose columns are headers."""
+    header = json.dumps({"columns": list(headers),
+                         "dtype": BINARY_BYTE_ORDER + "f8"})
+    prefix_size = len(BINARY_MAGIC) + 4
+    header += " " * (-(prefix_size + len(header)) % 8)
+
+    return BINARY_MAGIC + struct.pack("<I", len(header)) + header
+
+
+def _compressor(compression):
+    """Return a new compressor object, or None if no compression."""
+    if compression == "gzip":
+        # wbits = 16 + MAX_WBITS writes gzip headers, readable by gzip/zcat
+        return zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    if compression == "bz2":
+        return bz2.BZ2Compressor()
+
+    if compression == "lzma":
+        try:
+            import lzma
+        except ImportError:
+            try:
+                from backports import lzma
+            except ImportError:
+                message = "lzma compression needs Python 3 or backports.lzma"
+                raise ImportError(message)
+
+        return lzma.LZMACompressor()
+
+    return None
+
+
+def _is_empty(value):
+    """Return True if a value is missing (None or NaN)."""
+    # NaN is different from itself
+    return value is None or value != value
+
+
+class ChangeFilter(object):
+
+    """
+        Change only output : keep the values which changed by more than the
+        deadband of their column since they were last kept, and replace the
+        others by None (empty fields in text, NaN in binary). A value which
+        becomes missing is a change, kept as EMPTY_VALUE. The first column
+        (time) is always kept, and rows without any change are dropped.
+        A full row (keyframe) is kept every keyframe_period seconds, so the
+        values at any time are the last keyframe updated by the following
+        rows. The columns which are not sampled in a keyframe row get their
+        last value.
+    """
+
+    def __init__(self, headers, deadbands=None, default_deadband=0.0,
+                 keyframe_period=DEFAULT_KEYFRAME_PERIOD):
+        """
+            - headers : Column names, the first one being the time
+            - deadbands (optional) : Dictionnary of the deadband of columns
+            - default_deadband (optional) : Deadband of the other columns
+            - keyframe_period (optional) : Maximum time between two full
+              rows, in seconds
+        """
+        if deadbands is None:
+            deadbands = {}
+
+        self.deadbands = [deadbands.get(header, default_deadband)
+                          for header in headers[1:]]
+        self.keyframe_period = keyframe_period
+        self.rows = 0
+        self.kept = 0
+        self.keyframes = 0
+
+        # Last value kept of each column, None if it is missing or was never
+        # sampled
+        self._last = [None] * len(self.deadbands)
+        self._sampled = [False] * len(self.deadbands)
+        self._next_keyframe = None
+
+    def _keyframe(self, values, sampled):
+        """Return the full row of values, the columns which are not sampled
+        getting their last value."""
+        row = [values[0]]
+        for index, value in enumerate(values[1:]):
+            if sampled is None or index + 1 in sampled:
+                self._sampled[index] = True
+                self._last[index] = None if _is_empty(value) else value
+            elif not self._sampled[index]:
+                row.append(None)
+                continue
+
+            if self._last[index] is None:
+                row.append(EMPTY_VALUE)
+            else:
+                row.append(self._last[index])
+
+        self._next_keyframe = values[0] + self.keyframe_period
+        self.keyframes += 1
+        return row
+
+    def filter(self, values, sampled=None):
+        """
+            Return the row to write instead of values (time first), or None if
+            no value changed.
+            - sampled (optional) : Indexes in values of the columns sampled
+              for this row (default: all). The others are unchanged.
+        """
+        elapsed_time = values[0]
+        self.rows += 1
+
+        if self._next_keyframe is None or elapsed_time >= self._next_keyframe:
+            self.kept += 1
+            return self._keyframe(values, sampled)
+
+        last = self._last
+        row = [elapsed_time]
+        changed = False
+
+        for index, value in enumerate(values[1:]):
+            if sampled is not None and index + 1 not in sampled:
+                row.append(None)
+                continue
+
+            self._sampled[index] = True
+            previous = last[index]
+
+            if _is_empty(value):
+                if previous is None:
+                    row.append(None)
+                    continue
+
+                last[index] = None
+                row.append(EMPTY_VALUE)
+                changed = True
+                continue
+
+            if value == previous:
+                row.append(None)
+                continue
+
+            try:
+                if previous is not None and \
+                        abs(value - previous) <= self.deadbands[index]:
+                    row.append(None)
+                    continue
+            except TypeError:
+                pass
+
+            last[index] = value
+            row.append(value)
+            changed = True
+
+        if not changed:
+            return None
+
+        self.kept += 1
+        return row
+
+
+class Trigger(object):
+
+    """
+        Condition on a column : "<column> <operator> <threshold>" (see
+        TRIGGER_OPERATORS). It fires when the condition becomes true, and is
+        armed again when the condition becomes false, or with a rearm level
+        when the comparison with this level becomes false (hysteresis : a
+        trigger "Current > 2.5" with rearm 2.0 fires again only after Current
+        went down to 2.0).
+    """
+
+    def __init__(self, name, column, comparison, threshold, rearm=None):
+        """
+            - name : Name of the trigger
+            - column : Name of the column compared
+            - comparison : Operator, in TRIGGER_OPERATORS
+            - threshold : Value the column is compared to
+            - rearm (optional) : Level arming the trigger again (default:
+              threshold)
+        """
+        if comparison not in TRIGGER_OPERATORS:
+            raise ValueError("Unknown trigger operator \"" +
+                             str(comparison) + "\". Must be in " +
+                             ", ".join(sorted(TRIGGER_OPERATORS)))
+
+        self.name = name
+        self.column = column
+        self.comparison = comparison
+        self.threshold = threshold
+        self.rearm = threshold if rearm is None else rearm
+        self.armed = True
+
+        self._compare = TRIGGER_OPERATORS[comparison]
+
+    def check(self, value):
+        """Return True if the trigger fires with value. Values which are not
+        numbers (None, NaN, strings ...) are ignored."""
+        if not isinstance(value, (int, long, float)) or value != value:
+            return False
+
+        if self.armed:
+            if self._compare(value, self.threshold):
+                self.armed = False
+                return True
+        elif not self._compare(value, self.rearm):
+            self.armed = True
+
+        return False
+
+
+class TriggeredCapture(object):
+
+    """
+        Triggered capture : every row is kept in memory for pre_time seconds,
+        and only the rows around events are given to the output.
+        An event is a trigger firing (see Trigger). It gives the rows of the
+        last pre_time seconds, then every row until post_time seconds after
+        the event. An event during this window extends it. Events less than
+        hold_off seconds after the previous event are ignored.
+    """
+
+    def __init__(self, headers, triggers, pre_time=DEFAULT_PRE_TRIGGER,
+                 post_time=DEFAULT_POST_TRIGGER, hold_off=0.0):
+        """
+            - headers : Column names, the first one being the time
+            - triggers : List of Trigger
+            - pre_time (optional) : Time kept before an event, in seconds
+            - post_time (optional) : Time kept after an event, in seconds
+            - hold_off (optional) : Minimum time between two events, in
+              seconds
+        """
+        if pre_time < 0 or post_time < 0 or hold_off < 0:
+            raise ValueError("Trigger times must be positive")
+
+        self.triggers = []
+        for trigger in triggers:
+            if trigger.column not in headers:
+                raise ValueError("Trigger " + trigger.name + " : unknown " +
+                                 "column \"" + trigger.column + "\"")
+
+            self.triggers.append((trigger, headers.index(trigger.column)))
+
+        self.pre_time = pre_time
+        self.post_time = post_time
+        self.hold_off = hold_off
+
+        self.rows = 0
+        self.written = 0
+        self.events = []
+        self.held_off = 0
+
+        self._buffer = deque()
+        self._end = None
+        self._next_event = None
+
+    @property
+    def buffered(self):
+        """Number of rows kept in memory before a possible event."""
+        return len(self._buffer)
+
+    def add(self, values, item=None):
+        """
+            Add a row (time first). Return the list of the items to write,
+            in order : the item given with each row (the row itself if item
+            is None), for the rows of the pre-trigger window and the rows
+            within post_time of an event.
+        """
+        elapsed_time = values[0]
+        if item is None:
+            item = values
+
+        self.rows += 1
+
+        fired = [trigger.name for trigger, index in self.triggers
+                 if trigger.check(values[index])]
+
+        items = []
+        if fired:
+            if self._next_event is not None and \
+                    elapsed_time < self._next_event:
+                self.held_off += 1
+            else:
+                self.events.append((elapsed_time, fired))
+                self._next_event = elapsed_time + self.hold_off
+
+                if self._end is None:
+                    start = elapsed_time - self.pre_time
+                    items = [buffered for buffered_time, buffered
+                             in self._buffer if buffered_time >= start]
+                    self._buffer.clear()
+                    self._end = elapsed_time + self.post_time
+                else:
+                    self._end = max(self._end,
+                                    elapsed_time + self.post_time)
+
+        if self._end is not None and elapsed_time <= self._end:
+            items.append(item)
+            self.written += len(items)
+            return items
+
+        self._end = None
+        buffer = self._buffer
+        buffer.append((elapsed_time, item))
+        while buffer[0][0] < elapsed_time - self.pre_time:
+            buffer.popleft()
+
+        return items
+
+
+class RotatingFile(object):
+
+    """
+        File object writing the output in successive segments, optionally
+        compressed while streaming.
+        A new segment is started when the current one reaches max_bytes
+        bytes on disk, or when it is older than max_seconds. Each segment
+        begins with the header, so it can be read on its own.
+        Without rotation, the first segment is path (plus the compression
+        extension). With rotation, segments are <root>_0000<ext>,
+        <root>_0001<ext> ...
+        When the columns change (see set_header), the output continues in a
+        new segment, even without rotation.
+        With index_interval, each segment of a text output gets an index (see
+        INDEX_EXTENSION), so a reader can seek to a time without reading the
+        whole file.
+    """
+
+    def __init__(self, path, header, compression=DEFAULT_COMPRESSION,
+                 max_bytes=None, max_seconds=None, index_interval=None):
+        """
+            - path : Path of the output
+            - header : Data written at the beginning of each segment
+            - compression (optional) : Compression (see COMPRESSIONS)
+            - max_bytes (optional) : Maximum size of a segment, in bytes
+            - max_seconds (optional) : Maximum duration of a segment
+            - index_interval (optional) : Time between two entries of the
+              index, in seconds of the Time column (no index if None). Text
+              output without compression only
+        """
+        if compression not in COMPRESSIONS:
+            raise ValueError("Unknown compression \"" + str(compression) +
+                             "\". Must be in " + ", ".join(COMPRESSIONS))
+
+        if index_interval is not None and (compression != "none" or
+                                           header.startswith(BINARY_MAGIC)):
+            raise ValueError("Index needs a text output without compression")
+
+        extension = COMPRESSION_EXTENSIONS[compression]
+        if extension and path.endswith(extension):
+            path = path[:-len(extension)]
+
+        self.path = path
+        self.header = header
+        self.compression = compression
+        self.extension = extension
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.rotating = max_bytes is not None or max_seconds is not None
+        self.index_interval = index_interval
+
+        self.segment_index = 0
+        self.segment_paths = []
+        self._file = None
+        self._index_file = None
+        self._index_time = None
+        self._compressor = None
+        self._opening_time = None
+
+        self._open_segment()
+
+    def _segment_path(self, index):
+        """Return the path of the segment <index>."""
+        if not self.rotating and index == 0:
+            return self.path + self.extension
+
+        (root, extension) = os.path.splitext(self.path)
+        return "%s_%04d%s%s" % (root, index, extension, self.extension)
+
+    def _open_segment(self):
+        """Open a new segment and write the header in it."""
+        path = self._segment_path(self.segment_index)
+        self._file = open(path, "wb")
+        self._compressor = _compressor(self.compression)
+        self._opening_time = time.time()
+        self.segment_paths.append(path)
+        self._write(self.header)
+
+        if self.index_interval is not None:
+            self._index_file = open(path + INDEX_EXTENSION, "wb")
+            self._index_file.write(INDEX_HEADER)
+            self._index_time = None
+
+    def _close_segment(self):
+        """Finish the compressed stream and close the current segment."""
+        if self._compressor is not None:
+            self._file.write(self._compressor.flush())
+
+        self._file.close()
+
+        if self._index_file is not None:
+            self._index_file.close()
+
+    def _write(self, data):
+        """Write data to the current segment."""
+        if self._compressor is not None:
+            data = self._compressor.compress(data)
+
+        self._file.write(data)
+
+    def rotate(self):
+        """Close the current segment and start the next one."""
+        self._close_segment()
+        self.segment_index += 1
+        self._open_segment()
+
+    def set_header(self, header):
+        """Continue in a new segment, beginning with a new header."""
+        self.header = header
+        self.rotate()
+
+    def write(self, data):
+        """Write data, in a new segment if the current one is full."""
+        if self.rotating:
+            if (self.max_bytes is not None and
+                    self._file.tell() >= self.max_bytes) or \
+                (self.max_seconds is not None and
+                 time.time() - self._opening_time >= self.max_seconds):
+                self.rotate()
+
+        if self._index_file is not None:
+            self._add_index(data)
+
+        self._write(data)
+
+    def _add_index(self, data):
+        """Index the first line of data if index_interval elapsed since the
+        last entry."""
+        time_text = data[:data.find(",")]
+        try:
+            line_time = float(time_text)
+        except ValueError:
+            return
+
+        if self._index_time is None or \
+                line_time >= self._index_time + self.index_interval:
+            self._index_file.write(time_text + "," +
+                                   str(self._file.tell()) + "\n")
+            self._index_time = line_time
+
+    def flush(self):
+        """Flush the current segment. With gzip, a sync flush makes every
+        line written so far readable."""
+        if self.compression == "gzip":
+            self._file.write(self._compressor.flush(zlib.Z_SYNC_FLUSH))
+
+        self._file.flush()
+
+        if self._index_file is not None:
+            self._index_file.flush()
+
+    def fileno(self):
+        """File descriptor of the current segment."""
+        return self._file.fileno()
+
+    def close(self):
+        """Close the current segment."""
+        self._close_segment()
+
+
+class BatchedWriter(object):
+
+    """
+        Write lines to a file from a dedicated thread.
+        write puts lines in a bounded buffer. The writer thread writes them by
+        batches, and flushes the file when batch_size lines have been written
+        or when flush_interval seconds elapsed since the last flush.
+        When the buffer is full, the disk is falling behind : write blocks
+        (or drops the line if block is False) and the event is counted in
+        backpressure.
+    """
+
+    def __init__(self, log_file, buffer_size=DEFAULT_BUFFER_SIZE,
+                 batch_size=DEFAULT_BATCH_SIZE,
+                 flush_interval=DEFAULT_FLUSH_INTERVAL, fsync=DEFAULT_FSYNC,
+                 block=True):
+        """
+            - log_file : File object, opened for writing
+            - buffer_size (optional) : Maximum number of lines waiting
+            - batch_size (optional) : Number of written lines forcing a flush
+            - flush_interval (optional) : Maximum time between two flushes,
+              in seconds
+            - fsync (optional) : fsync policy (see FSYNC_POLICIES)
+            - block (optional) : If False, lines are dropped instead of
+              waiting when the buffer is full
+        """
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError("Unknown fsync policy \"" + str(fsync) +
+                             "\". Must be in " + ", ".join(FSYNC_POLICIES))
+
+        self.log_file = log_file
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.block = block
+
+        self.backpressure = 0
+        self.dropped = 0
+        self.max_backlog = 0
+        self.written = 0
+        self.error = None
+        self.closed = False
+
+        self._queue = Queue(maxsize=buffer_size)
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    @property
+    def backlog(self):
+        """Number of lines waiting to be written."""
+        return self._queue.qsize()
+
+    def write(self, line):
+        """Put a line in the buffer. Never waits for the disk, except if the
+        buffer is full."""
+        if self.closed:
+            return
+
+        try:
+            self._queue.put_nowait(line)
+        except Full:
+            if self.backpressure == 0:
+                sys.stderr.write("multi_logger.py WARNING : Writing to the " +
+                                 "output file is falling behind sampling.\n")
+
+            self.backpressure += 1
+            if self.block:
+                self._queue.put(line)
+            else:
+                self.dropped += 1
+
+        backlog = self._queue.qsize()
+        if backlog > self.max_backlog:
+            self.max_backlog = backlog
+
+    def set_header(self, header):
+        """Change the header of the file (see RotatingFile.set_header) once
+        the lines already given are written."""
+        if not self.closed:
+            self._queue.put(_NewHeader(header))
+
+    def _write_lines(self, lines):
+        """Write a list of lines, and a new header if one is in the list."""
+        new_headers = [index for index, line in enumerate(lines)
+                       if isinstance(line, _NewHeader)]
+        if not new_headers:
+            self.log_file.write("".join(lines))
+            return
+
+        index = new_headers[0]
+        self.log_file.write("".join(lines[:index]))
+        self.log_file.set_header(lines[index].header)
+        self._write_lines(lines[index + 1:])
+
+    def _flush(self):
+        """Flush the file and synchronise it if required."""
+        self.log_file.flush()
+        if self.fsync == "flush":
+            os.fsync(self.log_file.fileno())
+
+    def _run(self):
+        """Write lines of the buffer until the writer is closed."""
+        not_flushed = 0
+        last_flush = time.time()
+
+        while True:
+            # Lines not flushed yet are flushed after flush_interval, even if
+            # no new line comes
+            try:
+                if not_flushed and self.error is None:
+                    lines = [self._queue.get(
+                        timeout=max(0.0, last_flush + self.flush_interval -
+                                    time.time()))]
+                else:
+                    lines = [self._queue.get()]
+            except Empty:
+                try:
+                    self._flush()
+                except (IOError, OSError) as error:
+                    sys.stderr.write("multi_logger.py ERROR : Writing to " +
+                                     "the output file failed : " +
+                                     str(error) + "\n")
+                    self.error = error
+                not_flushed = 0
+                last_flush = time.time()
+                continue
+
+            while len(lines) < self.batch_size:
+                try:
+                    lines.append(self._queue.get_nowait())
+                except Empty:
+                    break
+
+            closing = _CLOSE in lines
+            if closing:
+                lines = lines[:lines.index(_CLOSE)]
+
+            if self.error is not None:
+                self.dropped += len(lines)
+            elif lines:
+                try:
+                    self._write_lines(lines)
+                    self.written += len(lines)
+                    not_flushed += len(lines)
+
+                    now = time.time()
+                    if not_flushed >= self.batch_size or \
+                            now - last_flush >= self.flush_interval:
+                        self._flush()
+                        not_flushed = 0
+                        last_flush = now
+                except (IOError, OSError) as error:
+                    sys.stderr.write("multi_logger.py ERROR : Writing to " +
+                                     "the output file failed : " +
+                                     str(error) + "\n")
+                    self.error = error
+                    self.dropped += len(lines)
+
+            if closing:
+                return
+
+    def close(self):
+        """Write the remaining lines, then flush and close the file."""
+        if self.closed:
+            return
+
+        self.closed = True
+        self._queue.put(_CLOSE)
+        self._thread.join()
+
+        if self.error is None:
+            self.log_file.flush()
+            if self.fsync != "never":
+                os.fsync(self.log_file.fileno())
+
+        self.log_file.close()
@@ -0,0 +1,315 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+@requires: numpy
+
+@summary: This module permits to use multi_logger as an API with the
+          sampling in a child process : acquisition, formatting and output
+          do not share the GIL with the calling script, so heavy work in the
+          script does not disturb the timing of the samples, and a slow
+          sample does not slow the script.
+          Samples are given to the script through a ring buffer in shared
+          memory (see ring_buffer.SharedRingBuffer) : history.window and
+          history.since read them without any copy.
+
+          Example :
+              import logger_process
+              logger = logger_process.LoggerProcess("10.0.0.1",
+                                                    "multi_logger.cfg", 0.01)
+              logger.log()
+              ...
+              data = logger.history.window(100)
+              logger.stop()
+
+@pep8 : Complains without rules R0902 and R0913
+"""
+
+import os
+import sys
+import signal
+import threading
+import multiprocessing
+
+import multi_logger
+import ring_buffer
+
+
+# Maximum time waited for the engine process to stop, in seconds. After it,
+# the process is terminated.
+STOP_TIMEOUT = 10
+
+# Period of the checks that the engine process is alive, while waiting for
+# it, and that the parent process is alive, while waiting for a command, in
+# seconds
+POLL_PERIOD = 0.5
+
+
+def _run_engine(connection, parent_connection, parent_pid, shared_history,
+                robot_ip, config_file_path, sample_period, output, decimal,
+                logger_options):
+    """
+        Main function of the engine process : create the Logger, then execute
+        the commands of the parent ("log", "stats" and "stop") until it stops
+        or dies.
+    """
+    # The end of the pipe of the parent is inherited by the fork : while it
+    # is open here, the engine never gets EOF when the parent dies
+    parent_connection.close()
+
+    # Ctrl+C is for the parent, which stops the engine
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    try:
+        logger = multi_logger.Logger(robot_ip, config_file_path,
+                                     sample_period, output, decimal,
+                                     shared_history=shared_history,
+                                     **logger_options)
+    except (Exception, SystemExit) as error:
+        connection.send(("error", str(error)))
+        connection.close()
+        return
+
+    connection.send(("ready", logger.startup_times))
+
+    try:
+        while True:
+            # The pipe may also be inherited by other children of the parent
+            if not connection.poll(POLL_PERIOD):
+                if os.getppid() != parent_pid:
+                    break
+                continue
+
+            try:
+                (command, argument) = connection.recv()
+            except (EOFError, IOError):
+                break
+
+            if command == "log":
+                logger.log(argument)
+                connection.send(("ok", None))
+            elif command == "stats":
+                connection.send(("ok", logger.stats()))
+            elif command == "stop":
+                break
+    finally:
+        logger.stop()
+
+        try:
+            connection.send(("ok", logger.stats()))
+            connection.close()
+        except (IOError, OSError):
+            pass
+
+
+class LoggerProcess(object):
+
+    """
+        Logger whose sampling runs in a child process (the engine). It has the
+        API of multi_logger.Logger with class_getter : log, stop, get_data,
+        subscribe, add_callback, history and stats.
+        The engine is started and its sources initialised when the
+        LoggerProcess is created. It is stopped by stop, or when the parent
+        process dies.
+        The configuration file cannot be reloaded while logging.
+    """
+
+    def __init__(self, robot_ip,
+                 config_file_path=multi_logger.DEFAULT_CONFIG_FILE,
+                 sample_period=multi_logger.DEFAULT_PERIOD,
+                 output=multi_logger.DEFAULT_OUTPUT,
+                 decimal=multi_logger.DEFAULT_DECIMAL,
+                 queue_size=multi_logger.DEFAULT_QUEUE_SIZE,
+                 history_size=multi_logger.DEFAULT_HISTORY_SIZE,
+                 **logger_options):
+        """
+            Start the engine process, and wait for the initialisation of the
+            sources. Exit if it fails.
+            - robot_ip : IP adress of the robot
+            - config_file_path (optional) : Path of the configuration file
+            - sample_period (optional) : Sample period
+            - output (optional) : Output where results will be written, by
+              the engine process
+            - decimal (optional) : Number of decimal for the Time variable
+            - queue_size (optional) : Maximum number of samples waiting for
+              get_data
+            - history_size (optional) : Number of samples kept in the shared
+              history
+            - logger_options (optional) : Other arguments given to the Logger
+              of the engine (output_format, acquisition ...)
+        """
+        try:
+            config_file_dic = multi_logger.read_config_file(config_file_path)
+            multi_logger.validate_config(config_file_dic)
+            (config_file_dic, _) = \
+                multi_logger.split_source_periods(config_file_dic)
+        except multi_logger.ConfigError as error:
+            print "multi_logger.py ERROR : Invalid configuration file : " + \
+                str(error)
+            sys.exit()
+
+        concurrent = logger_options.get(
+            "acquisition", multi_logger.DEFAULT_ACQUISITION) == "concurrent"
+        plan = multi_logger.SamplingPlan.from_config(config_file_dic,
+                                                     concurrent)
+
+        self.headers = list(plan.headers)
+        self.rt_headers = self.headers[1:]
+        self.history = ring_buffer.SharedRingBuffer(
+            self.headers, max(history_size, queue_size))
+        self.max_queue_size = queue_size
+        self.final_stats = None
+
+        self._data_subscription = ring_buffer.Subscription(
+            self.history, queue_size,
+            lambda row: dict(zip(self.rt_headers, row[1:])))
+        self._subscriptions = []
+        self._lock = threading.Lock()
+
+        logger_options.pop("class_getter", None)
+        (self._connection, engine_connection) = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(
+            target=_run_engine,
+            args=(engine_connection, self._connection, os.getpid(),
+                  self.history, robot_ip, config_file_path, sample_period,
+                  output, decimal, logger_options))
+        self.process.daemon = True
+        self.process.start()
+        engine_connection.close()
+
+        (status, value) = self._receive()
+        if status != "ready":
+            self.process.join(STOP_TIMEOUT)
+            print "multi_logger.py ERROR : The engine process could not " + \
+                "start" + (" : " + value if value else "") + "."
+            sys.exit()
+
+        self.startup_times = value
+
+    def _receive(self):
+        """Return the next message of the engine, or ("error", None) if it
+        died."""
+        while not self._connection.poll(POLL_PERIOD):
+            if not self.process.is_alive():
+                break
+
+        try:
+            return self._connection.recv()
+        except (EOFError, IOError):
+            return ("error", None)
+
+    def _request(self, command, argument=None):
+        """Send a command to the engine, and return its answer. Raise
+        RuntimeError if the engine is stopped or died."""
+        with self._lock:
+            if self.final_stats is not None:
+                raise RuntimeError("The engine process is stopped")
+
+            try:
+                self._connection.send((command, argument))
+            except (IOError, OSError):
+                raise RuntimeError("The engine process died")
+
+            (status, value) = self._receive()
+            if status != "ok":
+                raise RuntimeError("The engine process died")
+
+            return value
+
+    @property
+    def alive(self):
+        """True while the engine process is running."""
+        return self.process.is_alive()
+
+    def log(self, rt_plot=False):
+        """Start logging, in the engine process."""
+        self._request("log", rt_plot)
+
+    def stop(self):
+        """Stop logging and wait for the end of the engine process (it is
+        terminated after STOP_TIMEOUT seconds)."""
+        with self._lock:
+            if self.final_stats is not None:
+                return
+
+            try:
+                self._connection.send(("stop", None))
+                (_, self.final_stats) = self._receive()
+            except (IOError, OSError):
+                pass
+
+            if self.final_stats is None:
+                self.final_stats = {}
+
+        self.process.join(STOP_TIMEOUT)
+        if self.process.is_alive():
+            sys.stderr.write("multi_logger.py WARNING : The engine process " +
+                             "did not stop, it is terminated.\n")
+            self.process.terminate()
+            self.process.join()
+
+        self._connection.close()
+
+        # Wake up consumers waiting for data
+        self.history.close()
+
+    def stats(self):
+        """
+            Return the statistics of the logger of the engine process (see
+            multi_logger.Logger.stats), its last statistics once stopped. The
+            consumers are the ones of this process.
+        """
+        if self.final_stats is not None:
+            stats = dict(self.final_stats)
+        else:
+            stats = self._request("stats")
+
+        subscriptions = [subscription for subscription in self._subscriptions
+                         if not subscription.closed]
+        subscriptions.append(self._data_subscription)
+
+        consumers = {"dropped": 0, "lag": 0, "subscriptions": 0}
+        for subscription in subscriptions:
+            consumers["dropped"] += subscription.dropped
+            consumers["lag"] = max(consumers["lag"], subscription.lag)
+            consumers["subscriptions"] += 1
+
+        stats["consumers"] = consumers
+        stats["pid"] = self.process.pid
+
+        return stats
+
+    def get_data(self, timeout=None):
+        """
+        Return the next logged line not read yet, as a dictionnary.
+        If more than queue_size lines are not read, the oldest are dropped.
+        Wait at most timeout seconds (forever if None) for a new line.
+        Return None after timeout, or when logging is stopped.
+        """
+        return self._data_subscription.get(timeout)
+
+    def subscribe(self, max_lag=None):
+        """
+        Return a new ring_buffer.Subscription to the logged lines (see
+        multi_logger.Logger.subscribe).
+        """
+        subscription = ring_buffer.Subscription(
+            self.history, max_lag, lambda row: dict(zip(self.headers, row)))
+
+        # Closed subscriptions are forgotten
+        self._subscriptions = [other for other in self._subscriptions
+                               if not other.closed]
+        self._subscriptions.append(subscription)
+
+        return subscription
+
+    def add_callback(self, callback, max_lag=None):
+        """
+        Call callback with each logged line (as given by subscribe), from a
+        dedicated thread of this process. Return the subscription : close it
+        to unregister the callback.
+        """
+        subscription = self.subscribe(max_lag)
+        ring_buffer.run_callback(subscription, callback)
+
+        return subscription
@@ -31,7 +31,7 @@ Last modification 2014/05/05
 
 @summary: This module permits to log datas from several sources
 @source availables : ALMemory, Picolog TC08 and Picolog ADC24, CPU usage and
-                     interrupts
+                     interrupts, resources of processes
 
 @known issues : - For TC08, in the configuration file, you have to put channels
                   in order (1, 2 .. 8)
@@ -49,7 +49,16 @@ import argparse
 import ConfigParser
 import threading
 import subprocess
+import struct
+import json
 from Queue import Queue
+from collections import namedtuple, OrderedDict
+
+import log_writer
+import log_stats
+import log_stream
+import plot_channel
+import timing
 
 
 DEFAULT_CONFIG_FILE = "multi_logger.cfg"
@@ -61,9 +70,758 @@ DEFAULT_IP = "127.0.0.1"
 DEFAULT_RT_PLOT = False
 DEFAULT_CLASS_GETTER = False
 DEFAULT_QUEUE_SIZE = 5
+DEFAULT_HISTORY_SIZE = 1000
+DEFAULT_INIT_TIMEOUT = 30
+DEFAULT_BUFFER_SIZE = 1000
+DEFAULT_MISSED_DEADLINE = "skip"
+DEFAULT_ACQUISITION = "sequential"
+DEFAULT_OUTPUT_FORMAT = "text"
+DEFAULT_RATE_OUTPUT = "sparse"
+DEFAULT_RELOAD_CONFIG = False
+
+# With reload_config, minimum time between two checks of the configuration file
+CONFIG_CHECK_PERIOD = 1
+
+# With a replay, speed of the replay (0 : as fast as possible, see log_replay)
+DEFAULT_REPLAY_SPEED = 1.0
 
 LOGGERS_CONFIG_FILE = "probs_config.cfg"
 
+# What to do when a tick starts after its deadline :
+# - skip     : drop the ticks late by a period or more, and fire the last
+#              missed tick (less than a period late) immediately
+# - catch_up : fire the missed ticks immediately, until the grid is reached
+# - stretch  : fire now and restart the grid from now
+MISSED_DEADLINE_POLICIES = ("skip", "catch_up", "stretch")
+
+# How sources are sampled during a tick :
+# - sequential : one after the other, in the sampling thread
+# - concurrent : in parallel, one worker thread per source. Each source gets
+#                its own "<Source>Time" column.
+ACQUISITION_MODES = ("sequential", "concurrent")
+
+# Format of the output file :
+# - text : one line of comma separated values per sample
+# - binary : self-described header, then one record of float64 per sample
+#            (see log_writer.binary_header and log_reader.BinaryLog)
+OUTPUT_FORMATS = ("text", "binary")
+
+# Sections of the configuration file which are sources to sample
+SOURCES = ("CPULoad", "Interrupts", "ALMemory", "TC08", "ADC24", "Process")
+
+# Key of a source section giving its own sampling period, in seconds
+SOURCE_PERIOD_KEY = "period"
+
+# Output when the sources have different periods :
+# - sparse : one line per tick of any period, sources which are not sampled
+#            at this tick have empty values (NaN in binary)
+# - streams : one output per period, <root>_<period>s<ext>, with the sources
+#             of this period only
+RATE_OUTPUTS = ("sparse", "streams")
+
+# Two deadlines of different periods closer than this are the same tick
+RATE_TOLERANCE = 1e-6
+
+# Section of the configuration file giving the deadband of columns, with
+# change only output (see log_writer.ChangeFilter). The key "default" gives
+# the deadband of the columns which are not in the section.
+DEADBAND_SECTION = "Deadband"
+DEADBAND_DEFAULT_KEY = "default"
+DEFAULT_CHANGE_ONLY = False
+
+# Section of the configuration file giving the triggers of the triggered
+# capture (see log_writer.TriggeredCapture), one per line :
+# <name> : <column> <operator> <threshold> [rearm <level>]
+TRIGGER_SECTION = "Trigger"
+TRIGGER_REARM_KEYWORD = "rearm"
+DEFAULT_TRIGGER = False
+
+# Acquisition mode of TC08 and ADC24 ("Mode" in probs_config.cfg) :
+# - single : the last value of each channel is read at each sample
+# - burst : every value buffered by the device since the last sample is
+#           read, and written to its own output file (see BurstStream)
+DEVICE_MODES = ("single", "burst")
+
+# In burst mode, time in seconds by which the last sample read may be older
+# than one device interval (latency of the read, drift of the device clock).
+# Beyond it, samples were lost : the buffer of the device overflowed.
+BURST_TIME_TOLERANCE = 0.1
+
+# Module needed by each source
+# Sources whose keys can change when the configuration file is reloaded, and
+# the attribute of the Logger holding the object which samples each one
+RELOADABLE_SOURCES = {"CPULoad": "cpu_load",
+                      "Interrupts": "interrupts",
+                      "ALMemory": "mem",
+                      "Process": "processes"}
+
+SOURCE_MODULES = {"CPULoad": "cpu_interrupt_manager",
+                  "Interrupts": "cpu_interrupt_manager",
+                  "ALMemory": "naoqi",
+                  "TC08": "picolog_tc08_manager",
+                  "ADC24": "picolog_adc24_manager",
+                  "Process": "proc_sources"}
+
+# Modules of CPULoad and Interrupts ("Backend" in probs_config.cfg) :
+# - cpu_interrupt_manager : the external module
+# - proc : built-in, reading /proc on Linux (see proc_sources)
+SOURCE_BACKENDS = {"cpu_interrupt_manager": "cpu_interrupt_manager",
+                   "proc": "proc_sources"}
+DEFAULT_BACKEND = "cpu_interrupt_manager"
+
+
+_CONFIG_CACHE = {}
+
+
+class ConfigError(ValueError):
+
+    """Error in a configuration file."""
+
+
+def read_config_file(config_file_path):
+    """
+        Return the dictionnary corresponding to the configuration file : for
+        each section, the ordered dictionnary of its keys, whose values are
+        split in words. A missing file gives an empty dictionnary.
+        The file is parsed once : results are cached by path and modification
+        time (do not modify them). Raise ConfigError if it cannot be parsed.
+    """
+    path = os.path.abspath(config_file_path)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return {}
+
+    stamp = (stat.st_mtime, stat.st_size)
+    cached = _CONFIG_CACHE.get(path)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+
+    config = ConfigParser.RawConfigParser(dict_type=OrderedDict)
+    config.optionxform = str
+
+    try:
+        config.read(path)
+    except ConfigParser.Error as error:
+        raise ConfigError(str(error))
+
+    dic = {}
+    for section in config.sections():
+        dic[section] = OrderedDict((key, value.split())
+                                   for key, value in config.items(section))
+
+    _CONFIG_CACHE[path] = (stamp, dic)
+
+    return dic
+
+
+def validate_config(config_file_dic):
+    """
+        Check the sources sections of the dictionnary of a configuration file
+        (see read_me.txt). Raise ConfigError on the first invalid line.
+    """
+    thermo_couple_types = ("B", "E", "J", "K", "N", "R", "S", "T", "X")
+    voltage_ranges = tuple("HRDL_" + str(millivolts) + "_MV" for millivolts
+                           in (39, 78, 156, 313, 625, 1250, 2500))
+    ends = ("single-ended", "differential")
+    process_metrics = ("cpu", "rss", "threads", "ctx", "read", "write")
+
+    for key, value in config_file_dic.get(DEADBAND_SECTION, {}).items():
+        try:
+            deadband = float(value[0])
+        except (IndexError, ValueError):
+            deadband = -1
+
+        if len(value) != 1 or deadband < 0:
+            raise ConfigError("[" + DEADBAND_SECTION + "] " + key + " : " +
+                              "must be a positive number")
+
+    for key, value in config_file_dic.get(TRIGGER_SECTION, {}).items():
+        try:
+            numbers = [float(word) for word in value[2::2]]
+        except ValueError:
+            numbers = []
+
+        if len(value) not in (3, 5) or \
+                value[1] not in log_writer.TRIGGER_OPERATORS or \
+                len(numbers) != len(value[2::2]) or \
+                (len(value) == 5 and value[3] != TRIGGER_REARM_KEYWORD):
+            raise ConfigError("[" + TRIGGER_SECTION + "] " + key + " : " +
+                              "must be <column> <operator> <threshold> " +
+                              "[" + TRIGGER_REARM_KEYWORD + " <level>]")
+
+    for source, dic_to_log in config_file_dic.items():
+        if source not in SOURCES:
+            continue
+
+        for key, value in dic_to_log.items():
+            where = "[" + source + "] " + key + " : "
+
+            if not value:
+                raise ConfigError(where + "no value")
+
+            if key == SOURCE_PERIOD_KEY:
+                try:
+                    period = float(value[0])
+                except ValueError:
+                    period = 0
+
+                if len(value) != 1 or not period > 0:
+                    raise ConfigError(where + "must be a period in seconds")
+
+                continue
+
+            if source == "TC08":
+                if len(value) != 2 or not value[0].isdigit() or \
+                        not 1 <= int(value[0]) <= 8 or \
+                        value[1] not in thermo_couple_types:
+                    raise ConfigError(where + "must be <channel 1..8> " +
+                                      "<thermocouple type>")
+
+            if source == "ADC24":
+                if len(value) != 3 or not value[0].isdigit() or \
+                        not 1 <= int(value[0]) <= 16 or \
+                        value[1] not in voltage_ranges or \
+                        value[2] not in ends:
+                    raise ConfigError(where + "must be <channel 1..16> " +
+                                      "<voltage range> <end>")
+
+            if source == "Process":
+                if len(value) != 2 or value[1] not in process_metrics:
+                    raise ConfigError(where + "must be <process> <metric>, " +
+                                      "the metric being in " +
+                                      ", ".join(process_metrics))
+
+
+def read_triggers(config_file_dic):
+    """Return the list of the log_writer.Trigger of the [Trigger] section of
+    a configuration file dictionnary (see validate_config)."""
+    triggers = []
+
+    for name, value in config_file_dic.get(TRIGGER_SECTION, {}).items():
+        rearm = None
+        if len(value) == 5:
+            rearm = float(value[4])
+
+        triggers.append(log_writer.Trigger(name, value[0], value[1],
+                                           float(value[2]), rearm))
+
+    return triggers
+
+
+def source_key(source, value):
+    """Return the key given to a source for the words of a line of its
+    section : the words of a Process line are kept apart."""
+    if source == "Process":
+        return " ".join(value)
+
+    return "".join(value)
+
+
+def split_source_periods(config_file_dic):
+    """
+        Return (channels, periods) : the configuration file dictionnary
+        without the period keys, and the dictionnary of the period of each
+        source which has one.
+    """
+    channels = {}
+    periods = {}
+
+    for section, dic_to_log in config_file_dic.items():
+        if section in SOURCES and SOURCE_PERIOD_KEY in dic_to_log:
+            periods[section] = float(dic_to_log[SOURCE_PERIOD_KEY][0])
+            dic_to_log = OrderedDict((key, value)
+                                     for key, value in dic_to_log.items()
+                                     if key != SOURCE_PERIOD_KEY)
+
+        channels[section] = dic_to_log
+
+    return (channels, periods)
+
+
+def _close_source(source_object):
+    """Close the object sampling a source, if it has a close method (see
+    proc_sources)."""
+    close = getattr(source_object, "close", None)
+    if close is not None:
+        close()
+
+
+def round_time(value, decimal):
+    """Return a time rounded to decimal digits, or unchanged if decimal is
+    None (binary outputs keep the full precision of the time)."""
+    if decimal is None or value is None:
+        return value
+
+    return round(value, decimal)
+
+
+def open_stats_writer(output):
+    """Return a log_writer.BatchedWriter of the statistics file of an output,
+    <output>.stats, so that the sampling thread never waits for the disk.
+    Exit if it cannot be opened."""
+    try:
+        stats_file = open(output + ".stats", "w")
+    except IOError:
+        print "ERROR : File", output + ".stats", "cannot be oppened."
+        sys.exit()
+
+    return log_writer.BatchedWriter(stats_file, block=False)
+
+
+# Clock of the scheduler (see timing.monotonic)
+monotonic = timing.monotonic
+
+
+class DeadlineScheduler(object):
+
+    """
+        Periodic scheduler running on absolute monotonic deadlines.
+        Deadlines are t_start + k * period, so the time spent between two
+        calls to wait does not shift the next ticks.
+        A tick starting after its deadline is an overrun, handled according to
+        the missed deadline policy (see MISSED_DEADLINE_POLICIES).
+    """
+
+    def __init__(self, period, policy=DEFAULT_MISSED_DEADLINE,
+                 clock=monotonic):
+        """
+            - period : Period between two ticks, in seconds
+            - policy (optional) : Missed deadline policy
+            - clock (optional) : Monotonic clock function
+        """
+        if policy not in MISSED_DEADLINE_POLICIES:
+            raise ValueError("Unknown missed deadline policy \"" + policy +
+                             "\". Must be in " +
+                             ", ".join(MISSED_DEADLINE_POLICIES))
+
+        self.period = period
+        self.policy = policy
+        self.clock = clock
+        self.deadline = None
+        self.ticks = 0
+        self.overruns = 0
+        self.skipped = 0
+        self.max_lateness = 0.0
+
+    def start(self, t_start=None):
+        """Reset counters and put the first deadline one period from now."""
+        if t_start is None:
+            t_start = self.clock()
+
+        self.deadline = t_start + self.period
+        self.ticks = 0
+        self.overruns = 0
+        self.skipped = 0
+        self.max_lateness = 0.0
+
+    def _handle_lateness(self, now):
+        """Count an overrun if now is after the deadline, and move the
+        deadline according to the policy."""
+        lateness = now - self.deadline
+
+        if lateness > 0:
+            self.overruns += 1
+            self.max_lateness = max(self.max_lateness, lateness)
+
+            # A tick less than a period late is still fired, late
+            if self.policy == "skip" and lateness >= self.period:
+                missed = int(lateness // self.period)
+                self.skipped += missed
+                self.deadline += missed * self.period
+            elif self.policy == "stretch":
+                self.deadline = now
+
+    def _fire(self):
+        """Return the current deadline, and go to the next one."""
+        fired = self.deadline
+        self.deadline += self.period
+        self.ticks += 1
+
+        return fired
+
+    def wait(self):
+        """Sleep until the next deadline, and return this deadline."""
+        self._handle_lateness(self.clock())
+
+        remaining = self.deadline - self.clock()
+        if remaining > 0:
+            time.sleep(remaining)
+
+        return self._fire()
+
+
+class MultiRateScheduler(object):
+
+    """
+        Scheduler serving several periods, each one on its own grid of
+        absolute deadlines (see DeadlineScheduler). A tick fires at the next
+        deadline of any period, and due gives the periods of this tick.
+        Counters are the sums of the counters of each period.
+    """
+
+    def __init__(self, periods, policy=DEFAULT_MISSED_DEADLINE,
+                 clock=monotonic):
+        """
+            - periods : List of periods, in seconds
+            - policy (optional) : Missed deadline policy
+            - clock (optional) : Monotonic clock function
+        """
+        self.periods = list(periods)
+        self.period = min(self.periods)
+        self.clock = clock
+        self.schedulers = [DeadlineScheduler(period, policy, clock)
+                           for period in self.periods]
+        self.due = []
+
+    def start(self, t_start=None):
+        """Reset counters and start every period at the same time."""
+        if t_start is None:
+            t_start = self.clock()
+
+        for scheduler in self.schedulers:
+            scheduler.start(t_start)
+
+    def wait(self):
+        """
+            Sleep until the next deadline of any period, and return this
+            deadline. due is then the list of the indexes of the periods
+            firing at this deadline.
+        """
+        now = self.clock()
+        for scheduler in self.schedulers:
+            scheduler._handle_lateness(now)
+
+        fired = min(scheduler.deadline for scheduler in self.schedulers)
+
+        remaining = fired - self.clock()
+        if remaining > 0:
+            time.sleep(remaining)
+
+        self.due = []
+        for index, scheduler in enumerate(self.schedulers):
+            if scheduler.deadline <= fired + RATE_TOLERANCE:
+                scheduler._fire()
+                self.due.append(index)
+
+        return fired
+
+    @property
+    def ticks(self):
+        """Number of ticks of every period."""
+        return sum(scheduler.ticks for scheduler in self.schedulers)
+
+    @property
+    def overruns(self):
+        """Number of late ticks of every period."""
+        return sum(scheduler.overruns for scheduler in self.schedulers)
+
+    @property
+    def skipped(self):
+        """Number of skipped ticks of every period."""
+        return sum(scheduler.skipped for scheduler in self.schedulers)
+
+    @property
+    def max_lateness(self):
+        """Maximum lateness of every period, in seconds."""
+        return max(scheduler.max_lateness for scheduler in self.schedulers)
+
+
+class SamplingPlan(namedtuple("SamplingPlan",
+                              ["sources", "headers", "row_format", "record"])):
+
+    """
+        Immutable description of a sample, compiled once from the
+        configuration file dictionnary.
+        - sources : Tuple of (source, keys), in sampling order. keys is the
+          tuple of keys given to the source (ALMemory keys, CPU load names...)
+        - headers : Tuple of column names, beginning with "Time"
+        - row_format : Format string building a row from a tuple of values
+        - record : struct.Struct packing a tuple of values into a binary
+          record
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def from_headers(cls, headers):
+        """Return a plan without sources, only encoding rows of headers."""
+        return cls((), tuple(headers), ",".join(["%r"] * len(headers)),
+                   struct.Struct(log_writer.BINARY_BYTE_ORDER +
+                                 log_writer.BINARY_TYPE * len(headers)))
+
+    @classmethod
+    def from_config(cls, config_file_dic, source_timestamps=False):
+        """
+            Compile the configuration file dictionnary into a plan.
+            If source_timestamps is True, a "<Source>Time" column is put
+            before the columns of each source.
+        """
+        sources = []
+        headers = ["Time"]
+
+        for probe, dic_to_log in config_file_dic.items():
+            if probe not in SOURCES:
+                continue
+
+            keys = tuple(source_key(probe, value)
+                         for value in dic_to_log.values())
+            sources.append((probe, keys))
+            if source_timestamps is True:
+                headers.append(probe + "Time")
+            headers.extend(dic_to_log.keys())
+
+        plan = cls.from_headers(headers)
+
+        return plan._replace(sources=tuple(sources))
+
+    def encode(self, values):
+        """Return the text row (without end of line) of a list of values."""
+        return (self.row_format % tuple(values)).replace(" ", "")
+
+    def encode_line(self, values):
+        """Return the text line of a list of values."""
+        return (self.row_format % tuple(values)).replace(" ", "") + "\n"
+
+    def encode_sparse(self, values):
+        """Return the text row of a list of values, None values being empty
+        fields."""
+        return ",".join("" if value is None else repr(value)
+                        for value in values).replace(" ", "")
+
+    def encode_sparse_line(self, values):
+        """Return the text line of a list of values, None values being empty
+        fields."""
+        return self.encode_sparse(values) + "\n"
+
+    def pack(self, values):
+        """
+            Return the binary record of a list of values. Values which are
+            not numbers (None, strings ...) are written as NaN.
+        """
+        try:
+            return self.record.pack(*values)
+        except struct.error:
+            floats = []
+            for value in values:
+                try:
+                    floats.append(float(value))
+                except (TypeError, ValueError):
+                    floats.append(float("nan"))
+
+            return self.record.pack(*floats)
+
+
+class BurstStream(object):
+
+    """
+        Samples buffered by a device in burst mode, read all at once at each
+        tick. Timestamps are derived from the device : sample number k is at
+        t_run + k * interval, t_run being when the device started.
+        When the buffer of the device overflows, samples are lost and these
+        timestamps would drift : the overflow is counted in overflows, and
+        the time base is reset so that the last sample read is now.
+        Bursts are written to their own output, one line per device sample.
+    """
+
+    def __init__(self, source, headers, t_run, interval, buffer_size=None,
+                 clock=monotonic):
+        """
+            - source : Name of the source (TC08, ADC24)
+            - headers : Column names, beginning with "Time"
+            - t_run : Monotonic time when the device started
+            - interval : Sampling interval of the device, in seconds
+            - buffer_size (optional) : Number of conversions (samples of
+              every channel) the device buffers, if known
+            - clock (optional) : Clock of t_run
+        """
+        self.source = source
+        self.headers = tuple(headers)
+        self.t_run = t_run
+        self.interval = interval
+        self.buffer_size = buffer_size
+        self.clock = clock
+        self.count = 0
+        self.overflows = 0
+        self.plan = SamplingPlan.from_headers(headers)
+        self.writer = None
+        self.encode = None
+
+    def _check_overflow(self, nb_samples, nb_channels):
+        """Count an overflow of the buffer of the device, and reset the time
+        base, if the device buffer was full or if the last of nb_samples
+        new samples is older than the time of the device."""
+        if nb_samples == 0:
+            return
+
+        now = self.clock()
+        t_last = self.t_run + (self.count + nb_samples - 1) * self.interval
+        full = self.buffer_size is not None and \
+            nb_samples * nb_channels >= self.buffer_size
+
+        if full or now - t_last > self.interval + BURST_TIME_TOLERANCE:
+            if self.overflows == 0:
+                sys.stderr.write("multi_logger.py WARNING : The buffer of " +
+                                 self.source + " overflowed, samples were " +
+                                 "lost.\n")
+
+            self.overflows += 1
+            self.t_run = now - (self.count + nb_samples - 1) * self.interval
+
+    def split(self, values_dic, t_zero, decimal):
+        """
+            Turn the values returned by the device (one list of samples per
+            channel) into one row per sample, write them, and return the last
+            value of each channel (None if a channel has no new sample).
+            Times are rounded to decimal digits (not rounded if None).
+        """
+        channels = []
+        for value in values_dic.values():
+            if isinstance(value, (list, tuple)):
+                channels.append(value)
+            else:
+                channels.append([value])
+
+        nb_samples = max([len(channel) for channel in channels] or [0])
+        self._check_overflow(nb_samples, len(channels))
+
+        if self.writer is not None:
+            t_first = self.t_run + self.count * self.interval - t_zero
+            for index in range(nb_samples):
+                row = [round_time(t_first + index * self.interval, decimal)]
+                for channel in channels:
+                    if index < len(channel):
+                        row.append(channel[index])
+                    else:
+                        row.append(None)
+
+                self.writer.write(self.encode(row))
+
+        self.count += nb_samples
+
+        return [channel[-1] if channel else None for channel in channels]
+
+    def close(self):
+        """Close the output of the bursts."""
+        if self.writer is not None:
+            self.writer.close()
+
+
+class ConcurrentAcquisition(object):
+
+    """
+        Sample several sources in parallel, with one worker thread per source.
+        A tick waits for the sources called at this tick, until they all
+        answered or the timeout is reached. A source still busy with a
+        previous call is not called again : its late values are given at the
+        first tick after they arrive, with their own timestamp. Sources which
+        have no new values (or which failed) get None values.
+    """
+
+    def __init__(self, samplers, widths, timeout, clock=monotonic):
+        """
+            - samplers : Functions returning the list of values of a source
+            - widths : Number of values returned by each sampler
+            - timeout : Maximum duration of a tick, in seconds
+            - clock (optional) : Clock used for the timestamps
+        """
+        self.samplers = samplers
+        self.widths = widths
+        self.timeout = timeout
+        self.clock = clock
+        self.timeouts = [0] * len(samplers)
+        self.errors = [0] * len(samplers)
+
+        self._tick = 0
+        self._condition = threading.Condition()
+        self._results = [(None, None, None)] * len(samplers)
+        self._busy = [False] * len(samplers)
+        self._requests = [Queue() for _ in samplers]
+
+        for index in range(len(samplers)):
+            worker = threading.Thread(target=self._work, args=(index,))
+            worker.daemon = True
+            worker.start()
+
+    def _work(self, index):
+        """Call the sampler <index> each time a tick is requested."""
+        sampler = self.samplers[index]
+        requests = self._requests[index]
+
+        while True:
+            tick = requests.get()
+            if tick is None:
+                return
+
+            try:
+                values = list(sampler())
+            except Exception:
+                values = None
+
+            timestamp = self.clock()
+
+            with self._condition:
+                if values is None:
+                    self.errors[index] += 1
+                    timestamp = None
+
+                self._results[index] = (tick, timestamp, values)
+                self._busy[index] = False
+                self._condition.notify_all()
+
+    def acquire(self, indexes=None):
+        """
+            Sample every source (or the sources of indexes). Return a list of
+            (timestamp, values), one per source. timestamp is the clock value
+            when the source answered, or None if the source has no new values.
+        """
+        self._tick += 1
+        tick = self._tick
+
+        with self._condition:
+            requested = []
+            for index, requests in enumerate(self._requests):
+                if indexes is not None and index not in indexes:
+                    continue
+
+                if not self._busy[index]:
+                    self._busy[index] = True
+                    requests.put(tick)
+                    requested.append(index)
+
+            deadline = self.clock() + self.timeout
+            while True:
+                pending = [index for index in requested
+                           if self._results[index][0] != tick]
+                remaining = deadline - self.clock()
+
+                if not pending or remaining <= 0:
+                    break
+
+                # Condition.wait(remaining) would poll (see timing)
+                timing.timed_wait(self._condition, remaining)
+
+            for index in pending:
+                self.timeouts[index] += 1
+
+            results = []
+            for index, (result_tick, timestamp, values) in \
+                    enumerate(self._results):
+                if result_tick is None or values is None:
+                    results.append((None, [None] * self.widths[index]))
+                else:
+                    results.append((timestamp, values))
+
+                # Each result is given only once
+                self._results[index] = (result_tick, None, None)
+
+        return results
+
+    def close(self):
+        """Stop the worker threads, once their pending call returned."""
+        for requests in self._requests:
+            requests.put(None)
+
 
 class Logger(object):
 
@@ -81,15 +839,122 @@ class Logger(object):
         decimal=DEFAULT_DECIMAL,
         rt_plot=DEFAULT_RT_PLOT,
         class_getter=DEFAULT_CLASS_GETTER,
-        queue_size=DEFAULT_QUEUE_SIZE):
+        queue_size=DEFAULT_QUEUE_SIZE,
+        missed_deadline=DEFAULT_MISSED_DEADLINE,
+        acquisition=DEFAULT_ACQUISITION,
+        acquisition_timeout=None,
+        flush_interval=log_writer.DEFAULT_FLUSH_INTERVAL,
+        fsync=log_writer.DEFAULT_FSYNC,
+        output_format=DEFAULT_OUTPUT_FORMAT,
+        compression=log_writer.DEFAULT_COMPRESSION,
+        rotate_size=None,
+        rotate_time=None,
+        index_interval=None,
+        history_size=DEFAULT_HISTORY_SIZE,
+        init_timeout=DEFAULT_INIT_TIMEOUT,
+        reload_config=DEFAULT_RELOAD_CONFIG,
+        rate_output=DEFAULT_RATE_OUTPUT,
+        change_only=DEFAULT_CHANGE_ONLY,
+        keyframe_period=log_writer.DEFAULT_KEYFRAME_PERIOD,
+        trigger=DEFAULT_TRIGGER,
+        pre_trigger=log_writer.DEFAULT_PRE_TRIGGER,
+        post_trigger=log_writer.DEFAULT_POST_TRIGGER,
+        hold_off=0.0,
+        aggregate_samples=None,
+        aggregate_time=None,
+        raw_columns=None,
+        stats_period=None,
+        stream_buffer=log_stream.DEFAULT_CLIENT_BUFFER_SIZE,
+        stream_policy=log_stream.DEFAULT_STREAM_POLICY,
+        plot_rate=plot_channel.DEFAULT_PLOT_RATE,
+        shared_history=None,
+        replay=None,
+        replay_speed=DEFAULT_REPLAY_SPEED):
         """
             Initialize the logger.
             - robot_ip : IP adress of the robot
               (Examples : "bn10.local" or "127.0.0.1")
             - config_file_path (optional) : Path of the configuration file
             - sample_period (optional) : Sample period
-            - output (optional) : Output where results will be written
+            - output (optional) : Output where results will be written.
+              "Console", a file path, a socket address (tcp://HOST:PORT or
+              unix:///PATH, see log_stream) or None to write nothing
             - decimal (optional) : Number of decimal for the Time variable
+            - missed_deadline (optional) : What to do when a sample is late,
+              "skip", "catch_up" or "stretch" (see MISSED_DEADLINE_POLICIES)
+            - acquisition (optional) : "sequential" or "concurrent" sampling
+              of the sources (see ACQUISITION_MODES)
+            - acquisition_timeout (optional) : In concurrent acquisition,
+              maximum time waited for the sources at each sample
+              (default: half of sample_period)
+            - flush_interval (optional) : Maximum time between two flushes of
+              the output file, in seconds
+            - fsync (optional) : When the output file is synchronised to the
+              disk, "never", "flush" or "close" (see log_writer.FSYNC_POLICIES)
+            - output_format (optional) : Format of the output file, "text" or
+              "binary" (see OUTPUT_FORMATS)
+            - compression (optional) : Compression of the output file, "none",
+              "gzip", "bz2" or "lzma" (see log_writer.COMPRESSIONS)
+            - rotate_size (optional) : Start a new output file when the
+              current one reaches this size, in bytes
+            - rotate_time (optional) : Start a new output file when the
+              current one is older than this duration, in seconds
+            - index_interval (optional) : Write the index of each text output
+              file, with an entry every index_interval seconds (see
+              log_writer.RotatingFile and log_reader.TextLog)
+            - history_size (optional) : With class_getter, number of samples
+              kept in history (see ring_buffer.RingBuffer)
+            - init_timeout (optional) : Maximum time for the initialisation
+              of the sources, in seconds
+            - reload_config (optional) : If True, changes of the configuration
+              file are applied while logging (see reload_config_file)
+            - rate_output (optional) : When sources have their own period
+              ("period" key of their section), "sparse" or "streams" output
+              (see RATE_OUTPUTS)
+            - change_only (optional) : If True, only the values which changed
+              by more than their deadband ([Deadband] section of the
+              configuration file) are written (see log_writer.ChangeFilter)
+            - keyframe_period (optional) : With change_only, maximum time
+              between two full lines, in seconds
+            - trigger (optional) : If True, only the samples around the events
+              of the triggers ([Trigger] section of the configuration file)
+              are written (see log_writer.TriggeredCapture)
+            - pre_trigger (optional) : With trigger, time written before each
+              event, in seconds
+            - post_trigger (optional) : With trigger, time written after each
+              event, in seconds
+            - hold_off (optional) : With trigger, minimum time between two
+              events, in seconds
+            - aggregate_samples (optional) : Write the min, max, mean, std,
+              count and last value of each column over blocks of this number
+              of samples, instead of every sample (see
+              aggregation.Aggregator)
+            - aggregate_time (optional) : Same as aggregate_samples, over
+              blocks of this duration, in seconds
+            - raw_columns (optional) : With aggregation, columns also written
+              for every sample, in <output>_raw<extension>
+            - stats_period (optional) : Write the statistics of the logger
+              (see stats) every stats_period seconds : one JSON line in
+              <output>.stats, or a summary line on stderr for the console
+            - stream_buffer (optional) : With a socket output, maximum number
+              of samples waiting for each subscriber
+            - stream_policy (optional) : With a socket output, what to do with
+              a slow subscriber, "drop" or "downsample" (see
+              log_stream.STREAM_POLICIES)
+            - plot_rate (optional) : With rt_plot, maximum number of points
+              sent to the real time plot per second. Samples between two
+              points are coalesced (see plot_channel.PlotChannel)
+            - shared_history (optional) : ring_buffer.SharedRingBuffer with
+              the columns of the logger, used as history instead of a history
+              of its own (implies class_getter, see logger_process)
+            - replay (optional) : Path of a log file of multi_logger, whose
+              samples are given again to the real time plot, the history and
+              the output instead of sampling the sources. The columns are the
+              ones of the file, the configuration file only gives the
+              [Deadband] and [Trigger] sections (see log_replay)
+            - replay_speed (optional) : With replay, speed of the replay : 1
+              is the time of the file, 50 is 50 times faster, 0 is as fast as
+              possible
         """
 
         self.robot_ip = robot_ip
@@ -97,14 +962,35 @@ class Logger(object):
         self.sample_period = sample_period
         self.output = output
         self.decimal = decimal
-        self.class_getter = class_getter
-        self.config_file_dic = self._read_config_file(self.config_file_path)
-        self.loggers_config_file_dic = self._read_config_file(
-            LOGGERS_CONFIG_FILE)
+        self.class_getter = class_getter or shared_history is not None
+        self.shared_history = shared_history
+        self.reload_config = reload_config
+        self.init_timeout = init_timeout
+        self.history_size = history_size
+
+        try:
+            config_file_dic = read_config_file(self.config_file_path)
+            validate_config(config_file_dic)
+            (self.config_file_dic, self.source_periods) = \
+                split_source_periods(config_file_dic)
+            self.loggers_config_file_dic = read_config_file(
+                LOGGERS_CONFIG_FILE)
+        except ConfigError as error:
+            print "multi_logger.py ERROR : " + str(error)
+            sys.exit()
+
         self.has_to_log = True
+        self.log_thread = None
+        self.writer = None
         self.max_queue_size = queue_size
-        self.queue = Queue(maxsize=self.max_queue_size)
+        self.history = None
+        self._data_subscription = None
         self.rt_plot = rt_plot
+
+        # rt_plot given to log (with the console, nothing is printed while
+        # plotting)
+        self.log_rt_plot = rt_plot
+        self.plot_channel = None
         if self.rt_plot is True:
             try:
                 import easy_plot_connection
@@ -113,332 +999,1703 @@ class Logger(object):
                 message = "Impossible to import easy_plot_connection library"
                 raise ImportError(message)
 
-        if output != "Console":
-            try:
-                self.log_file = open(output, "w")
-            except IOError:
-                print "ERROR : File", output, "cannot be oppened."
+            if plot_rate <= 0:
+                print "multi_logger.py ERROR : Plot rate must be positive."
                 sys.exit()
 
-        # Initialise CPU Load logger if need to do it
-        if "CPULoad" in self.config_file_dic.keys():
-            from cpu_interrupt_manager import CpuLoad
-            self.cpu_load = CpuLoad()
+        if output_format not in OUTPUT_FORMATS:
+            print "multi_logger.py ERROR : Output format \"" + \
+                str(output_format) + "\" must be in " + \
+                ", ".join(OUTPUT_FORMATS) + "."
+            sys.exit()
+
+        if output == "Console" and output_format == "binary":
+            print "multi_logger.py ERROR : Binary format needs an output file."
+            sys.exit()
+
+        # Samples are always sent as binary records on a socket
+        if log_stream.is_stream_address(output):
+            output_format = "binary"
+
+        if rate_output not in RATE_OUTPUTS:
+            print "multi_logger.py ERROR : Rate output \"" + \
+                str(rate_output) + "\" must be in " + \
+                ", ".join(RATE_OUTPUTS) + "."
+            sys.exit()
+
+        self.output_format = output_format
+        self.rate_output = rate_output
+
+        # Times are rounded to decimal digits for text outputs only
+        self.time_decimal = None if output_format == "binary" else decimal
+        self.change_only = change_only
+        self.keyframe_period = keyframe_period
+        self.trigger = trigger
+        self._capture_options = (pre_trigger, post_trigger, hold_off)
+        self.capture = None
+        self.event_writer = None
+        self.aggregate_samples = aggregate_samples
+        self.aggregate_time = aggregate_time
+        self.raw_columns = raw_columns or []
+        self.aggregator = None
+        self.raw_writer = None
+
+        # Self instrumentation (see stats)
+        self.stats_period = stats_period
+        self.stats_writer = None
+        self.source_latency = OrderedDict()
+        self.tick_lateness = log_stats.Histogram()
+        self._subscriptions = []
+        self.acquisition_mode = acquisition
+
+        if acquisition not in ACQUISITION_MODES:
+            print "multi_logger.py ERROR : Acquisition mode \"" + \
+                str(acquisition) + "\" must be in " + \
+                ", ".join(ACQUISITION_MODES) + "."
+            sys.exit()
+
+        self.replay = None
+        self.replay_latency = log_stats.Histogram()
+        if replay is not None:
+            try:
+                import log_replay
+            except ImportError:
+                message = "Impossible to import numpy library"
+                raise ImportError(message)
 
-        # Initialise Interrupts if need to do it
-        if "Interrupts" in self.config_file_dic.keys():
-            from cpu_interrupt_manager import Interrupts
-            self.interrupts = Interrupts()
+            if reload_config is True:
+                print "multi_logger.py ERROR : The configuration file " + \
+                    "cannot be reloaded with a replay."
+                sys.exit()
 
-        # Initialize ALMemory if need to do it
-        if "ALMemory" in self.config_file_dic.keys():
-            from naoqi import ALProxy
-            self.mem = ALProxy("ALMemory", robot_ip, 9559)
+            try:
+                self.replay = log_replay.ReplaySource(replay, replay_speed,
+                                                      monotonic)
+            except (IOError, ValueError) as error:
+                print "multi_logger.py ERROR : " + str(error) + "."
+                sys.exit()
 
-        # Initialize TC08 if need to do it
-        if "TC08" in self.config_file_dic.keys():
-            import picolog_tc08_manager
+            # The file gives the columns, there is no source to sample
+            self.plan = SamplingPlan.from_headers(self.replay.columns)
+            self.source_periods = {}
+        else:
+            self.plan = SamplingPlan.from_config(
+                self.config_file_dic, acquisition == "concurrent")
+        self.headers = list(self.plan.headers)
+        self.rt_headers = list(self.headers)
+        self.rt_headers.remove("Time")
 
-            if "TC08" not in self.loggers_config_file_dic.keys():
-                print "multi_logger.py ERROR : You want to use TC08 " + \
-                    "logger but there is no section for it in probs_config.cfg"
+        if self.rt_plot is True:
+            self.plot_channel = plot_channel.PlotChannel(
+                self.plot_server, self.rt_headers, plot_rate)
+
+        # One tick grid per period : a single period keeps the plain
+        # scheduler, several periods need a multi-rate one
+        self.periods = sorted(set(self._plan_periods(self.plan,
+                                                     self.source_periods)))
+        if not self.periods:
+            self.periods = [sample_period]
+
+        self.multi_rate = len(self.periods) > 1
+        if self.multi_rate:
+            self.scheduler = MultiRateScheduler(self.periods, missed_deadline)
+        else:
+            self.scheduler = DeadlineScheduler(self.periods[0],
+                                               missed_deadline)
+
+        self.acquisition_timeout = acquisition_timeout
+        if acquisition_timeout is None:
+            self.acquisition_timeout = self.periods[0] / 2.0
+
+        self.rate_writers = []
+        self._build_rates()
+
+        if self.multi_rate and rate_output == "streams" and \
+                (output == "Console" or log_stream.is_stream_address(output)):
+            print "multi_logger.py ERROR : Streams rate output needs an " + \
+                "output file."
+            sys.exit()
+
+        if trigger is True:
+            if not self.config_file_dic.get(TRIGGER_SECTION):
+                print "multi_logger.py ERROR : Triggered capture needs a [" + \
+                    TRIGGER_SECTION + "] section in the configuration file."
                 sys.exit()
 
-            dic_tc08 = self.loggers_config_file_dic["TC08"]
+            try:
+                self.capture = self._new_capture(self.config_file_dic,
+                                                 self.headers)
+            except ValueError as error:
+                print "multi_logger.py ERROR : " + str(error) + "."
+                sys.exit()
 
-            if "NoiseRejection" not in dic_tc08.keys():
-                print "multi_logger.py ERROR : Key \"NoiseRejection\" has " + \
-                    " to be in the \"TC08\" section of \"probs_config.cfg\"."
+            # Events are written on stderr by a writer thread, not by the
+            # sampling thread
+            self.event_writer = log_writer.BatchedWriter(
+                os.fdopen(os.dup(sys.stderr.fileno()), "w"),
+                flush_interval=0.0, block=False)
+
+        self.output_plan = self.plan
+        self._raw_plan = SamplingPlan.from_headers(["Time"])
+        if aggregate_samples is not None or aggregate_time is not None:
+            if self.multi_rate and rate_output == "streams":
+                print "multi_logger.py ERROR : Aggregation needs the " + \
+                    "sparse rate output."
                 sys.exit()
 
-            noise_rejection_tc08 = dic_tc08["NoiseRejection"][0]
-
-            # Opening module
-            sys.stdout.write("TC08 : Opening module ... ")
-            sys.stdout.flush()
-            self.tc08 = picolog_tc08_manager.ModuleTc08()
-            sys.stdout.write("OK\n")
-
-            # Setting noise rejection
-            sys.stdout.write("TC08 : Setting noise rejection module ... ")
-            sys.stdout.flush()
-            self.tc08.setMains(noise_rejection_tc08)
-            sys.stdout.write("OK\n")
-
-            # Enabling channels
-            sys.stdout.write("TC08 : Setting channels ... ")
-            sys.stdout.flush()
-            for channel_config in self.config_file_dic["TC08"].values():
-                (channel, thermo_couple_type) = channel_config
-
-                self.tc08.setChannel(int(channel), thermo_couple_type)
-
-            sys.stdout.write("OK\n")
-
-            # Getting minimum sampling interval
-            sys.stdout.write("TC08 : Gettint minimum sampling interval ... ")
-            sys.stdout.flush()
-            minimum_sampling_interval = self.tc08.getMinimumIntervalMs()
-            sys.stdout.write("OK\n")
-
-            # Start logging on TC08
-            sys.stdout.write("TC08 : Run ... ")
-            sys.stdout.flush()
-            self.tc08.run(minimum_sampling_interval)
-            sys.stdout.write("OK\n")
-
-        # Initialize ADC24 if need to do it
-        if "ADC24" in self.config_file_dic.keys():
-            import picolog_adc24_manager
-
-            if "ADC24" not in self.loggers_config_file_dic.keys():
-                print "multi_logger.py ERROR : You want to use ADC24 " + \
-                    "logger but there is no section for it in probs_config.cfg"
+            unknown_columns = [column for column in self.raw_columns
+                               if column not in self.headers]
+            if unknown_columns:
+                print "multi_logger.py ERROR : Unknown raw columns : " + \
+                    ", ".join(unknown_columns) + "."
                 sys.exit()
 
-            dic_adc24 = self.loggers_config_file_dic["ADC24"]
+            try:
+                import aggregation
+            except ImportError:
+                message = "Impossible to import numpy library"
+                raise ImportError(message)
 
-            if "NoiseRejection" not in dic_adc24.keys():
-                print "multi_logger.py ERROR : Key \"NoiseRejection\" has " + \
-                    " to be in the \"ADC24\" section of \"probs_config.cfg\"."
+            try:
+                self._build_aggregation()
+            except ValueError as error:
+                print "multi_logger.py ERROR : " + str(error) + "."
                 sys.exit()
 
-            if "ConversionTime" not in dic_adc24.keys():
-                print "multi_logger.py ERROR : Key \"ConversionTime\" has " + \
-                    " to be in the \"ADC24\" section of \"probs_config.cfg\"."
+        if self.class_getter is True:
+            try:
+                import ring_buffer
+            except ImportError:
+                message = "Impossible to import numpy library"
+                raise ImportError(message)
+
+            if shared_history is not None and \
+                    shared_history.headers != self.headers:
+                print "multi_logger.py ERROR : The shared history does not " + \
+                    "have the columns of the configuration file."
                 sys.exit()
 
-            noise_rejection_adc24 = dic_adc24["NoiseRejection"][0]
-            conversion_time = dic_adc24["ConversionTime"][0]
-
-            # Opening module
-            sys.stdout.write("ADC24 : Opening module ... ")
-            sys.stdout.flush()
-            self.adc24 = picolog_adc24_manager.ModuleAdc24()
-            sys.stdout.write("OK\n")
-
-            # Setting noise rejection
-            sys.stdout.write("ADC24 : Setting noise rejection module ... ")
-            sys.stdout.flush()
-            self.adc24.setMains(noise_rejection_adc24)
-            sys.stdout.write("OK\n")
-
-            # Enabling channels
-            sys.stdout.write("ADC24 : Setting channels ... ")
-            sys.stdout.flush()
-            for channel_config in self.config_file_dic["ADC24"].values():
-                (channel, voltage_range, end) = channel_config
-
-                self.adc24.enableAnalogInChannel(int(channel), voltage_range,
-                                                 end)
-            sys.stdout.write("OK\n")
-
-            # Setting intervals (in SetInterval, periods are set in
-            # milli-seconds)
-            sys.stdout.write("ADC24 : Setting intervals ... ")
-            sys.stdout.flush()
-            self.adc24.setInterval(int(sample_period * 1000), conversion_time)
-
-            sys.stdout.write("OK\n")
-
-            # Start logging on ADC24 (1 sample for each channel at a time,
-            # windowed mode)
-            sys.stdout.write("ADC24 : Run ... ")
-            sys.stdout.flush()
-            self.adc24.run(1, "BM_WINDOW")
+            if shared_history is not None and reload_config is True:
+                print "multi_logger.py ERROR : The configuration file " + \
+                    "cannot be reloaded with a shared history."
+                sys.exit()
 
-            sys.stdout.write("OK\n")
+            self._build_history()
+
+        self._output_options = dict(compression=compression,
+                                    rotate_size=rotate_size,
+                                    rotate_time=rotate_time,
+                                    index_interval=index_interval,
+                                    flush_interval=flush_interval,
+                                    fsync=fsync,
+                                    stream_buffer=stream_buffer,
+                                    stream_policy=stream_policy)
+
+        if output is not None and output != "Console":
+            if self.multi_rate and rate_output == "streams":
+                self.rate_writers = [
+                    self._open_writer(self._companion_output("%gs" % period),
+                                      self._file_header(plan.headers))
+                    for period, plan in zip(self.periods, self.rate_plans)]
+            else:
+                self.writer = self._open_writer(output, self._file_header())
+
+            if self.aggregator is not None and self.raw_columns and \
+                    self._companion_output("raw") is not None:
+                self.raw_writer = self._open_writer(
+                    self._companion_output("raw"),
+                    self._file_header(self._raw_plan.headers))
+
+            if stats_period is not None and \
+                    not log_stream.is_stream_address(output):
+                self.stats_writer = open_stats_writer(output)
+
+        # Check devices configuration before opening anything
+        sources = [source for source, _ in self.plan.sources]
+
+        if "TC08" in sources:
+            self._check_probs_config("TC08", ["NoiseRejection"])
+
+        if "ADC24" in sources:
+            self._check_probs_config("ADC24",
+                                     ["NoiseRejection", "ConversionTime"])
+
+        # Burst samples are written next to an output file only
+        for source in ("TC08", "ADC24"):
+            if source in sources and \
+                    self._device_mode(source) == "burst" and \
+                    (output == "Console" or
+                     log_stream.is_stream_address(output)):
+                print "multi_logger.py ERROR : " + source + " in burst " + \
+                    "mode needs an output file."
+                sys.exit()
 
-            # Waiting ADC24 is ready
-            sys.stdout.write("ADC24 : Wait ready ... ")
-            sys.stdout.flush()
-            while not self.adc24.isReady():
-                pass
+        # Devices in burst mode : (time when the device started, interval,
+        # buffer size or None)
+        self._device_runs = {}
+        for attribute in RELOADABLE_SOURCES.values():
+            setattr(self, attribute, None)
+        self.startup_times = self._init_sources(sources, init_timeout)
+
+        self.burst_streams = {}
+        for source, (t_run, interval, buffer_size) in \
+                self._device_runs.items():
+            stream_headers = ["Time"] + \
+                list(self.config_file_dic[source].keys())
+            stream = BurstStream(source, stream_headers, t_run, interval,
+                                 buffer_size)
+
+            path = self._companion_output(source)
+            if path is not None:
+                stream.writer = self._open_writer(
+                    path, self._file_header(stream_headers))
+                if self.output_format == "binary":
+                    stream.encode = stream.plan.pack
+                else:
+                    stream.encode = stream.plan.encode_line
+
+            self.burst_streams[source] = stream
+
+        self.acquisition = None
+        self._build_acquisition()
+        self._set_encoder()
 
-            sys.stdout.write("OK\n")
+        if output == "Console":
+            if rt_plot == False:
+                print ", ".join(self.output_plan.headers).replace(" ", "")
+        elif output is not None:
+            print "Logging ..."
 
-        self.headers = ["Time"]
-        for probe in self.config_file_dic.values():
-            for key in probe.keys():
-                self.headers.append(key)
+        self.t_zero = monotonic()
 
-        self.rt_headers = list(self.headers)
-        self.rt_headers.remove("Time")
+    def _file_header(self, headers=None):
+        """Return the header of the output file (or of an output file whose
+        columns are headers)."""
+        if headers is None:
+            headers = self.output_plan.headers
 
-        to_write = ", ".join(self.headers).replace(" ", "")
+        if self.output_format == "binary":
+            return log_writer.binary_header(headers)
 
-        if output == "Console":
-            if rt_plot == False:
-                print to_write
+        return ", ".join(headers).replace(" ", "") + "\n"
+
+    def _open_writer(self, path, header):
+        """Open an output file with the output options, and return its
+        BatchedWriter (or a log_stream.StreamServer for a socket address).
+        Exit if it cannot be opened."""
+        options = self._output_options
+
+        if log_stream.is_stream_address(path):
+            try:
+                return log_stream.StreamServer(path, header,
+                                               options["stream_buffer"],
+                                               options["stream_policy"])
+            except (IOError, ValueError) as error:
+                print "multi_logger.py ERROR : Stream " + path + \
+                    " cannot be oppened : " + str(error) + "."
+                sys.exit()
+
+        try:
+            log_file = log_writer.RotatingFile(
+                path, header, options["compression"], options["rotate_size"],
+                options["rotate_time"], options["index_interval"])
+        except IOError:
+            print "ERROR : File", path, "cannot be oppened."
+            sys.exit()
+        except (ValueError, ImportError) as error:
+            print "multi_logger.py ERROR : " + str(error) + "."
+            sys.exit()
+
+        if options["fsync"] not in log_writer.FSYNC_POLICIES:
+            print "multi_logger.py ERROR : fsync policy \"" + \
+                str(options["fsync"]) + "\" must be in " + \
+                ", ".join(log_writer.FSYNC_POLICIES) + "."
+            sys.exit()
+
+        return log_writer.BatchedWriter(
+            log_file, flush_interval=options["flush_interval"],
+            fsync=options["fsync"])
+
+    def _companion_output(self, name):
+        """Return the path of an output file written next to the main one :
+        <root>_<name><ext>, or None if the output is not a file."""
+        if self.output is None or self.output == "Console" or \
+                log_stream.is_stream_address(self.output):
+            return None
+
+        (root, extension) = os.path.splitext(self.output)
+        return root + "_" + name + extension
+
+    def _set_encoder(self):
+        """Choose the function encoding a list of values for the output, and
+        the change only filters."""
+        # A replayed file may have empty values, and a process which is not
+        # running has empty values
+        processes = "Process" in dict(self.plan.sources)
+        sparse = self.multi_rate or self.change_only or \
+            self.replay is not None or processes
+
+        output_plan = self.output_plan
+
+        if self.output is None:
+            self._encode = None
+        elif self.output == "Console":
+            self._encode = output_plan.encode_sparse if sparse else \
+                output_plan.encode
+        elif self.output_format == "binary":
+            self._encode = output_plan.pack
         else:
-            print "Logging ..."
-            self.log_file.write(to_write + "\n")
-            self.log_file.flush()
+            self._encode = output_plan.encode_sparse_line if sparse else \
+                output_plan.encode_line
 
-        self.t_zero = time.time()
+        if self.output_format == "binary":
+            self._raw_encode = self._raw_plan.pack
+        else:
+            self._raw_encode = self._raw_plan.encode_sparse_line
 
-    @classmethod
-    def _list_config_file_sections(cls, config_file_paths):
-        """List all the sections of the probs_config file <config_file_paths>"""
-        probs_config = ConfigParser.ConfigParser()
-        probs_config.optionxform = str
-        probs_config.read(config_file_paths)
+        if self.output_format == "binary":
+            self._rate_encoders = [plan.pack for plan in self.rate_plans]
+        elif self.change_only or processes:
+            self._rate_encoders = [plan.encode_sparse_line
+                                   for plan in self.rate_plans]
+        else:
+            self._rate_encoders = [plan.encode_line
+                                   for plan in self.rate_plans]
+
+        self.change_filter = None
+        self._rate_filters = [None] * len(self.rate_plans)
+
+        if self.change_only:
+            deadbands = dict(
+                (key, float(value[0])) for key, value
+                in self.config_file_dic.get(DEADBAND_SECTION, {}).items())
+            default_deadband = deadbands.pop(DEADBAND_DEFAULT_KEY, 0.0)
+
+            self.change_filter = log_writer.ChangeFilter(
+                output_plan.headers, deadbands, default_deadband,
+                self.keyframe_period)
+            self._rate_filters = [
+                log_writer.ChangeFilter(plan.headers, deadbands,
+                                        default_deadband, self.keyframe_period)
+                for plan in self.rate_plans]
+
+    def _new_capture(self, config_file_dic, headers):
+        """Return the log_writer.TriggeredCapture of the triggers of a
+        configuration file, on samples whose columns are headers."""
+        (pre_trigger, post_trigger, hold_off) = self._capture_options
+        return log_writer.TriggeredCapture(
+            headers, read_triggers(config_file_dic), pre_trigger,
+            post_trigger, hold_off)
+
+    def _plan_periods(self, plan, source_periods):
+        """Return the period of each source of a plan."""
+        return [source_periods.get(source, self.sample_period)
+                for source, _ in plan.sources]
+
+    def _build_rates(self):
+        """
+            Group the sources of the plan by period : sources and columns of
+            each period, and the plans of the outputs of each period (columns
+            of its sources, after "Time").
+        """
+        source_periods = self._plan_periods(self.plan, self.source_periods)
+        timestamps = self.acquisition_mode == "concurrent"
+
+        # Columns of each source, in the values of a sample (Time first)
+        source_columns = []
+        column = 1
+        for _, keys in self.plan.sources:
+            width = len(keys) + (1 if timestamps else 0)
+            source_columns.append(range(column, column + width))
+            column += width
+
+        self._rate_sources = []
+        self._rate_columns = []
+        self.rate_plans = []
+        for period in self.periods:
+            sources = [index for index, source_period
+                       in enumerate(source_periods) if source_period == period]
+            columns = [column for index in sources
+                       for column in source_columns[index]]
+
+            self._rate_sources.append(sources)
+            self._rate_columns.append(columns)
+            self.rate_plans.append(SamplingPlan.from_headers(
+                ["Time"] + [self.headers[column] for column in columns]))
+
+    def _build_acquisition(self):
+        """Build the samplers of the plan, and the concurrent acquisition if
+        needed."""
+        if self.acquisition is not None:
+            self.acquisition.close()
+
+        self._samplers = tuple(
+            self._timed(source, self._make_sampler(source, keys))
+            for source, keys in self.plan.sources)
+
+        if self.acquisition_mode == "concurrent" and self.plan.sources:
+            self.acquisition = ConcurrentAcquisition(
+                self._samplers, [len(keys) for _, keys in self.plan.sources],
+                self.acquisition_timeout)
+
+    def _timed(self, source, sampler):
+        """Return sampler, measuring the duration of each call in the latency
+        histogram of the source."""
+        histogram = self.source_latency.setdefault(source,
+                                                   log_stats.Histogram())
+
+        def timed_sampler():
+            """Call the sampler and measure its duration."""
+            start = monotonic()
+            try:
+                return sampler()
+            finally:
+                histogram.add(monotonic() - start)
 
-        return probs_config.sections()
+        return timed_sampler
 
-    @classmethod
-    def _read_config_file_section(cls, config_file_path, section):
+    def _build_aggregation(self):
+        """
+            Build the aggregator of the plan, and the plans of the aggregated
+            output and of the raw output. With concurrent acquisition, the
+            "<Source>Time" columns are not aggregated.
+        """
+        import aggregation
+
+        source_times = set()
+        if self.acquisition_mode == "concurrent":
+            source_times = set(source + "Time"
+                               for source, _ in self.plan.sources)
+
+        self._aggregate_columns = [
+            index for index, header in enumerate(self.headers)
+            if index > 0 and header not in source_times]
+        self._raw_columns = [self.headers.index(column)
+                             for column in self.raw_columns
+                             if column in self.headers]
+
+        self.aggregator = aggregation.Aggregator(
+            ["Time"] + [self.headers[index]
+                        for index in self._aggregate_columns],
+            self.aggregate_samples, self.aggregate_time)
+        self.output_plan = SamplingPlan.from_headers(self.aggregator.headers)
+        self._raw_plan = SamplingPlan.from_headers(
+            ["Time"] + [self.headers[index] for index in self._raw_columns])
+
+    def _build_history(self):
+        """Build the history of the samples, for class_getter."""
+        import ring_buffer
+
+        if self.shared_history is not None:
+            self.history = self.shared_history
+        else:
+            if self.history is not None:
+                self.history.close()
+
+            self.history = ring_buffer.RingBuffer(
+                self.headers, max(self.history_size, self.max_queue_size))
+        self._data_subscription = ring_buffer.Subscription(
+            self.history, self.max_queue_size,
+            lambda row: dict(zip(self.rt_headers, row[1:])))
+
+    def reload_config_file(self):
+        """
+            Read the configuration file again, and apply its changes. Called
+            between two samples when reload_config is True.
+            - ALMemory, CPULoad, Interrupts and Process keys can be added or
+              removed.
+            - TC08 and ADC24 changes need a new initialisation of the device :
+              they are ignored until restart.
+            If the columns change, the output continues in a new file (see
+            log_writer.RotatingFile.set_header), and with class_getter the
+            history restarts : subscriptions have to be created again.
+            Return True if the columns changed.
+        """
+        try:
+            config_file_dic = read_config_file(self.config_file_path)
+            validate_config(config_file_dic)
+            (config_file_dic, source_periods) = \
+                split_source_periods(config_file_dic)
+        except ConfigError as error:
+            print "multi_logger.py WARNING : Configuration file not " + \
+                "reloaded : " + str(error)
+            return False
+
+        initialized = [source for source, _ in self.plan.sources]
+
+        for source in ("TC08", "ADC24"):
+            if config_file_dic.get(source) != \
+                    self.config_file_dic.get(source):
+                print "multi_logger.py WARNING : Changes of " + source + \
+                    " need a restart of the logger, they are ignored."
+
+                if source in initialized:
+                    config_file_dic[source] = self.config_file_dic[source]
+                else:
+                    config_file_dic.pop(source, None)
+
+        plan = SamplingPlan.from_config(
+            config_file_dic, self.acquisition_mode == "concurrent")
+
+        # The tick grids are built at start
+        if not set(self._plan_periods(plan, source_periods)) <= \
+                set(self.periods):
+            print "multi_logger.py WARNING : Configuration file not " + \
+                "reloaded : new periods need a restart of the logger."
+            return False
+
+        # Samples kept before an event are dropped with new triggers or new
+        # columns
+        capture = self.capture
+        if self.capture is not None and (
+                plan.headers != self.plan.headers or
+                config_file_dic.get(TRIGGER_SECTION) !=
+                self.config_file_dic.get(TRIGGER_SECTION)):
+            try:
+                capture = self._new_capture(config_file_dic, plan.headers)
+            except ValueError as error:
+                print "multi_logger.py WARNING : Configuration file not " + \
+                    "reloaded : " + str(error)
+                return False
+
+        if plan.sources == self.plan.sources and \
+                plan.headers == self.plan.headers and \
+                source_periods == self.source_periods:
+            self.config_file_dic = config_file_dic
+            self.capture = capture
+            return False
+
+        # The new sources are built aside : the logger is left as it is if
+        # one of them fails
+        new_sources = {}
+        try:
+            for source, keys in plan.sources:
+                if source not in initialized:
+                    new_sources[source] = self._new_source(
+                        source, __import__(self._source_module(source)),
+                        keys)
+        except Exception as error:
+            for source_object in new_sources.values():
+                _close_source(source_object)
+            print "multi_logger.py WARNING : Configuration file not " + \
+                "reloaded : " + str(error)
+            return False
+
+        # Sources removed from the plan, or replaced by a new object
+        sampled = set(source for source, _ in plan.sources)
+        replaced = []
+        for source, attribute in RELOADABLE_SOURCES.items():
+            if source in new_sources or source not in sampled:
+                if getattr(self, attribute) is not None:
+                    replaced.append(getattr(self, attribute))
+                setattr(self, attribute, new_sources.get(source))
+
+        rate_plans = self.rate_plans
+        raw_plan = self._raw_plan
+
+        # The unfinished block is written with the previous columns
+        if self.aggregator is not None:
+            row = self.aggregator.flush()
+            if row is not None:
+                self._write_output(row)
+
+        self.config_file_dic = config_file_dic
+        self.plan = plan
+        self.capture = capture
+        self.source_periods = source_periods
+        self.headers = list(plan.headers)
+        self.rt_headers = self.headers[1:]
+        if self.plot_channel is not None:
+            self.plot_channel.set_headers(self.rt_headers)
+        self._build_rates()
+        if self.aggregator is not None:
+            self._build_aggregation()
+        else:
+            self.output_plan = plan
+        self._build_acquisition()
+        self._set_encoder()
+
+        if self.history is not None:
+            self._build_history()
+
+        if self.output == "Console":
+            print ", ".join(self.output_plan.headers).replace(" ", "")
+        elif self.writer is not None:
+            self.writer.set_header(self._file_header())
+
+        if self.raw_writer is not None and \
+                self._raw_plan.headers != raw_plan.headers:
+            self.raw_writer.set_header(
+                self._file_header(self._raw_plan.headers))
+
+        for writer, old_plan, new_plan in zip(self.rate_writers, rate_plans,
+                                              self.rate_plans):
+            if new_plan.headers != old_plan.headers:
+                writer.set_header(self._file_header(new_plan.headers))
+
+        # Not sampled anymore : the samplers were built again
+        for source_object in replaced:
+            _close_source(source_object)
+
+        return True
+
+    def _device_mode(self, source):
+        """Return the acquisition mode of a device, "single" or "burst"."""
+        return self.loggers_config_file_dic[source].get("Mode", ["single"])[0]
+
+    def _check_probs_config(self, source, keys):
+        """Exit if <keys> are not in the <source> section of probs_config."""
+        if source not in self.loggers_config_file_dic.keys():
+            print "multi_logger.py ERROR : You want to use " + source + \
+                " logger but there is no section for it in probs_config.cfg"
+            sys.exit()
+
+        for key in keys:
+            if key not in self.loggers_config_file_dic[source].keys():
+                print "multi_logger.py ERROR : Key \"" + key + "\" has " + \
+                    " to be in the \"" + source + "\" section of " + \
+                    "\"probs_config.cfg\"."
+                sys.exit()
+
+        if self._device_mode(source) not in DEVICE_MODES:
+            print "multi_logger.py ERROR : Key \"Mode\" of the \"" + \
+                source + "\" section of \"probs_config.cfg\" must be in " + \
+                ", ".join(DEVICE_MODES) + "."
+            sys.exit()
+
+    def _init_sources(self, sources, timeout):
+        """
+            Initialise the sources in parallel, and return the startup time
+            of each one. Exit if a source fails, or if the sources are not
+            all ready after timeout seconds.
+        """
+        initializers = {"CPULoad": self._init_cpu_load,
+                        "Interrupts": self._init_interrupts,
+                        "ALMemory": self._init_almemory,
+                        "TC08": self._init_tc08,
+                        "ADC24": self._init_adc24,
+                        "Process": self._init_processes}
+
+        # Modules are imported here, in the calling thread : with Python 2,
+        # an import in a thread deadlocks if the Logger is created during an
+        # import.
+        modules = {}
+        for source in sources:
+            modules[source] = __import__(self._source_module(source))
+
+        startup_times = {}
+        errors = {}
+        deadline = monotonic() + timeout
+
+        def init(source):
+            """Initialise a source and measure its startup time."""
+            start = monotonic()
+            try:
+                initializers[source](modules[source], deadline)
+            except Exception as error:
+                errors[source] = error
+                return
+
+            startup_times[source] = monotonic() - start
+            sys.stdout.write(source + " : Ready in " +
+                             str(round(startup_times[source], 3)) + " s\n")
+
+        threads = [threading.Thread(target=init, args=(source,))
+                   for source in sources]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+
+        for thread in threads:
+            thread.join(max(0, deadline - monotonic()))
+
+        for source in sources:
+            if source not in startup_times and source not in errors:
+                errors[source] = "Not ready after " + str(timeout) + " s"
+
+        if errors:
+            for source, error in errors.items():
+                print "multi_logger.py ERROR : " + source + \
+                    " initialisation failed : " + str(error)
+            sys.exit()
+
+        return startup_times
+
+    @staticmethod
+    def _step_done(source, step):
+        """Report a step of the initialisation of a source."""
+        sys.stdout.write(source + " : " + step + " ... OK\n")
+
+    @staticmethod
+    def _wait_ready(is_ready, deadline):
+        """
+            Wait until is_ready() returns True. Sleep between calls, from
+            1 ms up to 50 ms, instead of spinning. Return False if deadline is
+            reached before.
         """
-            Use ConfigParser for reading a configuration file.
-            Returns an dictionnary with keys/values of the section.
+        delay = 0.001
+        while not is_ready():
+            remaining = deadline - monotonic()
+            if remaining <= 0:
+                return False
+
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, 0.05)
+
+        return True
+
+    def _source_module(self, source):
+        """Return the name of the module of a source. Exit if the backend of
+        CPULoad or Interrupts in probs_config.cfg is unknown."""
+        if source not in ("CPULoad", "Interrupts"):
+            return SOURCE_MODULES[source]
+
+        backend = self.loggers_config_file_dic.get(source, {}).get(
+            "Backend", [DEFAULT_BACKEND])[0]
+        if backend not in SOURCE_BACKENDS:
+            print "multi_logger.py ERROR : Key \"Backend\" of the \"" + \
+                source + "\" section of \"probs_config.cfg\" must be in " + \
+                ", ".join(sorted(SOURCE_BACKENDS)) + "."
+            sys.exit()
+
+        return SOURCE_BACKENDS[backend]
+
+    def _source_keys(self, source):
+        """Return the list of the keys of a source in the configuration
+        file."""
+        return [source_key(source, value)
+                for value in self.config_file_dic[source].values()]
+
+    def _new_source(self, source, module, keys):
         """
+            Return a new object sampling a source of RELOADABLE_SOURCES, from
+            its module. For CPULoad, Interrupts and Process, a first call
+            checks the keys (and finds the processes), and starts the
+            measure of the first sample.
+        """
+        if source == "CPULoad":
+            cpu_load = module.CpuLoad()
+            cpu_load.calcLoad(keys)
+            return cpu_load
+
+        if source == "Interrupts":
+            interrupts = module.Interrupts()
+            interrupts.calcInterrupts(keys)
+            return interrupts
+
+        if source == "Process":
+            processes = module.Processes(clock=monotonic)
+            processes.calcProcesses(keys)
+            return processes
+
+        return module.ALProxy("ALMemory", self.robot_ip, 9559)
+
+    def _init_cpu_load(self, cpu_interrupt_manager, deadline):
+        """Initialise CPU Load logger (see _new_source)."""
+        self.cpu_load = self._new_source("CPULoad", cpu_interrupt_manager,
+                                         self._source_keys("CPULoad"))
+
+    def _init_interrupts(self, cpu_interrupt_manager, deadline):
+        """Initialise Interrupts logger (see _new_source)."""
+        self.interrupts = self._new_source("Interrupts",
+                                           cpu_interrupt_manager,
+                                           self._source_keys("Interrupts"))
+
+    def _init_processes(self, proc_sources, deadline):
+        """Initialise Process logger (see _new_source)."""
+        self.processes = self._new_source("Process", proc_sources,
+                                          self._source_keys("Process"))
+
+    def _init_almemory(self, naoqi, deadline):
+        """Initialise ALMemory proxy."""
+        self.mem = self._new_source("ALMemory", naoqi, None)
+
+    def _init_tc08(self, picolog_tc08_manager, deadline):
+        """Open, configure and run TC08."""
+        dic_tc08 = self.loggers_config_file_dic["TC08"]
+        noise_rejection_tc08 = dic_tc08["NoiseRejection"][0]
+
+        self.tc08 = picolog_tc08_manager.ModuleTc08()
+        self._step_done("TC08", "Opening module")
 
-        probs_config = ConfigParser.ConfigParser()
-        probs_config.optionxform = str
-        probs_config.read(config_file_path)
+        self.tc08.setMains(noise_rejection_tc08)
+        self._step_done("TC08", "Setting noise rejection module")
 
-        if probs_config.has_section(section):
-            config_section = probs_config._sections[section]
-            config_section.pop("__name__")
+        for channel_config in self.config_file_dic["TC08"].values():
+            (channel, thermo_couple_type) = channel_config
 
-            for key, value in config_section.items():
-                config_section[key] = value.split()
+            self.tc08.setChannel(int(channel), thermo_couple_type)
 
-            return config_section
+        self._step_done("TC08", "Setting channels")
 
+        minimum_sampling_interval = self.tc08.getMinimumIntervalMs()
+        self._step_done("TC08", "Getting minimum sampling interval")
+
+        self.tc08.run(minimum_sampling_interval)
+        if self._device_mode("TC08") == "burst":
+            self._device_runs["TC08"] = (monotonic(),
+                                         minimum_sampling_interval / 1000.0,
+                                         None)
+        self._step_done("TC08", "Run")
+
+    def _init_adc24(self, picolog_adc24_manager, deadline):
+        """Open, configure and run ADC24, and wait until it is ready."""
+        dic_adc24 = self.loggers_config_file_dic["ADC24"]
+        noise_rejection_adc24 = dic_adc24["NoiseRejection"][0]
+        conversion_time = dic_adc24["ConversionTime"][0]
+
+        self.adc24 = picolog_adc24_manager.ModuleAdc24()
+        self._step_done("ADC24", "Opening module")
+
+        self.adc24.setMains(noise_rejection_adc24)
+        self._step_done("ADC24", "Setting noise rejection module")
+
+        for channel_config in self.config_file_dic["ADC24"].values():
+            (channel, voltage_range, end) = channel_config
+
+            self.adc24.enableAnalogInChannel(int(channel), voltage_range, end)
+
+        self._step_done("ADC24", "Setting channels")
+
+        if self._device_mode("ADC24") == "burst":
+            # Native rate of the converter : one conversion per channel
+            # (conversion_time is HRDL_<milli-seconds>MS)
+            interval = int(conversion_time[len("HRDL_"):-len("MS")]) * \
+                len(self.config_file_dic["ADC24"])
+            buffer_size = int(dic_adc24.get("BufferSize",
+                                            [DEFAULT_BUFFER_SIZE])[0])
+        else:
+            interval = int(self.source_periods.get("ADC24",
+                                                   self.sample_period) * 1000)
+
+        # In SetInterval, periods are set in milli-seconds
+        self.adc24.setInterval(interval, conversion_time)
+        self._step_done("ADC24", "Setting intervals")
+
+        if self._device_mode("ADC24") == "burst":
+            # Streaming mode, the device buffers samples between two reads
+            self.adc24.run(buffer_size, "BM_STREAM")
+            self._device_runs["ADC24"] = (monotonic(), interval / 1000.0,
+                                          buffer_size)
         else:
-            return {}
+            # 1 sample for each channel at a time, windowed mode
+            self.adc24.run(1, "BM_WINDOW")
+        self._step_done("ADC24", "Run")
 
-    def _read_config_file(self, config_file_path):
-        """ Return the dictionnary corresponding to the configuration file."""
-        dic = {}
-        for section in self._list_config_file_sections(config_file_path):
-            dic[section] = self._read_config_file_section(
-                config_file_path, section)
+        if not self._wait_ready(self.adc24.isReady, deadline):
+            raise RuntimeError("ADC24 not ready")
 
-        return dic
+    def _make_sampler(self, source, keys):
+        """Return a function reading the list of values of a source."""
+        keys = list(keys)
 
-    def log1Line(self, rt_plot=True):
-        """Write 1 log line output in file or console."""
+        if source == "CPULoad":
+            calc_load = self.cpu_load.calcLoad
+            return lambda: calc_load(keys)
 
-        elapsed_time = time.time() - self.t_zero
-        elapsed_time_round = round(elapsed_time, self.decimal)
+        if source == "Interrupts":
+            calc_interrupts = self.interrupts.calcInterrupts
+            return lambda: calc_interrupts(keys)
 
-        values = [elapsed_time_round]
+        if source == "Process":
+            calc_processes = self.processes.calcProcesses
+            return lambda: calc_processes(keys)
 
-        for probe, dic_to_log in self.config_file_dic.items():
-            if probe == "CPULoad":
-                cpu_load_keys = ["".join(cpuLoadValue)
-                                 for cpuLoadValue in dic_to_log.values()]
+        if source == "ALMemory":
+            get_list_data = self.mem.getListData
+            return lambda: get_list_data(keys)
 
-                values += self.cpu_load.calcLoad(cpu_load_keys)
+        if source in self.burst_streams:
+            stream = self.burst_streams[source]
+            if source == "TC08":
+                get_values = self.tc08.getValues
+            else:
+                get_values = self.adc24.getValues
 
-            if probe == "Interrupts":
-                interrupts_keys = ["".join(interruptsValue)
-                                   for interruptsValue in dic_to_log.values()]
+            return lambda: stream.split(get_values(), self.t_zero,
+                                        self.time_decimal)
 
-                values += self.interrupts.calcInterrupts(interrupts_keys)
+        if source == "TC08":
+            get_tc08_values = self.tc08.getValues
+            return lambda: get_tc08_values().values()
 
-            if probe == "ALMemory":
-                almemory_keys = ["".join(memoryValue)
-                                 for memoryValue in dic_to_log.values()]
-                values += self.mem.getListData(almemory_keys)
+        get_adc24_values = self.adc24.getValues
+        return lambda: [value[0] for value in get_adc24_values().values()]
 
-            if probe == "TC08":
-                tc08_values_dic = self.tc08.getValues()
-                values += [value for value in tc08_values_dic.values()]
+    def sample(self, sources=None):
+        """
+            Read every source once (or the sources whose indexes are in
+            sources, the others getting None values). Return the list of
+            values, in the order of rt_headers.
+        """
+        values = []
+
+        if self.acquisition is None:
+            for index, sampler in enumerate(self._samplers):
+                if sources is None or index in sources:
+                    values.extend(sampler())
+                else:
+                    values.extend([None] * len(self.plan.sources[index][1]))
+        else:
+            for timestamp, source_values in \
+                    self.acquisition.acquire(sources):
+                if timestamp is not None:
+                    timestamp = round_time(timestamp - self.t_zero,
+                                           self.time_decimal)
 
-            if probe == "ADC24":
-                adc24_values_dic = self.adc24.getValues()
-                values += [value[0] for value in adc24_values_dic.values()]
+                values.append(timestamp)
+                values.extend(source_values)
 
-        to_write = str(values).strip('[]').replace(" ", "")
+        return values
 
-        if self.rt_plot is True or self.class_getter is True:
-            values.pop(0)  #remove time value
+    def emit(self, elapsed_time, values, rt_plot=True, due=None):
+        """
+            Give a sample to the real time plot, the history and the output.
+            - elapsed_time : Time of the sample, since t_zero
+            - values : Values of the sample, in the order of rt_headers
+            - due (optional) : Indexes of the periods sampled (default: all),
+              when there are several periods
+        """
+        values = [round_time(elapsed_time, self.time_decimal)] + values
 
-        if self.rt_plot is True:
-            self.plot_server.add_list_point(elapsed_time,
-                                            zip(self.rt_headers, values))
+        if self.plot_channel is not None:
+            self.plot_channel.put(elapsed_time, values[1:], due is not None)
 
         if self.class_getter is True:
-            dict_to_add = dict(zip(self.rt_headers, values))
-            if not self.queue.full():
-                self.queue.put(dict_to_add)
-            else:
-                self.queue.get()
-                self.queue.put(dict_to_add)
+            self.history.append(values)
+
+        if self.output == "Console" and rt_plot != False:
+            return
+
+        if self.capture is None:
+            self._output_sample(values, due)
+            return
+
+        # Triggered capture : only the samples around the events go on
+        events = len(self.capture.events)
+        samples = self.capture.add(values, (values, due))
+        if len(self.capture.events) > events:
+            (event_time, names) = self.capture.events[-1]
+            self.event_writer.write("multi_logger.py TRIGGER : " +
+                                    ", ".join(names) + " at " +
+                                    str(event_time) + " s\n")
+
+        for (values, due) in samples:
+            self._output_sample(values, due)
+
+    def _output_sample(self, values, due=None):
+        """
+            Give a sample (time first) to the output : aggregated if
+            required, then written.
+            - due (optional) : Indexes of the periods sampled (default: all)
+        """
+        if self.aggregator is not None:
+            if self.raw_writer is not None:
+                self.raw_writer.write(self._raw_encode(
+                    [values[0]] + [values[index]
+                                   for index in self._raw_columns]))
+
+            values = self.aggregator.add(
+                [values[0]] + [values[index]
+                               for index in self._aggregate_columns])
+            if values is None:
+                return
+
+        self._write_output(values, due)
+
+    def _write_output(self, values, due=None):
+        """
+            Write a row (time first) of the output plan to the console or to
+            the output files, through the change only filters.
+            - due (optional) : Indexes of the periods sampled (default: all)
+        """
+        # Columns of the periods sampled for this row (aggregated rows have
+        # every column)
+        sampled = None
+        if due is not None and self.aggregator is None:
+            sampled = set(column for index in due
+                          for column in self._rate_columns[index])
 
         if self.output == "Console":
-            if rt_plot == False:
-                print to_write
-        else:
-            self.log_file.write(to_write + "\n")
-            self.log_file.flush()
-
-    # def log(self):
-    #     """
-    #         Log in file or console.
-    #         Use a threding timer calling itself. If you have a better idea
-    #         to have a periodically not drifting sampling, I am interrested
-    #         in !
-    #     """
-    #     def myTimer(period):
-    #         """Define the timer which let to log periodically."""
-    #         threading.Timer(period, myTimer, [period]).start()
-    #         self.log1Line()
-
-    #     myTimer(self.sample_period)
+            if self.change_filter is not None:
+                values = self.change_filter.filter(values, sampled)
+
+            if values is not None:
+                print self._encode(values)
+        elif self.writer is not None:
+            if self.change_filter is not None:
+                values = self.change_filter.filter(values, sampled)
+
+            if values is not None:
+                self.writer.write(self._encode(values))
+        elif self.rate_writers:
+            if due is None:
+                due = range(len(self.periods))
+
+            for index in due:
+                row = [values[0]] + [values[column] for column
+                                     in self._rate_columns[index]]
+                if self._rate_filters[index] is not None:
+                    row = self._rate_filters[index].filter(row)
+
+                if row is not None:
+                    self.rate_writers[index].write(
+                        self._rate_encoders[index](row))
+
+    def log1Line(self, rt_plot=True, due=None):
+        """
+            Write 1 log line output in file or console.
+            - due (optional) : Indexes of the periods to sample (default: all)
+            With replay, the line is the next sample of the replayed file
+            (nothing at the end of the file, see replay.finished).
+        """
+        if self.replay is not None:
+            row = self.replay.next_row()
+            if row is not None:
+                self.emit(row[0], row[1], rt_plot)
+            return
+
+        sources = None
+        if due is not None:
+            sources = set()
+            for index in due:
+                sources.update(self._rate_sources[index])
+
+        elapsed_time = monotonic() - self.t_zero
+        self.emit(elapsed_time, self.sample(sources), rt_plot, due)
 
     def log(self, rt_plot=False):
         """Log in file or console."""
+        self.log_rt_plot = rt_plot
+
+        # A threading timer calling itself can't catch a Keyboard interrupt
+        # and stop properly picologgers, so a thread sleeps until absolute
+        # deadlines of the scheduler. The sampling duration does not delay
+        # the next samples.
+
+        def loop(scheduler):
+            """Log 1 line at each deadline of the scheduler."""
+            scheduler.start()
+            config_stamp = self._config_stamp()
+            next_check = monotonic() + CONFIG_CHECK_PERIOD
+            next_stats = None
+            if self.stats_period is not None:
+                next_stats = monotonic() + self.stats_period
 
-        # This function uses a sleep.
-        # I tried to use a threding timer calling itself(only way I know on
-        # Python to do a periodically timer). It works fine, but with this way
-        # we can't catch a Keyboard interrupt and stop properly picologgers ...
-        # For the timer implementation, just see "log" above ...
-
-        def loop(period):
-            """Log 1 line and sleep during a period"""
             while self.has_to_log is True:
-                time.sleep(period)
-                self.log1Line(rt_plot)
+                deadline = scheduler.wait()
+                self.tick_lateness.add(max(0.0, monotonic() - deadline))
+
+                if self.multi_rate:
+                    self.log1Line(rt_plot, scheduler.due)
+                else:
+                    self.log1Line(rt_plot)
+
+                if next_stats is not None and monotonic() >= next_stats:
+                    next_stats += self.stats_period
+                    self.write_stats()
+
+                # Between two samples, look for a new configuration file
+                if self.reload_config is True and monotonic() >= next_check:
+                    next_check = monotonic() + CONFIG_CHECK_PERIOD
+                    stamp = self._config_stamp()
+                    if stamp != config_stamp:
+                        config_stamp = stamp
+                        self.reload_config_file()
+
+        def replay_loop():
+            """Give each sample of the replayed file at its time, until the
+            end of the file."""
+            next_stats = None
+            if self.stats_period is not None:
+                next_stats = monotonic() + self.stats_period
+
+            for (row_time, values) in self.replay:
+                if self.has_to_log is not True or \
+                        not self.replay.wait(row_time):
+                    break
+
+                start = monotonic()
+                self.emit(row_time, values, rt_plot)
+                self.replay_latency.add(monotonic() - start)
+
+                if next_stats is not None and monotonic() >= next_stats:
+                    next_stats += self.stats_period
+                    self.write_stats()
+
+        if self.replay is not None:
+            self.log_thread = threading.Thread(target=replay_loop)
+        else:
+            self.log_thread = threading.Thread(target=loop,
+                                               args=(self.scheduler,))
+        self.log_thread.daemon = True
+        self.log_thread.start()
 
-        log_thread = threading.Thread(target=loop, args=(self.sample_period,))
-        log_thread.daemon = True
-        log_thread.start()
+    def stats(self):
+        """
+            Return a dictionnary of statistics of the logger itself :
+            - time : Time since t_zero
+            - ticks, overruns, skipped, max_lateness : Counters of the
+              scheduler (see DeadlineScheduler)
+            - jitter : Summary of the lateness of the ticks (time between the
+              deadline and the sampling), in seconds (see
+              log_stats.Histogram.summary)
+            - sources : For each source, summary of the duration of its calls,
+              its histogram (list of (upper bound, count)), with concurrent
+              acquisition its timeouts and errors, and in burst mode the
+              overflows of the buffer of the device
+            - writers : For each output file, its backlog, max_backlog,
+              backpressure, written and dropped lines, and the error which
+              stopped the writing (or None)
+            - consumers : With class_getter, dropped samples and lag of the
+              get_data queue and of the subscriptions
+            - plot : With rt_plot, samples received by the plot channel,
+              points sent to the plot, samples coalesced and plot errors
+            - trigger : With trigger, the events (list of [time, names of the
+              triggers]), events held off, samples received, samples written
+              and samples kept in memory
+            - replay : With replay, samples replayed, samples per second,
+              speed, maximum lateness on the time of the file, whether the
+              file is finished, and the summary of the duration of each
+              sample after the acquisition (plot, history, trigger,
+              aggregation, encoding and output)
+        """
+        scheduler = self.scheduler
+        stats = {"time": monotonic() - self.t_zero,
+                 "ticks": scheduler.ticks,
+                 "overruns": scheduler.overruns,
+                 "skipped": scheduler.skipped,
+                 "max_lateness": scheduler.max_lateness,
+                 "jitter": self.tick_lateness.summary(),
+                 "sources": {},
+                 "writers": {},
+                 "consumers": {"dropped": 0, "lag": 0, "subscriptions": 0}}
+
+        for source, histogram in self.source_latency.items():
+            source_stats = histogram.summary()
+            source_stats["histogram"] = histogram.buckets()
+            stats["sources"][source] = source_stats
+
+        for source, stream in self.burst_streams.items():
+            if source in stats["sources"]:
+                stats["sources"][source]["overflows"] = stream.overflows
+
+        if self.acquisition is not None:
+            for index, (source, _) in enumerate(self.plan.sources):
+                stats["sources"][source]["timeouts"] = \
+                    self.acquisition.timeouts[index]
+                stats["sources"][source]["errors"] = \
+                    self.acquisition.errors[index]
+
+        writers = [("output", self.writer), ("raw", self.raw_writer)]
+        writers.extend(("%gs" % period, writer) for period, writer
+                       in zip(self.periods, self.rate_writers))
+        writers.extend((source, stream.writer)
+                       for source, stream in self.burst_streams.items())
+
+        for name, writer in writers:
+            if writer is not None:
+                stats["writers"][name] = {
+                    "backlog": writer.backlog,
+                    "max_backlog": writer.max_backlog,
+                    "backpressure": writer.backpressure,
+                    "written": writer.written,
+                    "dropped": writer.dropped,
+                    "error": None if writer.error is None
+                             else str(writer.error)}
+
+        subscriptions = [subscription for subscription in self._subscriptions
+                         if not subscription.closed]
+        if self._data_subscription is not None:
+            subscriptions.append(self._data_subscription)
+
+        consumers = stats["consumers"]
+        for subscription in subscriptions:
+            consumers["dropped"] += subscription.dropped
+            consumers["lag"] = max(consumers["lag"], subscription.lag)
+            consumers["subscriptions"] += 1
+
+        if self.plot_channel is not None:
+            stats["plot"] = {"received": self.plot_channel.received,
+                             "sent": self.plot_channel.sent,
+                             "coalesced": self.plot_channel.coalesced,
+                             "errors": self.plot_channel.errors}
+
+        if self.capture is not None:
+            stats["trigger"] = {"events": list(self.capture.events),
+                                "held_off": self.capture.held_off,
+                                "rows": self.capture.rows,
+                                "written": self.capture.written,
+                                "buffered": self.capture.buffered}
+
+        if self.replay is not None:
+            stats["replay"] = {"rows": self.replay.rows,
+                               "rate": self.replay.rate,
+                               "speed": self.replay.speed,
+                               "max_lateness": self.replay.max_lateness,
+                               "finished": self.replay.finished,
+                               "emit": self.replay_latency.summary()}
+
+        return stats
+
+    def write_stats(self):
+        """Write the statistics : one JSON line in the stats file, or a
+        summary line on stderr."""
+        stats = self.stats()
+
+        if self.stats_writer is not None:
+            self.stats_writer.write(json.dumps(stats) + "\n")
+        else:
+            sys.stderr.write("multi_logger.py STATS : " +
+                             log_stats.stats_line(stats) + "\n")
+
+    def _config_stamp(self):
+        """Return the modification time and size of the configuration
+        file."""
+        try:
+            stat = os.stat(self.config_file_path)
+        except OSError:
+            return None
+
+        return (stat.st_mtime, stat.st_size)
 
     def stop(self):
         """Stop logging."""
         self.has_to_log = False
+        if self.replay is not None:
+            self.replay.stop()
+
+        # Let the sampling thread finish its last line, so that nothing is
+        # written after the output is closed
+        if self.log_thread is not None:
+            self.log_thread.join(self.periods[-1] + 1)
+
+        if self.acquisition is not None:
+            self.acquisition.close()
+
+        # Stop the search of the processes, close the files of /proc
+        for attribute in RELOADABLE_SOURCES.values():
+            if getattr(self, attribute) is not None:
+                _close_source(getattr(self, attribute))
+
+        # The unfinished block of samples
+        if self.aggregator is not None:
+            row = self.aggregator.flush()
+            if row is not None and (self.output != "Console" or
+                                    self.log_rt_plot is False):
+                self._write_output(row)
+
+        if self.writer is not None:
+            self.writer.close()
+
+        if self.raw_writer is not None:
+            self.raw_writer.close()
+
+        if self.stats_writer is not None:
+            self.write_stats()
+            self.stats_writer.close()
+
+        for writer in self.rate_writers:
+            writer.close()
+
+        for stream in self.burst_streams.values():
+            stream.close()
+
+        if self.event_writer is not None:
+            self.event_writer.close()
+
+        if self.plot_channel is not None:
+            self.plot_channel.close()
+
+        # Wake up consumers waiting for data
+        if self.history is not None:
+            self.history.close()
+
+
+    def get_data(self, timeout=None):
+        """
+        Return the next logged line not read yet, as a dictionnary.
+        If more than queue_size lines are not read, the oldest are dropped.
+        Wait at most timeout seconds (forever if None) for a new line.
+        Return None after timeout, or when logging is stopped.
+        """
+        return self._data_subscription.get(timeout)
+
+    def subscribe(self, max_lag=None):
+        """
+        Return a new ring_buffer.Subscription to the logged lines. Each
+        subscription gets every line, as a dictionnary with the "Time" key,
+        and has its own lag and dropped counters.
+        Lines are read with subscription.get(timeout) or by iterating on the
+        subscription, until logging is stopped.
+        """
+        if self.history is None:
+            raise RuntimeError("class_getter must be True to get the data")
+
+        import ring_buffer
+        subscription = ring_buffer.Subscription(
+            self.history, max_lag, lambda row: dict(zip(self.headers, row)))
+
+        # Closed subscriptions are forgotten
+        self._subscriptions = [other for other in self._subscriptions
+                               if not other.closed]
+        self._subscriptions.append(subscription)
+
+        return subscription
+
+    def add_callback(self, callback, max_lag=None):
+        """
+        Call callback with each logged line (as given by subscribe), from a
+        dedicated thread. Return the subscription : close it to unregister
+        the callback.
+        """
+        import ring_buffer
+        subscription = self.subscribe(max_lag)
+        ring_buffer.run_callback(subscription, callback)
+
+        return subscription
+
+
+class LoggerPool(object):
+
+    """
+        Log several robots from one process.
+        Every robot is sampled at the same ticks of a single scheduler, in
+        parallel (one worker thread per robot), so their timestamps are on
+        the same clock and line up.
+        With merge=True, the output gets one "Time" column, then for each
+        robot a "<robot>:Time" column (time when its values were read) and its
+        columns prefixed with "<robot>:". Otherwise, each robot writes its own
+        output, named <root>_<robot><ext> after output.
+        A robot which cannot be initialized is left out. A robot which fails
+        or does not answer in time gets None values (or no line) without
+        delaying the others.
+    """
+
+    def __init__(self, robot_ips, config_file_path=DEFAULT_CONFIG_FILE,
+                 sample_period=DEFAULT_PERIOD, output=DEFAULT_OUTPUT,
+                 decimal=DEFAULT_DECIMAL, merge=True,
+                 missed_deadline=DEFAULT_MISSED_DEADLINE, timeout=None,
+                 **logger_options):
+        """
+            - robot_ips : IP adresses of the robots
+            - config_file_path (optional) : Path of the configuration file,
+              used for every robot
+            - sample_period (optional) : Sample period
+            - output (optional) : Output where results will be written
+            - decimal (optional) : Number of decimal for the Time variable
+            - merge (optional) : One output for every robot, or one output
+              per robot
+            - missed_deadline (optional) : Missed deadline policy
+            - timeout (optional) : Maximum time waited for the robots at each
+              sample (default: half of sample_period)
+            - logger_options (optional) : Other arguments given to the Logger
+              of each robot (output_format, compression ...)
+        """
+        self.sample_period = sample_period
+        self.output = output
+        self.decimal = decimal
+        self.time_decimal = decimal
+        self.merge = merge
+        self.scheduler = DeadlineScheduler(sample_period, missed_deadline)
+        self.has_to_log = True
+        self.log_thread = None
+        self.writer = None
+        self.stats_writer = None
+        self.failed = {}
+
+        # Self instrumentation (see stats) : the statistics of the robots are
+        # written by the pool only
+        self.stats_period = logger_options.pop("stats_period", None)
+        self.tick_lateness = log_stats.Histogram()
+
+        if merge is not True and log_stream.is_stream_address(output):
+            print "multi_logger.py ERROR : A stream output needs the robots" \
+                " to be merged."
+            sys.exit()
+
+        # Only the sampling loop of a Logger applies the changes
+        if logger_options.get("reload_config", DEFAULT_RELOAD_CONFIG):
+            print "multi_logger.py ERROR : The configuration file cannot " + \
+                "be reloaded with several robots."
+            sys.exit()
+
+        # The lines of the robots would be mixed on the console
+        if merge is not True and output == "Console":
+            print "multi_logger.py ERROR : One output per robot needs an " + \
+                "output file."
+            sys.exit()
+
+        if timeout is None:
+            timeout = sample_period / 2.0
+
+        # Robots are initialized one after the other, in the calling
+        # thread : a Logger imports the modules of its sources in the thread
+        # creating it (see Logger._init_sources)
+        loggers = {}
+        for robot_ip in robot_ips:
+            if merge is True:
+                robot_output = None
+            else:
+                robot_output = self._robot_output(robot_ip)
+
+            try:
+                loggers[robot_ip] = Logger(
+                    robot_ip, config_file_path, sample_period, robot_output,
+                    decimal, **logger_options)
+            except (Exception, SystemExit) as error:
+                self.failed[robot_ip] = error
+
+        for robot_ip, error in self.failed.items():
+            print "multi_logger.py ERROR : Robot " + robot_ip + \
+                " is left out : " + str(error)
+
+        self.robot_ips = [robot_ip for robot_ip in robot_ips
+                          if robot_ip in loggers]
+        self.loggers = [loggers[robot_ip] for robot_ip in self.robot_ips]
+
+        if not self.loggers:
+            print "multi_logger.py ERROR : No robot to log."
+            sys.exit()
+
+        try:
+            for logger in self.loggers:
+                self._check_logger(logger)
+        except ConfigError as error:
+            for logger in self.loggers:
+                logger.stop()
+            print "multi_logger.py ERROR : " + str(error)
+            sys.exit()
+
+        self.acquisition = ConcurrentAcquisition(
+            [logger.sample for logger in self.loggers],
+            [len(logger.rt_headers) for logger in self.loggers], timeout)
+
+        self.headers = ["Time"]
+        for robot_ip, logger in zip(self.robot_ips, self.loggers):
+            self.headers.append(robot_ip + ":Time")
+            self.headers.extend(robot_ip + ":" + header
+                                for header in logger.rt_headers)
+
+        self.plan = SamplingPlan.from_headers(self.headers)
+
+        if merge is True and output == "Console":
+            print ",".join(self.headers)
+        elif merge is True and log_stream.is_stream_address(output):
+            self._encode = self.plan.pack
+            self.time_decimal = None
+            try:
+                self.writer = log_stream.StreamServer(
+                    output, log_writer.binary_header(self.headers),
+                    logger_options.get("stream_buffer",
+                                       log_stream.DEFAULT_CLIENT_BUFFER_SIZE),
+                    logger_options.get("stream_policy",
+                                       log_stream.DEFAULT_STREAM_POLICY))
+            except (IOError, ValueError) as error:
+                print "multi_logger.py ERROR : Stream " + output + \
+                    " cannot be oppened : " + str(error) + "."
+                sys.exit()
+        elif merge is True and output is not None:
+            output_format = logger_options.get("output_format",
+                                               DEFAULT_OUTPUT_FORMAT)
+            if output_format == "binary":
+                self._encode = self.plan.pack
+                self.time_decimal = None
+                header = log_writer.binary_header(self.headers)
+            else:
+                self._encode = self.plan.encode_sparse_line
+                header = ",".join(self.headers) + "\n"
+
+            self.writer = log_writer.BatchedWriter(
+                log_writer.RotatingFile(
+                    output, header,
+                    logger_options.get("compression",
+                                       log_writer.DEFAULT_COMPRESSION),
+                    logger_options.get("rotate_size"),
+                    logger_options.get("rotate_time"),
+                    logger_options.get("index_interval")),
+                flush_interval=logger_options.get(
+                    "flush_interval", log_writer.DEFAULT_FLUSH_INTERVAL),
+                fsync=logger_options.get("fsync", log_writer.DEFAULT_FSYNC))
+
+        if self.stats_period is not None and output is not None and \
+                output != "Console" and \
+                not log_stream.is_stream_address(output):
+            self.stats_writer = open_stats_writer(output)
+
+        self.t_zero = monotonic()
+        for logger in self.loggers:
+            logger.t_zero = self.t_zero
+
+    def _check_logger(self, logger):
+        """
+            Raise ConfigError if the pool cannot honour an option of the
+            logger of a robot : every robot is sampled at each tick of the
+            pool, and merged lines are written by the pool, not by the
+            loggers.
+        """
+        if logger.periods != [self.sample_period]:
+            raise ConfigError("Sections with their own period cannot be " +
+                              "logged with several robots.")
+
+        if self.merge is not True:
+            return
+
+        if logger.change_only:
+            raise ConfigError("Change only output needs one output per " +
+                              "robot.")
+
+        if logger.capture is not None:
+            raise ConfigError("Triggers need one output per robot.")
+
+        if logger.aggregator is not None:
+            raise ConfigError("Aggregation needs one output per robot.")
+
+    def _robot_output(self, robot_ip):
+        """Return the output of a robot, when there is one per robot."""
+        if self.output is None or self.output == "Console":
+            return self.output
+
+        (root, extension) = os.path.splitext(self.output)
+        return root + "_" + robot_ip.replace(":", "_") + extension
+
+    def log1Line(self):
+        """Sample every robot once, and write the result."""
+        elapsed_time = monotonic() - self.t_zero
+        results = self.acquisition.acquire()
+
+        if self.merge is False:
+            for logger, (timestamp, values) in zip(self.loggers, results):
+                if timestamp is not None:
+                    logger.emit(timestamp - self.t_zero, values, False)
+            return
+
+        values = [round_time(elapsed_time, self.time_decimal)]
+        for timestamp, robot_values in results:
+            if timestamp is not None:
+                timestamp = round_time(timestamp - self.t_zero,
+                                       self.time_decimal)
+
+            values.append(timestamp)
+            values.extend(robot_values)
+
+        # A robot without values gets empty fields
+        if self.output == "Console":
+            print self.plan.encode_sparse(values)
+        elif self.writer is not None:
+            self.writer.write(self._encode(values))
+
+    def log(self):
+        """Log every robot, in a dedicated thread."""
+
+        def loop(scheduler):
+            """Log 1 line of every robot at each deadline."""
+            scheduler.start()
+            next_stats = None
+            if self.stats_period is not None:
+                next_stats = monotonic() + self.stats_period
+
+            while self.has_to_log is True:
+                deadline = scheduler.wait()
+                self.tick_lateness.add(max(0.0, monotonic() - deadline))
+                self.log1Line()
+
+                if next_stats is not None and monotonic() >= next_stats:
+                    next_stats += self.stats_period
+                    self.write_stats()
+
+        self.log_thread = threading.Thread(target=loop,
+                                           args=(self.scheduler,))
+        self.log_thread.daemon = True
+        self.log_thread.start()
+
+    def stop(self):
+        """Stop logging every robot."""
+        self.has_to_log = False
+
+        if self.log_thread is not None:
+            self.log_thread.join(self.sample_period + 1)
+
+        self.acquisition.close()
+
+        if self.writer is not None:
+            self.writer.close()
 
-        # Stop using queue. Avoid to run into trouble in threading
-        self.queue.task_done()
+        for logger in self.loggers:
+            logger.stop()
 
-        # This dirty sleep is necessary to allow time to the thread to exit
-        # before the main program
-        time.sleep(1)
+        if self.stats_writer is not None:
+            self.write_stats()
+            self.stats_writer.close()
 
+    @property
+    def errors(self):
+        """Dictionnary of the number of failed samples of each robot."""
+        return dict(zip(self.robot_ips, self.acquisition.errors))
 
-    def get_data(self):
+    @property
+    def timeouts(self):
+        """Dictionnary of the number of late samples of each robot."""
+        return dict(zip(self.robot_ips, self.acquisition.timeouts))
+
+    def stats(self):
         """
-        Return last logged line as a dictionnary.
+            Return a dictionnary of statistics : ticks, overruns, skipped and
+            max_lateness of the scheduler, jitter (lateness of the ticks),
+            errors and timeouts of each robot, writers (the merged output)
+            and robots, the statistics of the logger of each robot (see
+            Logger.stats).
         """
-        if not self.queue.empty():
-            return self.queue.get()
+        scheduler = self.scheduler
+        stats = {"time": monotonic() - self.t_zero,
+                 "ticks": scheduler.ticks,
+                 "overruns": scheduler.overruns,
+                 "skipped": scheduler.skipped,
+                 "max_lateness": scheduler.max_lateness,
+                 "jitter": self.tick_lateness.summary(),
+                 "errors": self.errors,
+                 "timeouts": self.timeouts,
+                 "writers": {},
+                 "robots": dict((robot_ip, logger.stats()) for robot_ip, logger
+                                in zip(self.robot_ips, self.loggers))}
+
+        writer = self.writer
+        if writer is not None:
+            stats["writers"]["merged"] = {
+                "backlog": writer.backlog,
+                "max_backlog": writer.max_backlog,
+                "backpressure": writer.backpressure,
+                "written": writer.written,
+                "dropped": writer.dropped,
+                "error": None if writer.error is None else str(writer.error)}
+
+        return stats
+
+    def write_stats(self):
+        """Write the statistics : one JSON line in the stats file, or a
+        summary line on stderr."""
+        stats = self.stats()
+
+        if self.stats_writer is not None:
+            self.stats_writer.write(json.dumps(stats) + "\n")
         else:
-            while self.queue.empty():
-                time.sleep(0.05)
-            return self.queue.get()
+            sys.stderr.write("multi_logger.py STATS : " +
+                             log_stats.pool_stats_line(stats) + "\n")
 
 
 def main():
     """Read the configuration file and start logging."""
     parser = argparse.ArgumentParser(description="Log datas from ALMemory")
 
-    parser.add_argument("-i", "--IP", dest="robot_ip", default=DEFAULT_IP,
-                        help="Robot IP or name (default: 127.0.0.1)")
+    parser.add_argument("-i", "--IP", dest="robot_ip", nargs="+",
+                        default=[DEFAULT_IP],
+                        help="Robot IP or name (default: 127.0.0.1). With\
+                        several robots, they are logged together")
+
+    parser.add_argument("--perRobot", dest="perRobot", const=True,
+                        action="store_const", default=False,
+                        help="with several robots, one output file per\
+                        robot instead of a merged one")
 
     parser.add_argument("-c", "--configFile", dest="configFile",
                         default=DEFAULT_CONFIG_FILE,
@@ -456,7 +2713,8 @@ def main():
 
     parser.add_argument("-o", "--output", dest="output",
                         default=DEFAULT_OUTPUT,
-                        help="output file or console (default: Console)")
+                        help="output file, console, tcp://HOST:PORT or\
+                        unix:///PATH (default: Console)")
 
     parser.add_argument("-d", "--decimal", dest="decimal", type=int,
                         default=DEFAULT_DECIMAL,
@@ -469,6 +2727,141 @@ def main():
                         default=DEFAULT_RT_PLOT,
                         help="--plot allow use of real time plot")
 
+    parser.add_argument("--plotRate", dest="plotRate", type=float,
+                        default=plot_channel.DEFAULT_PLOT_RATE,
+                        help="maximum number of points per second sent to\
+                        the real time plot (default: 30)")
+
+    parser.add_argument("-m", "--missedDeadline", dest="missedDeadline",
+                        choices=MISSED_DEADLINE_POLICIES,
+                        default=DEFAULT_MISSED_DEADLINE,
+                        help="what to do when a sample is late\
+                        (default: skip)")
+
+    parser.add_argument("-f", "--format", dest="format",
+                        choices=OUTPUT_FORMATS,
+                        default=DEFAULT_OUTPUT_FORMAT,
+                        help="format of the output file (default: text)")
+
+    parser.add_argument("-z", "--compression", dest="compression",
+                        choices=log_writer.COMPRESSIONS,
+                        default=log_writer.DEFAULT_COMPRESSION,
+                        help="compression of the output file (default: none)")
+
+    parser.add_argument("--rotateSize", dest="rotateSize", type=float,
+                        default=None,
+                        help="start a new output file every ROTATESIZE\
+                        megabytes (default: never)")
+
+    parser.add_argument("--rotateTime", dest="rotateTime", type=float,
+                        default=None,
+                        help="start a new output file every ROTATETIME\
+                        seconds (default: never)")
+
+    parser.add_argument("--index", dest="index", type=float, nargs="?",
+                        const=log_writer.DEFAULT_INDEX_INTERVAL, default=None,
+                        help="write the index of the text output files, with\
+                        an entry every INDEX seconds (default: no index, 10\
+                        sec without INDEX)")
+
+    parser.add_argument("--flushInterval", dest="flushInterval", type=float,
+                        default=log_writer.DEFAULT_FLUSH_INTERVAL,
+                        help="maximum time between two flushes of the output\
+                        file, in seconds (default: 1 sec)")
+
+    parser.add_argument("--fsync", dest="fsync",
+                        choices=log_writer.FSYNC_POLICIES,
+                        default=log_writer.DEFAULT_FSYNC,
+                        help="when the output file is synchronised to the\
+                        disk (default: never)")
+
+    parser.add_argument("--reload", dest="reload", const=True,
+                        action="store_const", default=DEFAULT_RELOAD_CONFIG,
+                        help="apply changes of the configuration file while\
+                        logging")
+
+    parser.add_argument("--initTimeout", dest="initTimeout", type=float,
+                        default=DEFAULT_INIT_TIMEOUT,
+                        help="maximum time for the initialisation of the\
+                        sources, in seconds (default: 30 sec)")
+
+    parser.add_argument("-a", "--acquisition", dest="acquisition",
+                        choices=ACQUISITION_MODES,
+                        default=DEFAULT_ACQUISITION,
+                        help="sequential or concurrent sampling of the\
+                        sources (default: sequential)")
+
+    parser.add_argument("--rateOutput", dest="rateOutput",
+                        choices=RATE_OUTPUTS, default=DEFAULT_RATE_OUTPUT,
+                        help="when sources have their own period, one sparse\
+                        output or one output per period (default: sparse)")
+
+    parser.add_argument("--changeOnly", dest="changeOnly", const=True,
+                        action="store_const", default=DEFAULT_CHANGE_ONLY,
+                        help="write only the values which changed by more\
+                        than their deadband")
+
+    parser.add_argument("--keyframe", dest="keyframe", type=float,
+                        default=log_writer.DEFAULT_KEYFRAME_PERIOD,
+                        help="with --changeOnly, maximum time between two\
+                        full lines, in seconds (default: 60 sec)")
+
+    parser.add_argument("--trigger", dest="trigger", const=True,
+                        action="store_const", default=DEFAULT_TRIGGER,
+                        help="write only the samples around the events of\
+                        the [Trigger] section of the configuration file")
+
+    parser.add_argument("--preTrigger", dest="preTrigger", type=float,
+                        default=log_writer.DEFAULT_PRE_TRIGGER,
+                        help="with --trigger, time written before each\
+                        event, in seconds (default: 5 sec)")
+
+    parser.add_argument("--postTrigger", dest="postTrigger", type=float,
+                        default=log_writer.DEFAULT_POST_TRIGGER,
+                        help="with --trigger, time written after each\
+                        event, in seconds (default: 5 sec)")
+
+    parser.add_argument("--holdOff", dest="holdOff", type=float, default=0.0,
+                        help="with --trigger, minimum time between two\
+                        events, in seconds (default: 0 sec)")
+
+    parser.add_argument("--aggregate", dest="aggregate", type=int,
+                        default=None,
+                        help="write min, max, mean, std, count and last\
+                        value of each column every AGGREGATE samples")
+
+    parser.add_argument("--aggregateTime", dest="aggregateTime", type=float,
+                        default=None,
+                        help="write min, max, mean, std, count and last\
+                        value of each column every AGGREGATETIME seconds")
+
+    parser.add_argument("--raw", dest="raw", nargs="+", default=None,
+                        help="with aggregation, columns also written for\
+                        every sample in a _raw output file")
+
+    parser.add_argument("--streamBuffer", dest="streamBuffer", type=int,
+                        default=log_stream.DEFAULT_CLIENT_BUFFER_SIZE,
+                        help="with a socket output, maximum number of samples\
+                        waiting for each subscriber (default: 1000)")
+
+    parser.add_argument("--streamPolicy", dest="streamPolicy",
+                        choices=log_stream.STREAM_POLICIES,
+                        default=log_stream.DEFAULT_STREAM_POLICY,
+                        help="with a socket output, what to do with a slow\
+                        subscriber (default: downsample)")
+
+    parser.add_argument("--stats", dest="stats", type=float, default=None,
+                        help="write statistics of the logger every STATS\
+                        seconds, in OUTPUT.stats or on stderr")
+
+    parser.add_argument("--replay", dest="replay", default=None,
+                        help="replay a log file of multi_logger (text or\
+                        binary) instead of sampling the sources")
+
+    parser.add_argument("--speed", dest="speed", type=float,
+                        default=DEFAULT_REPLAY_SPEED,
+                        help="with --replay, speed of the replay, 0 for as\
+                        fast as possible (default: 1)")
 
     args = parser.parse_args()
 
@@ -480,34 +2873,111 @@ def main():
 
         sys.exit()
 
-    # Logger initialisation
-    logger = Logger(args.robot_ip, args.configFile,
-                    args.period, args.output, args.decimal, args.plot,
-                    DEFAULT_CLASS_GETTER, DEFAULT_QUEUE_SIZE)
+    rotate_size = None
+    if args.rotateSize is not None:
+        rotate_size = int(args.rotateSize * 1024 * 1024)
+
+    output_options = dict(flush_interval=args.flushInterval,
+                          fsync=args.fsync,
+                          output_format=args.format,
+                          compression=args.compression,
+                          rotate_size=rotate_size,
+                          rotate_time=args.rotateTime,
+                          index_interval=args.index,
+                          rate_output=args.rateOutput,
+                          change_only=args.changeOnly,
+                          keyframe_period=args.keyframe,
+                          trigger=args.trigger,
+                          pre_trigger=args.preTrigger,
+                          post_trigger=args.postTrigger,
+                          hold_off=args.holdOff,
+                          aggregate_samples=args.aggregate,
+                          aggregate_time=args.aggregateTime,
+                          raw_columns=args.raw,
+                          stats_period=args.stats,
+                          stream_buffer=args.streamBuffer,
+                          stream_policy=args.streamPolicy,
+                          plot_rate=args.plotRate)
+
+    # Several robots : they are logged together, without real time plot
+    if len(args.robot_ip) > 1:
+        if args.plot is True:
+            print "ERROR : Real time plot is possible with one robot only."
+            sys.exit()
+
+        if args.replay is not None:
+            print "ERROR : Replay is possible with one robot only."
+            sys.exit()
+
+        logger = LoggerPool(args.robot_ip, args.configFile, args.period,
+                            args.output, args.decimal,
+                            not args.perRobot, args.missedDeadline,
+                            acquisition=args.acquisition,
+                            init_timeout=args.initTimeout,
+                            reload_config=args.reload, **output_options)
+    else:
+        # Logger initialisation
+        logger = Logger(args.robot_ip[0], args.configFile,
+                        args.period, args.output, args.decimal, args.plot,
+                        DEFAULT_CLASS_GETTER, DEFAULT_QUEUE_SIZE,
+                        missed_deadline=args.missedDeadline,
+                        acquisition=args.acquisition,
+                        init_timeout=args.initTimeout,
+                        reload_config=args.reload, replay=args.replay,
+                        replay_speed=args.speed, **output_options)
 
     # easy_plot subprocess creation
     if args.plot is True:
         popen_list = ['easy_plot']
         popen_list.extend(['-c', str(args.rtConfigFile)])
         popen_list.extend(['-i', DEFAULT_IP])
-        popen_list.extend(['-r', str(args.period)])
+
+        # The plot gets at most plotRate points per second
+        popen_list.extend(['-r', str(1.0 / args.plotRate)])
 
         # launch easy_plot process
         subprocess.Popen(popen_list)
 
     # Log
-    logger.log(args.plot)
+    if len(args.robot_ip) > 1:
+        logger.log()
+    else:
+        logger.log(args.plot)
 
-    # Continue if the user hit "Enter"
+    # Continue if the user hit "Enter", or until the end of the replay
     # Do nothing specially in case of KeyboardInterrupt (Ctrl-C)
     try:
-        while True:
+        while args.replay is None or logger.log_thread.is_alive():
             time.sleep(0.5)
     except KeyboardInterrupt:
         pass
 
     logger.stop()
 
+    if args.replay is not None:
+        replay = logger.stats()["replay"]
+        emit = replay["emit"]
+        if emit["count"]:
+            print "multi_logger.py REPLAY : " + str(replay["rows"]) + \
+                " samples replayed, " + str(int(replay["rate"])) + \
+                " samples/s, " + str(round(emit["mean"] * 1e6, 1)) + \
+                " us per sample (p99 " + str(round(emit["p99"] * 1e6, 1)) + \
+                " us, max late " + str(round(replay["max_lateness"], 3)) + \
+                " s)"
+
+    scheduler = logger.scheduler
+    if scheduler.overruns > 0:
+        print "multi_logger.py WARNING : " + str(scheduler.overruns) + \
+            " late samples on " + str(scheduler.ticks) + " (" + \
+            str(scheduler.skipped) + " skipped, max lateness " + \
+            str(round(scheduler.max_lateness, 3)) + " s)"
+
+    writer = logger.writer
+    if writer is not None and writer.backpressure > 0:
+        print "multi_logger.py WARNING : Output file was falling behind " + \
+            str(writer.backpressure) + " times (max " + \
+            str(writer.max_backlog) + " lines waiting)"
+
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+@summary: This module permits to feed the real time plot of multi_logger
+          from its own thread, at its own rate : samples are coalesced while
+          the plot is busy, so plotting never delays sampling.
+
+@pep8 : Complains without rules R0902
+"""
+
+import sys
+import time
+import threading
+
+
+# Points sent to the plot per second
+DEFAULT_PLOT_RATE = 30
+
+
+class PlotChannel(object):
+
+    """
+        Lossy channel between the sampling thread and the real time plot.
+        put only keeps the last sample (merged with the previous ones for
+        sparse samples) and never waits. A dedicated thread sends it to the
+        plot server at most plot_rate times per second, so samples coming
+        faster than that, or while the plot server is busy, are coalesced
+        into the next point. The output files are not concerned.
+    """
+
+    def __init__(self, server, headers, plot_rate=DEFAULT_PLOT_RATE):
+        """
+            - server : Plot server, with add_list_point(time, points) (see
+              easy_plot_connection.Server)
+            - headers : Names of the values of the samples (without "Time")
+            - plot_rate (optional) : Maximum number of points sent to the
+              plot per second
+        """
+        if plot_rate <= 0:
+            raise ValueError("Plot rate must be positive")
+
+        self.server = server
+        self.headers = list(headers)
+        self.plot_period = 1.0 / plot_rate
+
+        self.received = 0
+        self.sent = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.closed = False
+
+        self._time = None
+        self._values = None
+        self._condition = threading.Condition()
+
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def put(self, elapsed_time, values, sparse=False):
+        """
+            Give a sample to the plot. Never waits.
+            - elapsed_time : Time of the sample
+            - values : Values of the sample, in the order of headers. The
+              list is kept by the channel, and must not be modified
+            - sparse (optional) : True if None values are not sampled, and
+              have to keep their previous value
+        """
+        with self._condition:
+            self.received += 1
+
+            if self._values is None:
+                self._values = values
+                self._condition.notify()
+            else:
+                self.coalesced += 1
+                if sparse:
+                    for index, value in enumerate(values):
+                        if value is not None:
+                            self._values[index] = value
+                else:
+                    self._values = values
+
+            self._time = elapsed_time
+
+    def set_headers(self, headers):
+        """Change the names of the values. A sample not sent yet is
+        dropped."""
+        with self._condition:
+            self.headers = list(headers)
+            self._values = None
+
+    def _take(self):
+        """Return (time, points) of the sample to send, and empty the
+        channel. Return None if there is nothing to send."""
+        with self._condition:
+            if self._values is None:
+                return None
+
+            points = [(header, value) for header, value
+                      in zip(self.headers, self._values) if value is not None]
+            elapsed_time = self._time
+            self._values = None
+
+        return (elapsed_time, points)
+
+    def _run(self):
+        """Send the last sample at most every plot_period seconds, until
+        the channel is closed."""
+        next_send = time.time()
+
+        while True:
+            with self._condition:
+                while self._values is None and not self.closed:
+                    self._condition.wait()
+
+                if self._values is None:
+                    return
+
+            # Samples coming while waiting are coalesced
+            delay = next_send - time.time()
+            if delay > 0 and not self.closed:
+                time.sleep(delay)
+
+            sample = self._take()
+            if sample is None:
+                continue
+
+            try:
+                self.server.add_list_point(*sample)
+                self.sent += 1
+            except Exception as error:
+                if self.errors == 0:
+                    sys.stderr.write("multi_logger.py WARNING : Real time " +
+                                     "plot failed : " + str(error) + "\n")
+                self.errors += 1
+
+            next_send = max(next_send + self.plot_period, time.time())
+
+    def close(self):
+        """Send the last sample, and stop the thread."""
+        with self._condition:
+            self.closed = True
+            self._condition.notify()
+
+        self._thread.join(1)
@@ -0,0 +1,659 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+@requires: numpy
+
+@summary: This module permits to log the CPU load and the interrupts of
+          Linux directly from /proc, with the API of cpu_interrupt_manager
+          (CpuLoad.calcLoad and Interrupts.calcInterrupts), and the resources
+          of processes (Processes.calcProcesses), at a low cost :
+          the files stay open and are read again at each call, only the lines
+          of the keys are parsed, and the values of every key are computed at
+          once with numpy.
+          It is used instead of cpu_interrupt_manager with "Backend : proc"
+          in the [CPULoad] or [Interrupts] section of probs_config.cfg.
+
+          Keys :
+          - CpuLoad : a field of /proc/stat (see CPU_FIELDS) for every CPU
+            (Example : User), or for one core with ".cpu<N>" (Example :
+            User.cpu1). The load is in percent of the time since the last
+            call.
+          - Interrupts : the name of a line of /proc/interrupts (Example : 5
+            or LOC) for every CPU, or for one CPU with ".cpu<N>" (Example :
+            LOC.cpu1). The value is the number of interrupts since the last
+            call.
+          - Processes : a process and a metric (see PROCESS_METRICS),
+            separated by a space (Example : naoqi-service cpu). The process
+            is a PID, the path of a PID file (ending with ".pid"), or a
+            pattern with wildcards (see fnmatch) of the name or of the
+            command line of processes. The values of every process matching
+            the pattern are added, and are None while no process matches.
+            The processes are searched again by a thread, so the sampling
+            never walks /proc.
+          The first call gives the values since the boot (nothing for the
+          processes).
+
+@platform : Linux
+
+@pep8 : Complains without rules R0902
+"""
+
+import os
+import time
+import threading
+from fnmatch import fnmatch
+
+import numpy
+
+
+PROC = "/proc"
+PROC_STAT = "/proc/stat"
+PROC_INTERRUPTS = "/proc/interrupts"
+
+# Fields of a cpu line of /proc/stat, in order. The total time is the sum of
+# the fields up to Steal (Guest time is already counted in User).
+CPU_FIELDS = ("User", "Nice", "System", "Idle", "IoWait", "Irq", "SoftIrq",
+              "Steal")
+
+# Separator of a key and its CPU (Example : User.cpu1)
+CPU_SEPARATOR = ".cpu"
+
+# Minimum size read from a /proc file at once, in bytes
+READ_SIZE = 65536
+PROCESS_READ_SIZE = 4096
+
+# File of /proc/<pid> giving each metric of a process (the resident memory is
+# read from stat, as in statm, to read one file less with cpu) :
+# - cpu : CPU load, in percent of one core since the last call
+# - rss : resident memory, in kB
+# - threads : number of threads
+# - ctx : voluntary and involuntary context switches since the last call
+# - read, write : bytes read from and written to storage since the last call
+PROCESS_METRICS = {"cpu": "stat", "rss": "stat", "threads": "stat",
+                   "ctx": "status", "read": "io", "write": "io"}
+PROCESS_DELTAS = ("cpu", "ctx", "read", "write")
+
+# Processes are searched again, by the thread of the search, when a process is
+# created (last PID of /proc/loadavg) or a followed process exits, at most
+# once per RESCAN_PERIOD seconds
+RESCAN_PERIOD = 1.0
+
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+
+def _split_key(key):
+    """Return (name, cpu) of a key, cpu being None for every CPU."""
+    (name, separator, cpu) = key.rpartition(CPU_SEPARATOR)
+    if not separator or not cpu.isdigit():
+        return (key, None)
+
+    return (name, int(cpu))
+
+
+class _ProcFile(object):
+
+    """/proc file kept open and read again from the beginning at each call,
+    as a list of lines."""
+
+    def __init__(self, path, size=READ_SIZE):
+        self.path = path
+        self._fd = os.open(path, os.O_RDONLY)
+        self._size = size
+        self.read()
+
+    def read(self):
+        """Return the lines of the file."""
+        return self.read_data().split("\n")
+
+    def read_data(self):
+        """Return the content of the file."""
+        os.lseek(self._fd, 0, os.SEEK_SET)
+        data = os.read(self._fd, self._size)
+
+        # The file is bigger than the buffer : read the rest, and use a
+        # bigger buffer from now
+        if len(data) == self._size:
+            chunks = [data]
+            while chunks[-1]:
+                chunks.append(os.read(self._fd, self._size))
+            data = "".join(chunks)
+            self._size = 2 * len(data)
+
+        return data
+
+    def close(self):
+        """Close the file."""
+        os.close(self._fd)
+
+
+class _Selection(object):
+
+    """
+        Lines of a /proc file read for a list of keys, and the previous
+        counters of these lines. Lines are found by name, and their position
+        is remembered : the file is searched again only if a line moved.
+    """
+
+    def __init__(self, lines, names, width):
+        """
+            - lines : Lines of the file
+            - names : Names of the lines to read
+            - width : Number of counters read on each line
+        """
+        self.names = names
+        self.width = width
+        self.positions = [None] * len(names)
+        self.previous = numpy.zeros((len(names), width))
+        self._locate(lines)
+
+    @staticmethod
+    def _line_name(line):
+        """Return the name of a line : its first word, without ":"."""
+        return line.split(None, 1)[0].rstrip(":") if line.strip() else ""
+
+    def _locate(self, lines):
+        """Find the position of each line, or raise KeyError."""
+        positions = dict((self._line_name(line), index)
+                         for index, line in enumerate(lines))
+
+        for index, name in enumerate(self.names):
+            if name not in positions:
+                raise KeyError("No line \"" + name + "\"")
+
+            self.positions[index] = positions[name]
+
+    def counters(self, lines):
+        """Return the (names, width) array of the counters of the lines."""
+        words = []
+        for attempt in range(2):
+            words = []
+            for name, position in zip(self.names, self.positions):
+                if position >= len(lines):
+                    break
+
+                line_words = lines[position].split(None, self.width + 1)
+                if line_words[0].rstrip(":") != name:
+                    break
+
+                # Lines with less counters (ERR, MIS ...) are padded
+                values = [word for word in line_words[1:self.width + 1]
+                          if word.isdigit()]
+                words.extend(values)
+                words.extend(["0"] * (self.width - len(values)))
+            else:
+                break
+
+            if attempt == 0:
+                self._locate(lines)
+
+        return numpy.fromstring(" ".join(words), sep=" ").reshape(
+            (len(self.names), self.width))
+
+    def deltas(self, lines):
+        """Return the counters of the lines minus the previous ones."""
+        counters = self.counters(lines)
+        deltas = counters - self.previous
+        self.previous = counters
+
+        return deltas
+
+
+class CpuLoad(object):
+
+    """CPU load, read from /proc/stat (see the keys in the module
+    documentation)."""
+
+    def __init__(self, path=PROC_STAT):
+        """
+            - path (optional) : Path of /proc/stat
+        """
+        self._file = _ProcFile(path)
+        self._selections = {}
+
+    def _select(self, keys):
+        """Return the selection of the lines of keys, and the line and the
+        field of each key."""
+        lines = self._file.read()
+        names = []
+        rows = []
+        fields = []
+
+        for key in keys:
+            (field, cpu) = _split_key(key)
+            if field not in CPU_FIELDS:
+                raise KeyError("Unknown CPU load \"" + key + "\". Must be " +
+                               "in " + ", ".join(CPU_FIELDS) + ", followed " +
+                               "by " + CPU_SEPARATOR + "<N> for one core")
+
+            name = "cpu" if cpu is None else "cpu" + str(cpu)
+            if name not in names:
+                names.append(name)
+
+            rows.append(names.index(name))
+            fields.append(CPU_FIELDS.index(field))
+
+        selection = _Selection(lines, names, len(CPU_FIELDS))
+        return (selection, numpy.array(rows), numpy.array(fields))
+
+    def calcLoad(self, keys):
+        """Return the list of the loads of keys, in percent of the time
+        since the last call with these keys."""
+        keys = tuple(keys)
+        if keys not in self._selections:
+            self._selections[keys] = self._select(keys)
+
+        (selection, rows, fields) = self._selections[keys]
+        deltas = selection.deltas(self._file.read())
+        totals = deltas.sum(axis=1)
+        totals[totals == 0] = numpy.inf
+
+        return (100 * deltas[rows, fields] / totals[rows]).tolist()
+
+    def close(self):
+        """Close /proc/stat."""
+        self._file.close()
+
+
+class Interrupts(object):
+
+    """Interrupts, read from /proc/interrupts (see the keys in the module
+    documentation)."""
+
+    def __init__(self, path=PROC_INTERRUPTS):
+        """
+            - path (optional) : Path of /proc/interrupts
+        """
+        self._file = _ProcFile(path)
+        self._selections = {}
+
+        # First line : CPU0 CPU1 ...
+        self.nb_cpus = len(self._file.read()[0].split())
+
+    def _select(self, keys):
+        """Return the selection of the lines of keys, and the line and the
+        CPU of each key (-1 for every CPU)."""
+        lines = self._file.read()
+        names = []
+        rows = []
+        cpus = []
+
+        for key in keys:
+            (name, cpu) = _split_key(key)
+            if cpu is not None and cpu >= self.nb_cpus:
+                raise KeyError("No CPU " + str(cpu) + " for \"" + key + "\"")
+
+            if name not in names:
+                names.append(name)
+
+            rows.append(names.index(name))
+            cpus.append(-1 if cpu is None else cpu)
+
+        selection = _Selection(lines, names, self.nb_cpus)
+        return (selection, numpy.array(rows), numpy.array(cpus))
+
+    def calcInterrupts(self, keys):
+        """Return the list of the number of interrupts of keys since the
+        last call with these keys."""
+        keys = tuple(keys)
+        if keys not in self._selections:
+            self._selections[keys] = self._select(keys)
+
+        (selection, rows, cpus) = self._selections[keys]
+        deltas = selection.deltas(self._file.read())
+
+        # Sum over the CPUs where the key is for every CPU
+        values = numpy.where(cpus < 0, deltas.sum(axis=1)[rows],
+                             deltas[rows, numpy.maximum(cpus, 0)])
+
+        return values.astype(numpy.int64).tolist()
+
+    def close(self):
+        """Close /proc/interrupts."""
+        self._file.close()
+
+
+def _parse_stat(data):
+    """Return the metrics of /proc/<pid>/stat. The name of the process may
+    contain spaces : fields are counted after its closing parenthesis."""
+    fields = data[data.rindex(")") + 2:].split()
+    return {"cpu": int(fields[11]) + int(fields[12]),
+            "threads": int(fields[17]),
+            "rss": int(fields[21]) * PAGE_SIZE // 1024}
+
+
+def _parse_status(data):
+    """Return the metrics of /proc/<pid>/status (the context switches are
+    its last lines)."""
+    words = data[data.rindex("\nvoluntary_ctxt_switches:"):].split()
+    return {"ctx": int(words[1]) + int(words[3])}
+
+
+def _parse_io(data):
+    """Return the metrics of /proc/<pid>/io."""
+    words = data.split()
+    return {"read": int(words[words.index("read_bytes:") + 1]),
+            "write": int(words[words.index("write_bytes:") + 1])}
+
+
+PROCESS_PARSERS = {"stat": _parse_stat, "status": _parse_status,
+                   "io": _parse_io}
+
+
+class _Process(object):
+
+    """
+        Files of /proc/<pid> kept open for the metrics of a process, and its
+        previous counters. A file which cannot be opened (io of a process of
+        another user ...) gives no metric.
+    """
+
+    def __init__(self, proc, pid, files):
+        """
+            - proc : Path of /proc
+            - pid : PID of the process
+            - files : Names of the files to read (see PROCESS_PARSERS)
+        """
+        self.pid = pid
+        self.names = set(files)
+        self.files = []
+        self.previous = {}
+        self.deltas = {}
+        self.values = {}
+
+        for name in files:
+            try:
+                self.files.append(
+                    (_ProcFile(os.path.join(proc, str(pid), name),
+                               PROCESS_READ_SIZE), PROCESS_PARSERS[name]))
+            except (IOError, OSError):
+                pass
+
+    def read(self):
+        """
+            Read the metrics of the process, and their variations since the
+            previous call. Raise OSError if the process exited.
+        """
+        values = {}
+        for (proc_file, parser) in self.files:
+            values.update(parser(proc_file.read_data()))
+
+        self.deltas = dict((metric, values[metric] - self.previous[metric])
+                           for metric in PROCESS_DELTAS
+                           if metric in values and metric in self.previous)
+        self.previous = values
+        self.values = values
+
+    def close(self):
+        """Close the files of the process."""
+        for (proc_file, _) in self.files:
+            proc_file.close()
+
+
+class Processes(object):
+
+    """
+        Resources of processes, read from /proc/<pid> (see the keys in the
+        module documentation). Processes are found once, and searched again
+        only when processes are created or exit : the files of the followed
+        processes stay open between calls.
+        The processes of new keys are searched at once. The next searches
+        are done by a thread, calcProcesses giving the values of the
+        processes already found meanwhile.
+    """
+
+    def __init__(self, proc=PROC, rescan_period=RESCAN_PERIOD,
+                 clock=time.time):
+        """
+            - proc (optional) : Path of /proc
+            - rescan_period (optional) : Minimum time between two searches
+              of the processes, in seconds
+            - clock (optional) : Monotonic clock function, for the CPU load
+        """
+        self.proc = proc
+        self.rescan_period = rescan_period
+        self.clock = clock
+        self.scans = 0
+
+        self._loadavg = _ProcFile(os.path.join(proc, "loadavg"),
+                                  PROCESS_READ_SIZE)
+        self._last_pid = None
+        self._scan_time = None
+        self._rescan = True
+        self._time = None
+
+        self._selections = {}
+        self._names = {}
+        self._matches = {}
+        self._processes = {}
+
+        # The thread of the search swaps the processes under the lock. Two
+        # searches never run at the same time.
+        self._lock = threading.Lock()
+        self._scan_lock = threading.Lock()
+        self._wake_up = threading.Event()
+        self._closed = False
+        self._thread = None
+
+    @staticmethod
+    def _select(keys):
+        """Return the list of (pattern, metric) of keys."""
+        selection = []
+        for key in keys:
+            words = key.split()
+            if len(words) != 2 or words[1] not in PROCESS_METRICS:
+                raise KeyError("Invalid process \"" + key + "\". Must be " +
+                               "<process> <metric>, the metric being in " +
+                               ", ".join(sorted(PROCESS_METRICS)))
+
+            selection.append((words[0], words[1]))
+
+        return selection
+
+    def _read_name(self, pid):
+        """Return (start time, name, command line) of a process, from the
+        previous search if it did not change. Raise OSError if the process
+        exited."""
+        path = os.path.join(self.proc, str(pid))
+
+        with open(os.path.join(path, "stat")) as stat_file:
+            data = stat_file.read()
+
+        name = data[data.index("(") + 1:data.rindex(")")]
+        start_time = data[data.rindex(")") + 2:].split()[19]
+
+        previous = self._names.get(pid)
+        if previous is not None and previous[:2] == (start_time, name):
+            return previous
+
+        with open(os.path.join(path, "cmdline")) as cmdline_file:
+            command_line = cmdline_file.read().replace("\0", " ").strip()
+
+        return (start_time, name, command_line)
+
+    @staticmethod
+    def _match(pattern, names):
+        """Return the list of the PID of the processes matching a pattern,
+        names being the (start time, name, command line) of each PID."""
+        if pattern.isdigit():
+            pids = [int(pattern)]
+        elif pattern.startswith("/") and pattern.endswith(".pid"):
+            try:
+                with open(pattern) as pid_file:
+                    pids = [int(pid_file.read().split()[0])]
+            except (IOError, OSError, IndexError, ValueError):
+                pids = []
+        else:
+            return [pid for pid, (_, name, command_line) in names.items()
+                    if fnmatch(name, pattern) or
+                    fnmatch(command_line, pattern)]
+
+        return [pid for pid in pids if pid in names]
+
+    def _scan(self):
+        """Search the processes of the patterns of every selection, open the
+        files of the new ones, and give them to calcProcesses."""
+        with self._scan_lock:
+            self._search()
+
+    def _search(self):
+        """Search the processes (see _scan)."""
+        names = {}
+        for entry in os.listdir(self.proc):
+            if entry.isdigit():
+                try:
+                    names[int(entry)] = self._read_name(int(entry))
+                except (IOError, OSError, IndexError, ValueError):
+                    pass
+
+        with self._lock:
+            selections = list(self._selections.values())
+            previous = dict(self._processes)
+
+        files = {}
+        matches = {}
+        for selection in selections:
+            for (pattern, metric) in selection:
+                if pattern not in matches:
+                    matches[pattern] = self._match(pattern, names)
+
+                for pid in matches[pattern]:
+                    files.setdefault(pid, set()).add(PROCESS_METRICS[metric])
+
+        # A process which exited since the search has no file
+        new_processes = {}
+        for pid in files:
+            process = previous.get(pid)
+            if process is None or process.names != files[pid]:
+                process = _Process(self.proc, pid, files[pid])
+                if process.files:
+                    new_processes[pid] = process
+
+        # calcProcesses may have closed processes which exited meanwhile
+        with self._lock:
+            processes = {}
+            for pid in files:
+                process = self._processes.get(pid)
+                if pid in new_processes:
+                    processes[pid] = new_processes[pid]
+                elif process is not None and process.names == files[pid]:
+                    processes[pid] = process
+
+            closed = [process for pid, process in self._processes.items()
+                      if processes.get(pid) is not process]
+            self._names = names
+            self._matches = matches
+            self._processes = processes
+            self.scans += 1
+
+        for process in closed:
+            process.close()
+
+    def _run(self):
+        """Search the processes each time calcProcesses asks for it, until
+        closed."""
+        while True:
+            self._wake_up.wait()
+            self._wake_up.clear()
+            if self._closed:
+                return
+
+            try:
+                self._scan()
+            except (IOError, OSError):
+                pass
+
+    def _request_scan(self):
+        """Wake up the thread of the search (started at the first
+        search)."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run)
+            self._thread.daemon = True
+            self._thread.start()
+
+        self._wake_up.set()
+
+    def calcProcesses(self, keys):
+        """Return the list of the values of keys : for each one, the sum of
+        the metric of the processes of its pattern, or None if no process
+        matches."""
+        keys = tuple(keys)
+        now = self.clock()
+
+        # The last PID changes when a process is created
+        last_pid = self._loadavg.read_data().split()[-1]
+        if last_pid != self._last_pid:
+            self._last_pid = last_pid
+            self._rescan = True
+
+        # The processes of new keys are searched at once
+        if keys not in self._selections:
+            with self._lock:
+                self._selections[keys] = self._select(keys)
+            self._scan()
+            self._scan_time = now
+            self._rescan = False
+
+        selection = self._selections[keys]
+
+        if self._rescan and (self._scan_time is None or
+                             now - self._scan_time >= self.rescan_period):
+            self._rescan = False
+            self._scan_time = now
+            self._request_scan()
+
+        with self._lock:
+            for pid, process in list(self._processes.items()):
+                try:
+                    process.read()
+                except (IOError, OSError, IndexError, ValueError):
+                    process.close()
+                    del self._processes[pid]
+                    self._rescan = True
+            processes = self._processes
+            matches = self._matches
+
+        elapsed_time = None
+        if self._time is not None and now > self._time:
+            elapsed_time = now - self._time
+        self._time = now
+
+        values = []
+        for (pattern, metric) in selection:
+            total = None
+            for pid in matches.get(pattern, ()):
+                process = processes.get(pid)
+                if process is None:
+                    continue
+
+                if metric in PROCESS_DELTAS:
+                    value = process.deltas.get(metric)
+                else:
+                    value = process.values.get(metric)
+
+                if value is not None:
+                    total = value if total is None else total + value
+
+            if metric == "cpu" and total is not None:
+                total = None if elapsed_time is None else \
+                    round(100.0 * total / CLOCK_TICKS / elapsed_time, 2)
+
+            values.append(total)
+
+        return values
+
+    def close(self):
+        """Stop the thread of the search, and close every file."""
+        if self._closed:
+            return
+
+        self._closed = True
+        self._wake_up.set()
+        if self._thread is not None:
+            self._thread.join()
+
+        self._loadavg.close()
+        for process in self._processes.values():
+            process.close()
+        self._processes = {}
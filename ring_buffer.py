@@ -0,0 +1,393 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+@requires: numpy
+
+@summary: This module permits to keep the history of the last samples of
+          multi_logger in preallocated arrays, and to deliver them to
+          several consumers, in the same process or in another one (see
+          SharedRingBuffer)
+
+@pep8 : Complains without rules R0902
+"""
+
+import ctypes
+import threading
+import multiprocessing
+
+import numpy
+
+import timing
+
+
+# Types of the values stored as they are in the columns. The other values
+# (None, strings, lists ...) are NaN in the columns, and kept aside.
+NUMBER_TYPES = (int, long, float, numpy.number)
+
+
+def _with_objects(row, objects):
+    """Return the list of the values of row, with the values of objects
+    (column index: value) instead of NaN."""
+    values = row.tolist()
+    for index, value in objects.items():
+        values[index] = value
+
+    return values
+
+
+class RingBuffer(object):
+
+    """
+        History of the last <capacity> samples, one float64 column per header.
+        Each sample is written twice, at i and i + capacity, so the last
+        samples are always contiguous in memory : window and since return
+        views on the columns, without any copy.
+        A view on the last n samples stays valid until capacity - n new
+        samples are appended.
+        Values which are not numbers (None, strings ...) are NaN in the
+        columns, and kept aside as they are (see objects) : latest and the
+        subscriptions give them back.
+        Consumers wait for new samples on a condition variable (see wait and
+        Subscription).
+    """
+
+    def __init__(self, headers, capacity):
+        """
+            - headers : Column names, the first one being the time
+            - capacity : Number of samples kept
+        """
+        self.headers = list(headers)
+        self.capacity = capacity
+        self.sequence = 0
+        self.closed = False
+
+        self._condition = self._new_condition()
+        self._columns = dict((header, index)
+                             for index, header in enumerate(self.headers))
+        self._data = self._new_data((2 * capacity, len(self.headers)))
+        self._data.fill(numpy.nan)
+        self._objects = self._new_objects(capacity)
+
+    def _new_condition(self):
+        """Return the condition variable of the consumers."""
+        return threading.Condition()
+
+    def _new_data(self, shape):
+        """Return the array of the samples."""
+        return numpy.empty(shape)
+
+    def _new_objects(self, capacity):
+        """Return the list of the values which are not numbers, one
+        dictionnary (or None) per sample."""
+        return [None] * capacity
+
+    def _timed_wait(self, timeout):
+        """Wait on the condition (already acquired) until it is notified,
+        at most timeout seconds, without polling (see timing.timed_wait)."""
+        timing.timed_wait(self._condition, timeout)
+
+    def _wait_for(self, predicate, timeout=None):
+        """
+            Wait on the condition (already acquired) until predicate()
+            returns True, at most timeout seconds (forever if timeout is
+            None). Return the last result of predicate().
+        """
+        if timeout is None:
+            while not predicate():
+                self._condition.wait()
+            return True
+
+        deadline = timing.monotonic() + timeout
+        while not predicate():
+            remaining = deadline - timing.monotonic()
+            if remaining <= 0:
+                return False
+
+            self._timed_wait(remaining)
+
+        return True
+
+    def __len__(self):
+        """Number of samples available."""
+        return min(self.sequence, self.capacity)
+
+    def append(self, values):
+        """Append a sample. values are in the order of headers."""
+        objects = dict((index, value) for index, value in enumerate(values)
+                       if not isinstance(value, NUMBER_TYPES))
+        if objects:
+            row = numpy.array([numpy.nan if index in objects else value
+                               for index, value in enumerate(values)],
+                              dtype=numpy.float64)
+        else:
+            row = numpy.array(values, dtype=numpy.float64)
+
+        with self._condition:
+            index = self.sequence % self.capacity
+            self._data[index] = row
+            self._data[index + self.capacity] = row
+            if self._objects is not None:
+                self._objects[index] = objects or None
+
+            # Incremented last : readers never see a half written sample
+            self.sequence += 1
+            self._condition.notify_all()
+
+    def wait(self, sequence, timeout=None):
+        """
+            Wait until the sample number <sequence> is appended, or until
+            timeout seconds elapsed (forever if timeout is None), or until
+            the buffer is closed. Return True if the sample is available.
+        """
+        with self._condition:
+            self._wait_for(lambda: self.sequence > sequence or self.closed,
+                           timeout)
+
+            return self.sequence > sequence
+
+    def close(self):
+        """Wake up every consumer : no sample will be appended anymore."""
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+
+    def rows(self, n):
+        """Return a (n, columns) view on the last n samples, oldest first."""
+        sequence = self.sequence
+        n = max(0, min(n, sequence, self.capacity))
+        start = (sequence - n) % self.capacity
+
+        return self._data[start:start + n]
+
+    def row(self, sequence):
+        """Return the view on the sample number <sequence> (0 is the first
+        sample appended). Raise IndexError if it is overwritten or not yet
+        appended."""
+        if not self.sequence - self.capacity <= sequence < self.sequence:
+            raise IndexError("Sample " + str(sequence) + " is not in history")
+
+        return self._data[sequence % self.capacity]
+
+    def objects(self, sequence):
+        """Return the values which are not numbers of the sample number
+        <sequence>, as a dictionnary column index: value, or None if they are
+        all numbers. Raise IndexError as row."""
+        self.row(sequence)
+        if self._objects is None:
+            return None
+
+        return self._objects[sequence % self.capacity]
+
+    def _columns_of(self, rows):
+        """Return a dictionnary of views, one per column."""
+        return dict((header, rows[:, index])
+                    for header, index in self._columns.items())
+
+    def latest(self):
+        """Return a dictionnary with the values of the last sample."""
+        if self.sequence == 0:
+            return {}
+
+        sequence = self.sequence - 1
+        row = self.row(sequence)
+        objects = self.objects(sequence)
+        if objects:
+            row = _with_objects(row, objects)
+
+        return dict(zip(self.headers, row))
+
+    def window(self, n):
+        """Return a dictionnary of views on the last n values of each
+        column."""
+        return self._columns_of(self.rows(n))
+
+    def since(self, t):
+        """Return a dictionnary of views on the values of each column whose
+        time (first column) is greater or equal to t."""
+        rows = self.rows(self.capacity)
+        start = numpy.searchsorted(rows[:, 0], t, side="left")
+
+        return self._columns_of(rows[start:])
+
+
+class SharedRingBuffer(RingBuffer):
+
+    """
+        RingBuffer in shared memory, to give the samples of a process to
+        another one (see logger_process) : it has to be created before the
+        processes are started, and given to them.
+        The samples, the sequence number and the closed flag are in shared
+        memory, and consumers wait on a multiprocessing condition, so
+        window, since and the subscriptions of a process read the samples
+        appended by another one without any copy.
+        The values which are not numbers are not shared : they are only NaN.
+    """
+
+    def __init__(self, headers, capacity):
+        """
+            - headers : Column names, the first one being the time
+            - capacity : Number of samples kept
+        """
+        self._sequence = multiprocessing.RawValue(ctypes.c_longlong, 0)
+        self._closed = multiprocessing.RawValue(ctypes.c_bool, False)
+        self._shared_data = None
+        RingBuffer.__init__(self, headers, capacity)
+
+    def _get_sequence(self):
+        """Number of samples appended."""
+        return self._sequence.value
+
+    def _set_sequence(self, sequence):
+        """Set the number of samples appended."""
+        self._sequence.value = sequence
+
+    sequence = property(_get_sequence, _set_sequence)
+
+    def _get_closed(self):
+        """True when no sample will be appended anymore."""
+        return self._closed.value
+
+    def _set_closed(self, closed):
+        """Set the closed flag."""
+        self._closed.value = closed
+
+    closed = property(_get_closed, _set_closed)
+
+    def _new_condition(self):
+        """Return a condition variable shared by the processes."""
+        return multiprocessing.Condition()
+
+    def _timed_wait(self, timeout):
+        """Wait on the condition (already acquired) until it is notified,
+        at most timeout seconds. The wait of a multiprocessing condition
+        does not poll."""
+        self._condition.wait(timeout)
+
+    def _new_objects(self, capacity):
+        """The values which are not numbers stay in the process appending
+        them : they are not kept."""
+        return None
+
+    def _new_data(self, shape):
+        """Return the array of the samples, in shared memory."""
+        self._shared_data = multiprocessing.RawArray(ctypes.c_double,
+                                                     shape[0] * shape[1])
+        return numpy.frombuffer(self._shared_data).reshape(shape)
+
+    def __getstate__(self):
+        """Given to a new process (on Windows) : the array of the samples is
+        not copied, it is rebuilt on the shared memory."""
+        state = dict(self.__dict__)
+        del state["_data"]
+        return state
+
+    def __setstate__(self, state):
+        """Rebuild the array of the samples on the shared memory."""
+        self.__dict__.update(state)
+        self._data = numpy.frombuffer(self._shared_data).reshape(
+            (2 * self.capacity, len(self.headers)))
+
+
+class Subscription(object):
+
+    """
+        Independent consumer of the samples of a RingBuffer.
+        Each subscription reads every sample appended after its creation, in
+        order. If it falls more than max_lag samples behind (or more than the
+        capacity of the buffer), the oldest samples are skipped and counted
+        in dropped.
+        A sample is a copy of its row array, or a list when some of its
+        values are not numbers (see RingBuffer.objects).
+    """
+
+    def __init__(self, ring, max_lag=None, convert=None):
+        """
+            - ring : RingBuffer to read
+            - max_lag (optional) : Maximum number of samples waiting
+            - convert (optional) : Function applied to each sample (a copy
+              of the row array, or a list if some values are not numbers)
+              before it is returned
+        """
+        self.ring = ring
+        self.max_lag = ring.capacity
+        if max_lag is not None:
+            self.max_lag = min(max_lag, ring.capacity)
+
+        self.convert = convert
+        self.cursor = ring.sequence
+        self.received = 0
+        self.dropped = 0
+        self.closed = False
+
+    @property
+    def lag(self):
+        """Number of samples appended and not read yet."""
+        return self.ring.sequence - self.cursor
+
+    def get(self, timeout=None):
+        """
+            Return the next sample. Wait for it at most timeout seconds
+            (forever if timeout is None). Return None if there is no sample
+            after timeout, or if the subscription or the buffer is closed.
+        """
+        ring = self.ring
+
+        with ring._condition:
+            ring._wait_for(lambda: ring.sequence > self.cursor or
+                           ring.closed or self.closed, timeout)
+
+            if self.closed or ring.sequence <= self.cursor:
+                return None
+
+            behind = ring.sequence - self.cursor
+            if behind > self.max_lag:
+                self.dropped += behind - self.max_lag
+                self.cursor += behind - self.max_lag
+
+            row = ring.row(self.cursor).copy()
+            objects = ring.objects(self.cursor)
+
+        self.cursor += 1
+        self.received += 1
+
+        if objects:
+            row = _with_objects(row, objects)
+
+        if self.convert is not None:
+            return self.convert(row)
+
+        return row
+
+    def __iter__(self):
+        """Yield samples until the subscription or the buffer is closed."""
+        while True:
+            row = self.get()
+            if row is None:
+                return
+
+            yield row
+
+    def close(self):
+        """Stop reading : get returns None from now."""
+        with self.ring._condition:
+            self.closed = True
+            self.ring._condition.notify_all()
+
+
+def run_callback(subscription, callback):
+    """
+        Call callback with each sample of subscription, in a dedicated thread,
+        so that a slow callback never delays sampling. Return the thread.
+    """
+
+    def deliver():
+        """Call the callback until the subscription is closed."""
+        for row in subscription:
+            callback(row)
+
+    thread = threading.Thread(target=deliver)
+    thread.daemon = True
+    thread.start()
+
+    return thread
@@ -0,0 +1,319 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+@summary: This module permits to run multi_logger without robot and without
+          PicoLog devices : simulated ALMemory proxy, TC08, ADC24, CPU load
+          and interrupts, with the same API as the real modules, a
+          configurable latency for each source, noise on the values and
+          failures of chosen keys. The random parts (jitter and noise) are
+          reproducible with seed.
+          Call install() before creating a Logger : the simulated modules
+          replace naoqi, picolog_tc08_manager, picolog_adc24_manager and
+          cpu_interrupt_manager.
+
+@platform : Windows, Linux, OS X (no DLL needed)
+
+@pep8 : Complains without rules R0201 and R0902
+"""
+
+import sys
+import time
+import math
+import random
+import types
+from collections import OrderedDict
+
+
+# Latency of each call to a source : (latency, jitter) in seconds. Each call
+# sleeps latency plus a random value between -jitter and jitter.
+LATENCIES = {"ALMemory": (0.0, 0.0),
+             "TC08": (0.0, 0.0),
+             "ADC24": (0.0, 0.0),
+             "CPULoad": (0.0, 0.0),
+             "Interrupts": (0.0, 0.0)}
+
+# Amplitude of the random noise added to every value (0 : no noise)
+NOISE = 0.0
+
+# Keys whose calls fail, for each source : ALMemory keys, TC08 and ADC24
+# channels, CPULoad and Interrupts keys (see set_failure)
+FAILURES = {}
+
+# Minimum sampling interval of the simulated TC08, in milli-seconds
+TC08_MINIMUM_INTERVAL_MS = 100
+
+# Time for the simulated ADC24 to be ready after run, in seconds
+ADC24_READY_TIME = 0.0
+
+# Module names replaced by install, and the names they export
+MODULES = {"naoqi": ("ALProxy",),
+           "picolog_tc08_manager": ("ModuleTc08",),
+           "picolog_adc24_manager": ("ModuleAdc24",),
+           "cpu_interrupt_manager": ("CpuLoad", "Interrupts")}
+
+# Random numbers of the jitter and of the noise (see seed)
+_random = random.Random()
+
+
+def set_latency(source, latency, jitter=0.0):
+    """Set the latency and the jitter of the calls to a source (ALMemory,
+    TC08, ADC24, CPULoad or Interrupts), in seconds."""
+    if source not in LATENCIES:
+        raise ValueError("Unknown source \"" + str(source) + "\". Must be " +
+                         "in " + ", ".join(sorted(LATENCIES)))
+
+    LATENCIES[source] = (latency, jitter)
+
+
+def set_noise(amplitude):
+    """Add to every value a random noise between -amplitude and
+    amplitude."""
+    global NOISE
+    NOISE = amplitude
+
+
+def set_failure(source, key):
+    """Make the calls to a source fail (RuntimeError, as naoqi does for an
+    unknown key) when they read key : an ALMemory key, a TC08 or ADC24
+    channel number, a CPULoad or Interrupts key."""
+    if source not in LATENCIES:
+        raise ValueError("Unknown source \"" + str(source) + "\". Must be " +
+                         "in " + ", ".join(sorted(LATENCIES)))
+
+    FAILURES.setdefault(source, set()).add(key)
+
+
+def clear_failures():
+    """Make every call succeed again."""
+    FAILURES.clear()
+
+
+def seed(value=None):
+    """Start again the random numbers of the jitter and of the noise : two
+    runs with the same seed get the same latencies and the same values at
+    the same times."""
+    _random.seed(value)
+
+
+def _wait(source):
+    """Sleep for the latency of a call to source."""
+    (latency, jitter) = LATENCIES[source]
+    if jitter > 0:
+        latency += _random.uniform(-jitter, jitter)
+
+    if latency > 0:
+        time.sleep(latency)
+
+
+def _check(source, keys):
+    """Raise RuntimeError if one of keys fails for source (see
+    set_failure)."""
+    failures = FAILURES.get(source)
+    if not failures:
+        return
+
+    for key in keys:
+        if key in failures:
+            raise RuntimeError("Simulated failure of " + source + " on " +
+                               str(key))
+
+
+def _signal(index, elapsed_time):
+    """Value of the simulated signal <index> at elapsed_time : a slow sine
+    wave, different for each index, plus the noise."""
+    value = math.sin(0.5 * elapsed_time + index)
+    if NOISE > 0:
+        value += _random.uniform(-NOISE, NOISE)
+
+    return value
+
+
+class ALProxy(object):
+
+    """Simulated proxy. Only ALMemory is simulated."""
+
+    def __init__(self, name, robot_ip="127.0.0.1", port=9559):
+        """
+            - name : Name of the module, must be "ALMemory"
+            - robot_ip (optional) : Ignored
+            - port (optional) : Ignored
+        """
+        if name != "ALMemory":
+            raise RuntimeError("Only ALMemory is simulated")
+
+        self.robot_ip = robot_ip
+        self.port = port
+        self._t_zero = time.time()
+        self._indexes = {}
+
+    def _value(self, key, elapsed_time):
+        """Return the value of a key."""
+        index = self._indexes.setdefault(key, len(self._indexes))
+        return _signal(index, elapsed_time)
+
+    def getData(self, key):
+        """Return the value of a key."""
+        _wait("ALMemory")
+        _check("ALMemory", [key])
+        return self._value(key, time.time() - self._t_zero)
+
+    def getListData(self, keys):
+        """Return the list of the values of keys."""
+        _wait("ALMemory")
+        _check("ALMemory", keys)
+        elapsed_time = time.time() - self._t_zero
+        return [self._value(key, elapsed_time) for key in keys]
+
+
+class ModuleTc08(object):
+
+    """Simulated PicoLog TC08 thermocouple logger (8 channels)."""
+
+    def __init__(self):
+        self.mains = None
+        self.channels = OrderedDict()
+        self.interval = None
+        self._t_zero = time.time()
+
+    def setMains(self, mains):
+        """Set the noise rejection (50Hz or 60Hz)."""
+        self.mains = mains
+
+    def setChannel(self, channel, thermocouple_type):
+        """Enable a channel."""
+        self.channels[channel] = thermocouple_type
+
+    def getMinimumIntervalMs(self):
+        """Return the minimum sampling interval, in milli-seconds."""
+        return TC08_MINIMUM_INTERVAL_MS
+
+    def run(self, interval):
+        """Start sampling every interval milli-seconds."""
+        self.interval = interval
+
+    def getValues(self):
+        """Return the ordered dictionnary of the last temperature of each
+        channel."""
+        _wait("TC08")
+        _check("TC08", self.channels)
+        elapsed_time = time.time() - self._t_zero
+        return OrderedDict((channel, 25 + 5 * _signal(channel, elapsed_time))
+                           for channel in self.channels)
+
+
+class ModuleAdc24(object):
+
+    """
+        Simulated PicoLog ADC24 (16 channels). In BM_STREAM mode, getValues
+        returns every conversion since the last call (at most the buffer
+        size), like the real device.
+    """
+
+    def __init__(self):
+        self.mains = None
+        self.channels = OrderedDict()
+        self.interval = None
+        self.conversion_time = None
+        self.buffer_size = 1
+        self.mode = None
+        self._t_run = None
+        self._read = 0
+
+    def setMains(self, mains):
+        """Set the noise rejection (50Hz or 60Hz)."""
+        self.mains = mains
+
+    def enableAnalogInChannel(self, channel, voltage_range, end):
+        """Enable a channel."""
+        self.channels[channel] = (voltage_range, end)
+
+    def setInterval(self, interval, conversion_time):
+        """Set the sampling interval (milli-seconds) and the conversion
+        time."""
+        self.interval = interval
+        self.conversion_time = conversion_time
+
+    def run(self, buffer_size, mode):
+        """Start sampling, in BM_WINDOW, BM_BLOCK or BM_STREAM mode."""
+        self.buffer_size = buffer_size
+        self.mode = mode
+        self._t_run = time.time()
+        self._read = 0
+
+    def isReady(self):
+        """Return True when the first values are available."""
+        return self._t_run is not None and \
+            time.time() - self._t_run >= ADC24_READY_TIME
+
+    def getValues(self):
+        """Return the ordered dictionnary of the list of values of each
+        channel."""
+        _wait("ADC24")
+        _check("ADC24", self.channels)
+        now = time.time() - self._t_run
+
+        if self.mode != "BM_STREAM":
+            return OrderedDict((channel, [_signal(channel, now)])
+                               for channel in self.channels)
+
+        # Conversions done since the last call
+        interval = max(self.interval, 1) / 1000.0
+        converted = int(now / interval)
+        first = max(self._read, converted - self.buffer_size)
+        self._read = converted
+
+        return OrderedDict(
+            (channel, [_signal(channel, sample * interval)
+                       for sample in range(first, converted)])
+            for channel in self.channels)
+
+
+class CpuLoad(object):
+
+    """Simulated CPU load."""
+
+    def __init__(self):
+        self._t_zero = time.time()
+
+    def calcLoad(self, keys):
+        """Return the list of the loads of keys (User, System ...), in
+        percent."""
+        _wait("CPULoad")
+        _check("CPULoad", keys)
+        elapsed_time = time.time() - self._t_zero
+        return [50 + 50 * _signal(index, elapsed_time)
+                for index in range(len(keys))]
+
+
+class Interrupts(object):
+
+    """Simulated interrupts counters."""
+
+    def __init__(self):
+        self._t_zero = time.time()
+
+    def calcInterrupts(self, keys):
+        """Return the list of the number of interrupts of keys."""
+        _wait("Interrupts")
+        _check("Interrupts", keys)
+        elapsed = int((time.time() - self._t_zero) * 1000)
+        return [elapsed * (index + 1) for index in range(len(keys))]
+
+
+def install():
+    """
+        Replace naoqi, picolog_tc08_manager, picolog_adc24_manager and
+        cpu_interrupt_manager by the simulated sources, for every module
+        importing them from now.
+    """
+    this_module = sys.modules[__name__]
+
+    for module_name, names in MODULES.items():
+        module = types.ModuleType(module_name)
+        module.__doc__ = "Simulated " + module_name + " (see " + \
+            __name__ + ")"
+        for name in names:
+            setattr(module, name, getattr(this_module, name))
+
+        sys.modules[module_name] = module
@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+@requires: numpy
+
+@summary: Unit tests of multi_logger, without robot and without PicoLog
+          devices : the simulated sources (see simulated_sources.py) replace
+          naoqi, picolog_tc08_manager, picolog_adc24_manager and
+          cpu_interrupt_manager, and the /proc parsers read the fixture files
+          of tests/proc.
+
+          Example : python -m unittest discover -s tests -t .
+
+@platform : Windows, Linux, OS X (Linux for proc_sources)
+"""
+
+import os
+import sys
+
+# The modules of multi_logger are at the root of the repository
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import simulated_sources
+
+simulated_sources.install()
+
+# Fixture files of /proc (see test_proc_sources)
+PROC_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             "proc")
+
+
+class FakeTime(object):
+
+    """Simulated time module : sleep moves the time forward at once, and is
+    recorded in sleeps. The other functions are the ones of the time
+    module."""
+
+    def __init__(self, time_module, now=0.0):
+        """
+            - time_module : Time module replaced
+            - now (optional) : Simulated time at the beginning
+        """
+        self.now = now
+        self.sleeps = []
+        self._time = time_module
+
+    def time(self):
+        """Return the simulated time."""
+        return self.now
+
+    clock = time
+
+    def sleep(self, duration):
+        """Move the simulated time forward."""
+        self.sleeps.append(duration)
+        self.now += duration
+
+    def __getattr__(self, name):
+        return getattr(self._time, name)
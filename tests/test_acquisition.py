@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+@summary: Tests of multi_logger.ConcurrentAcquisition : a tick ends as soon
+          as its sources answered, and at the timeout otherwise.
+"""
+
+import time
+import unittest
+
+import tests
+import multi_logger
+
+
+def _sampler(latency):
+    """Return a sampler of one value answering after latency seconds."""
+    def sample():
+        """Sleep latency, return one value."""
+        time.sleep(latency)
+        return [latency]
+
+    return sample
+
+
+class TestConcurrentAcquisition(unittest.TestCase):
+
+    """ConcurrentAcquisition.acquire : duration of the ticks."""
+
+    def _acquisition(self, latencies, timeout=1.0):
+        """Return a ConcurrentAcquisition of samplers of latencies."""
+        acquisition = multi_logger.ConcurrentAcquisition(
+            [_sampler(latency) for latency in latencies],
+            [1] * len(latencies), timeout)
+        self.addCleanup(acquisition.close)
+        return acquisition
+
+    def _tick(self, acquisition):
+        """Return the results and the duration of a tick."""
+        start = multi_logger.monotonic()
+        results = acquisition.acquire()
+        return results, multi_logger.monotonic() - start
+
+    def test_slowest_source(self):
+        """The tick ends when the slowest source answers, not at the next
+        check of a polling wait (every 50 ms in Python 2 : 113 ms here)."""
+        acquisition = self._acquisition([0.07])
+
+        results, duration = self._tick(acquisition)
+        self.assertEqual(results[0][1], [0.07])
+        self.assertTrue(0.07 <= duration < 0.085, duration)
+
+    def test_short_ticks(self):
+        """A 12 ms source gives ticks of 12 ms, not 15 ms. The median
+        ignores the ticks delayed by the scheduler of the system."""
+        acquisition = self._acquisition([0.012])
+
+        durations = sorted(self._tick(acquisition)[1] for _ in range(11))
+        self.assertTrue(durations[5] < 0.014, durations)
+
+    def test_timeout(self):
+        """A source slower than the timeout gets None values, counted in
+        timeouts, and its late values are given at a next tick."""
+        acquisition = self._acquisition([0.1], timeout=0.02)
+
+        results, duration = self._tick(acquisition)
+        self.assertEqual(results, [(None, [None])])
+        self.assertTrue(duration < 0.035, duration)
+        self.assertEqual(acquisition.timeouts, [1])
+
+        time.sleep(0.1)
+        self.assertEqual(self._tick(acquisition)[0][0][1], [0.1])
+
+
+if __name__ == "__main__":
+    unittest.main()
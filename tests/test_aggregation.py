@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+@summary: Tests of aggregation : the statistics of a block, and the ends of
+          the blocks by size and by time.
+"""
+
+import math
+import unittest
+
+import tests
+import aggregation
+
+
+HEADERS = ["Time", "A", "B"]
+
+
+def statistics(row, column):
+    """Return the statistics of a column (counting from 0, after the time)
+    of an aggregate row, by name."""
+    start = 1 + column * len(aggregation.STATISTICS)
+    return dict(zip(aggregation.STATISTICS,
+                    row[start:start + len(aggregation.STATISTICS)]))
+
+
+class TestAggregator(unittest.TestCase):
+
+    """Statistics and windows of an Aggregator."""
+
+    def test_headers(self):
+        """Each column gives one header per statistic, after the time."""
+        aggregator = aggregation.Aggregator(HEADERS, block_size=2)
+
+        self.assertEqual(aggregator.headers[0], "Time")
+        self.assertEqual(aggregator.headers[1:7],
+                         ["A_min", "A_max", "A_mean", "A_std", "A_count",
+                          "A_last"])
+        self.assertEqual(len(aggregator.headers),
+                         1 + 2 * len(aggregation.STATISTICS))
+
+    def test_statistics(self):
+        """min, max, mean, std, count and last of each column over a block,
+        at the time of its last sample."""
+        aggregator = aggregation.Aggregator(HEADERS, block_size=4)
+
+        self.assertTrue(aggregator.add([0.0, 3.0, 10.0]) is None)
+        self.assertTrue(aggregator.add([1.0, 1.0, 20.0]) is None)
+        self.assertTrue(aggregator.add([2.0, 4.0, 30.0]) is None)
+        row = aggregator.add([3.0, 2.0, 40.0])
+
+        self.assertEqual(row[0], 3.0)
+        self.assertEqual(statistics(row, 0),
+                         {"min": 1.0, "max": 4.0, "mean": 2.5,
+                          "std": math.sqrt(1.25), "count": 4, "last": 2.0})
+        self.assertEqual(statistics(row, 1)["mean"], 25.0)
+        self.assertEqual(statistics(row, 1)["last"], 40.0)
+        self.assertEqual(aggregator.blocks, 1)
+
+    def test_values_not_numbers(self):
+        """Values which are not numbers are not counted, the last value is
+        the last number, and a column without number gets NaN."""
+        aggregator = aggregation.Aggregator(HEADERS, block_size=3)
+
+        aggregator.add([0.0, 1.0, None])
+        aggregator.add([1.0, 5.0, "error"])
+        row = aggregator.add([2.0, None, None])
+
+        column_a = statistics(row, 0)
+        self.assertEqual(column_a["count"], 2)
+        self.assertEqual(column_a["mean"], 3.0)
+        self.assertEqual(column_a["last"], 5.0)
+
+        column_b = statistics(row, 1)
+        self.assertEqual(column_b["count"], 0)
+        for name in ("min", "max", "mean", "std", "last"):
+            self.assertTrue(math.isnan(column_b[name]))
+
+    def test_block_size(self):
+        """A block ends every block_size samples, the next sample starts a
+        new one."""
+        aggregator = aggregation.Aggregator(HEADERS, block_size=2)
+        rows = [aggregator.add([float(t), float(t), 0.0]) for t in range(5)]
+
+        self.assertEqual([row is not None for row in rows],
+                         [False, True, False, True, False])
+        self.assertEqual(statistics(rows[3], 0)["min"], 2.0)
+        self.assertEqual(statistics(rows[3], 0)["max"], 3.0)
+
+    def test_block_time(self):
+        """A sample coming block_time after the first sample of the block
+        ends it, and starts the next block."""
+        aggregator = aggregation.Aggregator(HEADERS, block_time=1.0)
+
+        self.assertTrue(aggregator.add([0.0, 1.0, 0.0]) is None)
+        self.assertTrue(aggregator.add([0.5, 2.0, 0.0]) is None)
+        self.assertTrue(aggregator.add([0.99, 3.0, 0.0]) is None)
+        row = aggregator.add([1.0, 4.0, 0.0])
+
+        self.assertEqual(row[0], 0.99)
+        self.assertEqual(statistics(row, 0)["count"], 3)
+        self.assertEqual(statistics(row, 0)["last"], 3.0)
+
+        # The block started at 1.0 ends at 2.0, even after a gap
+        self.assertTrue(aggregator.add([1.5, 5.0, 0.0]) is None)
+        row = aggregator.add([3.5, 6.0, 0.0])
+        self.assertEqual(row[0], 1.5)
+        self.assertEqual(statistics(row, 0)["min"], 4.0)
+        self.assertEqual(statistics(row, 0)["max"], 5.0)
+
+        row = aggregator.flush()
+        self.assertEqual(row[0], 3.5)
+        self.assertEqual(statistics(row, 0)["count"], 1)
+
+    def test_block_size_and_time(self):
+        """With a size and a time, a block ends at the first of both."""
+        aggregator = aggregation.Aggregator(HEADERS, block_size=3,
+                                            block_time=1.0)
+
+        aggregator.add([0.0, 1.0, 0.0])
+        row = aggregator.add([2.0, 2.0, 0.0])
+        self.assertEqual(statistics(row, 0)["count"], 1)
+
+        aggregator.add([2.1, 3.0, 0.0])
+        row = aggregator.add([2.2, 4.0, 0.0])
+        self.assertEqual(statistics(row, 0)["count"], 3)
+
+    def test_growing_block(self):
+        """A block by time holds more samples than its first capacity."""
+        aggregator = aggregation.Aggregator(HEADERS, block_time=1000.0)
+        for t in range(200):
+            aggregator.add([float(t), float(t), 1.0])
+
+        row = aggregator.flush()
+        self.assertEqual(statistics(row, 0)["count"], 200)
+        self.assertEqual(statistics(row, 0)["last"], 199.0)
+
+    def test_flush(self):
+        """flush gives the unfinished block, then nothing."""
+        aggregator = aggregation.Aggregator(HEADERS, block_size=10)
+        self.assertTrue(aggregator.flush() is None)
+
+        aggregator.add([0.0, 1.0, 2.0])
+        row = aggregator.flush()
+        self.assertEqual(statistics(row, 1)["last"], 2.0)
+        self.assertTrue(aggregator.flush() is None)
+
+    def test_invalid(self):
+        """A block needs a size or a time, and a size of at least 1."""
+        self.assertRaises(ValueError, aggregation.Aggregator, HEADERS)
+        self.assertRaises(ValueError, aggregation.Aggregator, HEADERS, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
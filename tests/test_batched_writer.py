@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+@summary: Tests of log_writer.BatchedWriter : flushes on batch size, on
+          flush interval and on close, and errors of the writer thread.
+"""
+
+import sys
+import time
+import threading
+import unittest
+from StringIO import StringIO
+
+import tests
+import log_writer
+
+
+class RecordingFile(object):
+
+    """File recording its writes and the text flushed at each flush. Writes
+    fail with IOError once fail is set."""
+
+    def __init__(self):
+        self.text = ""
+        self.flushes = []
+        self.closed = False
+        self.fail = False
+        self.flushed = threading.Event()
+
+    def write(self, data):
+        """Record data, or raise IOError."""
+        if self.fail:
+            raise IOError(28, "No space left on device")
+        self.text += data
+
+    def flush(self):
+        """Record the text written so far."""
+        self.flushes.append(self.text)
+        self.flushed.set()
+
+    def fileno(self):
+        """No file descriptor : fsync is not tested."""
+        raise IOError("No file descriptor")
+
+    def close(self):
+        """Record the close."""
+        self.closed = True
+
+
+def _lines(count, first=0):
+    """Return count lines "<index>\\n"."""
+    return [str(index) + "\n" for index in range(first, first + count)]
+
+
+class TestBatchedWriter(unittest.TestCase):
+
+    """BatchedWriter : when lines are flushed, and write errors."""
+
+    def setUp(self):
+        self.log_file = RecordingFile()
+        self.stderr = sys.stderr
+        sys.stderr = StringIO()
+
+    def tearDown(self):
+        sys.stderr = self.stderr
+
+    def _wait_flush(self, timeout=5):
+        """Wait for the next flush of the file."""
+        self.log_file.flushed.wait(timeout)
+        self.log_file.flushed.clear()
+
+    def test_flush_on_batch_size(self):
+        """The file is flushed each time batch_size lines are written."""
+        writer = log_writer.BatchedWriter(self.log_file, batch_size=3,
+                                          flush_interval=60)
+        for line in _lines(3):
+            writer.write(line)
+        self._wait_flush()
+        self.assertEqual(self.log_file.flushes, ["".join(_lines(3))])
+
+        for line in _lines(2, 3):
+            writer.write(line)
+        self._wait_flush(0.1)
+        self.assertEqual(len(self.log_file.flushes), 1)
+
+        writer.write("5\n")
+        self._wait_flush()
+        self.assertEqual(self.log_file.flushes[1], "".join(_lines(6)))
+
+        writer.close()
+        self.assertEqual(writer.written, 6)
+
+    def test_flush_on_interval(self):
+        """Lines fewer than batch_size are flushed after flush_interval,
+        even if no other line comes."""
+        writer = log_writer.BatchedWriter(self.log_file, batch_size=100,
+                                          flush_interval=0.05)
+        start = time.time()
+        writer.write("0\n")
+
+        self._wait_flush()
+        self.assertTrue(0.04 <= time.time() - start < 1.0)
+        self.assertEqual(self.log_file.flushes, ["0\n"])
+        writer.close()
+
+    def test_flush_on_close(self):
+        """close writes and flushes the remaining lines, then closes the
+        file. Lines written after close are ignored."""
+        writer = log_writer.BatchedWriter(self.log_file, batch_size=100,
+                                          flush_interval=60)
+        for line in _lines(5):
+            writer.write(line)
+
+        writer.close()
+        self.assertEqual(self.log_file.flushes[-1], "".join(_lines(5)))
+        self.assertTrue(self.log_file.closed)
+
+        writer.write("5\n")
+        self.assertEqual(self.log_file.text, "".join(_lines(5)))
+        self.assertEqual(writer.written, 5)
+
+    def test_write_error(self):
+        """An IOError of the writer thread is kept in error, reported on
+        stderr and in the statistics, and the next lines are dropped."""
+        writer = log_writer.BatchedWriter(self.log_file, batch_size=1,
+                                          flush_interval=60)
+        writer.write("0\n")
+        self._wait_flush()
+
+        self.log_file.fail = True
+        for line in _lines(3, 1):
+            writer.write(line)
+        writer.close()
+
+        self.assertTrue(isinstance(writer.error, IOError))
+        self.assertEqual(writer.written, 1)
+        self.assertEqual(writer.dropped, 3)
+        self.assertTrue(self.log_file.closed)
+        self.assertTrue("Writing to the output file failed" in
+                        sys.stderr.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
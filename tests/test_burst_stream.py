@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+@summary: Tests of multi_logger.BurstStream : timestamps of the samples of a
+          device in burst mode, and overflows of its buffer.
+"""
+
+import sys
+import unittest
+from StringIO import StringIO
+
+import tests
+import multi_logger
+
+
+class RowWriter(object):
+
+    """Writer keeping the rows written."""
+
+    def __init__(self):
+        self.rows = []
+
+    def write(self, row):
+        """Keep a row."""
+        self.rows.append(row)
+
+
+class TestBurstStream(unittest.TestCase):
+
+    """BurstStream.split : one row per device sample, on the device time."""
+
+    def setUp(self):
+        self.now = 0.0
+        self.stderr = sys.stderr
+        sys.stderr = StringIO()
+
+    def tearDown(self):
+        sys.stderr = self.stderr
+
+    def _stream(self, buffer_size=None):
+        """Return a stream of 2 channels sampled every 0.1 s from 0, on the
+        test clock."""
+        stream = multi_logger.BurstStream("ADC24", ["Time", "A", "B"], 0.0,
+                                          0.1, buffer_size,
+                                          lambda: self.now)
+        stream.writer = RowWriter()
+        stream.encode = list
+        return stream
+
+    def _read(self, stream, now, nb_samples):
+        """Read nb_samples samples at now, return the times of the rows."""
+        self.now = now
+        first = len(stream.writer.rows)
+        values = {"A": range(nb_samples), "B": range(nb_samples)}
+        last = nb_samples - 1 if nb_samples else None
+        self.assertEqual(stream.split(values, 0.0, 2), [last, last])
+
+        return [row[0] for row in stream.writer.rows[first:]]
+
+    def test_device_time(self):
+        """Sample k is at t_run + k * interval, whatever the time of the
+        reads."""
+        stream = self._stream(1000)
+
+        self.assertEqual(self._read(stream, 0.45, 5),
+                         [0.0, 0.1, 0.2, 0.3, 0.4])
+        self.assertEqual(self._read(stream, 1.0, 5),
+                         [0.5, 0.6, 0.7, 0.8, 0.9])
+        self.assertEqual(self._read(stream, 1.3, 0), [])
+        self.assertEqual(stream.overflows, 0)
+        self.assertEqual(sys.stderr.getvalue(), "")
+
+    def test_lost_samples(self):
+        """Samples older than the device time are an overflow : the time
+        base is reset so that the last sample is the time of the read."""
+        stream = self._stream()
+        self._read(stream, 0.45, 5)
+
+        self.assertEqual(self._read(stream, 2.0, 5),
+                         [1.6, 1.7, 1.8, 1.9, 2.0])
+        self.assertEqual(stream.overflows, 1)
+        self.assertTrue("overflowed" in sys.stderr.getvalue())
+
+        self.assertEqual(self._read(stream, 2.55, 5),
+                         [2.1, 2.2, 2.3, 2.4, 2.5])
+        self.assertEqual(stream.overflows, 1)
+
+    def test_full_buffer(self):
+        """A full buffer of the device is an overflow."""
+        stream = self._stream(buffer_size=12)
+        self._read(stream, 0.45, 5)
+        self.assertEqual(stream.overflows, 0)
+
+        self.assertEqual(self._read(stream, 1.05, 6),
+                         [0.55, 0.65, 0.75, 0.85, 0.95, 1.05])
+        self.assertEqual(stream.overflows, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+@summary: Tests of log_writer.ChangeFilter : deadbands, missing values and
+          keyframes.
+"""
+
+import unittest
+
+import tests
+import log_writer
+
+
+class TestChangeFilter(unittest.TestCase):
+
+    """ChangeFilter : only the values which changed, and full rows every
+    keyframe_period."""
+
+    def setUp(self):
+        self.change_filter = log_writer.ChangeFilter(
+            ["Time", "A", "B"], {"A": 0.5}, keyframe_period=10.0)
+
+    def test_first_row_is_a_keyframe(self):
+        """The first row is kept as it is."""
+        self.assertEqual(self.change_filter.filter([0.0, 1.0, 2.0]),
+                         [0.0, 1.0, 2.0])
+        self.assertEqual(self.change_filter.keyframes, 1)
+
+    def test_unchanged_row_is_dropped(self):
+        """A row without any change is dropped."""
+        self.change_filter.filter([0.0, 1.0, 2.0])
+
+        self.assertTrue(self.change_filter.filter([1.0, 1.0, 2.0]) is None)
+        self.assertEqual(self.change_filter.rows, 2)
+        self.assertEqual(self.change_filter.kept, 1)
+
+    def test_deadband(self):
+        """Changes within the deadband are not kept, and the reference is the
+        last value kept."""
+        self.change_filter.filter([0.0, 1.0, 2.0])
+
+        self.assertTrue(self.change_filter.filter([1.0, 1.4, 2.0]) is None)
+        self.assertEqual(self.change_filter.filter([2.0, 1.6, 2.0]),
+                         [2.0, 1.6, None])
+        self.assertTrue(self.change_filter.filter([3.0, 2.0, 2.0]) is None)
+        self.assertEqual(self.change_filter.filter([4.0, 1.6, 2.1]),
+                         [4.0, None, 2.1])
+
+    def test_missing_values(self):
+        """A value which becomes missing is a change, kept as EMPTY_VALUE.
+        NaN and None are both missing."""
+        nan = float("nan")
+        row = self.change_filter.filter([0.0, 1.0, nan])
+        self.assertEqual(row[:2], [0.0, 1.0])
+        self.assertTrue(row[2] is log_writer.EMPTY_VALUE)
+
+        self.assertTrue(self.change_filter.filter([1.0, 1.0, None]) is None)
+
+        row = self.change_filter.filter([2.0, None, nan])
+        self.assertEqual(row[2], None)
+        self.assertTrue(row[1] is log_writer.EMPTY_VALUE)
+
+        self.assertTrue(self.change_filter.filter([3.0, nan, None]) is None)
+        self.assertEqual(self.change_filter.filter([4.0, 1.0, 3.0]),
+                         [4.0, 1.0, 3.0])
+
+    def test_not_sampled(self):
+        """The columns which are not sampled are unchanged."""
+        self.change_filter.filter([0.0, 1.0, 2.0])
+
+        self.assertTrue(self.change_filter.filter([1.0, None, 2.0], [2])
+                        is None)
+        self.assertEqual(self.change_filter.filter([2.0, 3.0, None], [1]),
+                         [2.0, 3.0, None])
+
+    def test_keyframes(self):
+        """A full row is kept every keyframe_period seconds."""
+        self.change_filter.filter([0.0, 1.0, 2.0])
+        self.change_filter.filter([5.0, 3.0, 2.0])
+
+        self.assertTrue(self.change_filter.filter([9.9, 3.0, 2.0]) is None)
+        self.assertEqual(self.change_filter.filter([10.0, 3.0, 2.0]),
+                         [10.0, 3.0, 2.0])
+        self.assertTrue(self.change_filter.filter([15.0, 3.0, 2.0]) is None)
+        self.assertEqual(self.change_filter.filter([20.0, 3.0, 2.0]),
+                         [20.0, 3.0, 2.0])
+        self.assertEqual(self.change_filter.keyframes, 3)
+
+    def test_sparse_keyframes(self):
+        """A keyframe carries every column : the last value of the columns
+        not sampled, EMPTY_VALUE if it is missing, and None only if it was
+        never sampled."""
+        self.assertEqual(self.change_filter.filter([0.0, 1.0, None], [1]),
+                         [0.0, 1.0, None])
+        self.change_filter.filter([5.0, None, 2.0], [2])
+        self.change_filter.filter([6.0, None, 4.0], [1, 2])
+
+        row = self.change_filter.filter([10.0, None, None], [2])
+        self.assertEqual(row[0], 10.0)
+        self.assertTrue(row[1] is log_writer.EMPTY_VALUE)
+        self.assertTrue(row[2] is log_writer.EMPTY_VALUE)
+
+        self.assertEqual(self.change_filter.filter([20.0, 7.0, None], [1]),
+                         [20.0, 7.0, log_writer.EMPTY_VALUE])
+
+
+if __name__ == "__main__":
+    unittest.main()
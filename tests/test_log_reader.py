@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+@requires: numpy
+
+@summary: Tests of log_reader.TextLog.read_range and chunks, with and
+          without the index written by log_writer.RotatingFile, and of
+          log_reader.BinaryLog.read_range.
+"""
+
+import os
+import struct
+import shutil
+import tempfile
+import unittest
+
+import tests
+import log_reader
+import log_writer
+
+
+# Samples of the test log : every 0.1 s for 10 s
+SAMPLES = 100
+
+
+class TestTextLog(unittest.TestCase):
+
+    """TextLog.read_range : the index only changes how a time is found."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "log.csv")
+
+        log_file = log_writer.RotatingFile(self.path, "Time,A,B\n",
+                                           index_interval=1.0)
+        for index in range(SAMPLES):
+            value = "" if index % 10 == 5 else str(2 * index)
+            log_file.write("%.1f,%s,%d\n" % (index / 10.0, value, index))
+        log_file.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _check_ranges(self, log):
+        """Check read_range on the test log."""
+        self.assertEqual(log.columns, ["Time", "A", "B"])
+
+        data = log.read_range(2.0, 3.0)
+        self.assertEqual(data["Time"].tolist(),
+                         [index / 10.0 for index in range(20, 31)])
+        self.assertEqual(data["B"].tolist(), range(20, 31))
+
+        data = log.read_range(2.35, 2.55, ["A"])
+        self.assertEqual(data.keys(), ["A"])
+        self.assertEqual(data["A"][0], 48.0)
+        self.assertTrue(data["A"][1] != data["A"][1])
+
+        self.assertEqual(len(log.read_range()["Time"]), SAMPLES)
+        self.assertEqual(log.read_range(t_end=0.25)["B"].tolist(),
+                         [0, 1, 2])
+        self.assertEqual(log.read_range(9.85)["B"].tolist(), [99])
+        self.assertEqual(len(log.read_range(20.0)["Time"]), 0)
+        self.assertEqual(len(log.read_range(3.01, 3.09)["Time"]), 0)
+
+    def test_with_index(self):
+        """The index gives the position of the times."""
+        self.assertTrue(os.path.exists(self.path +
+                                       log_writer.INDEX_EXTENSION))
+
+        log = log_reader.TextLog(self.path)
+        self.assertTrue(log.index is not None)
+        self._check_ranges(log)
+
+    def test_without_index(self):
+        """Without index, the times are found by bisection."""
+        os.remove(self.path + log_writer.INDEX_EXTENSION)
+
+        log = log_reader.TextLog(self.path)
+        self.assertTrue(log.index is None)
+        self._check_ranges(log)
+
+    def test_line_being_written(self):
+        """A last line without end of line is ignored."""
+        with open(self.path, "ab") as log_file:
+            log_file.write("10.0,200")
+
+        for index_path in (None, self.path + log_writer.INDEX_EXTENSION):
+            if index_path is not None:
+                os.remove(index_path)
+
+            log = log_reader.TextLog(self.path)
+            self.assertEqual(len(log.read_range(9.0)["Time"]), 10)
+
+    def test_chunks(self):
+        """chunks gives the range by chunks of at most chunk_size
+        samples."""
+        log = log_reader.TextLog(self.path)
+
+        chunks = list(log.chunks(1.0, 5.0, ["B"], chunk_size=16))
+        self.assertTrue(all(len(chunk["B"]) <= 16 for chunk in chunks))
+        self.assertTrue(len(chunks) > 2)
+        self.assertEqual(sum([chunk["B"].tolist() for chunk in chunks], []),
+                         range(10, 51))
+
+
+class TestBinaryLog(unittest.TestCase):
+
+    """BinaryLog.read_range, on the records of a binary log file."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "log.bin")
+
+        with open(self.path, "wb") as log_file:
+            log_file.write(log_writer.binary_header(["Time", "A"]))
+            for index in range(SAMPLES):
+                log_file.write(struct.pack("<2d", index / 10.0, 2 * index))
+
+            # Record being written when logging stopped
+            log_file.write(struct.pack("<d", 10.0))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_read_range(self):
+        """The samples between two times are views on the records."""
+        log = log_reader.BinaryLog(self.path)
+        self.assertEqual(len(log), SAMPLES)
+
+        data = log.read_range(2.0, 2.3, ["A"])
+        self.assertEqual(data.keys(), ["A"])
+        self.assertEqual(data["A"].tolist(), [40.0, 42.0, 44.0, 46.0])
+        self.assertEqual(log.read_range(9.85)["A"].tolist(), [198.0])
+        self.assertEqual(len(log.read_range(20.0)["Time"]), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+@requires: numpy
+
+@summary: Tests of log_replay.ReplaySource : the pace of the replay, the
+          values read from text and binary logs, and the end of the file.
+"""
+
+import os
+import time
+import struct
+import shutil
+import tempfile
+import unittest
+
+import tests
+import log_replay
+import log_writer
+
+
+class FakeClock(object):
+
+    """Clock of a replay, moved forward by the test."""
+
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestReplaySource(unittest.TestCase):
+
+    """ReplaySource on small text and binary logs."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _text_log(self, lines, header="Time,A,B"):
+        """Return the path of a text log of lines."""
+        path = os.path.join(self.directory, "log.csv")
+        with open(path, "w") as log_file:
+            log_file.write(header + "\n")
+            for line in lines:
+                log_file.write(line + "\n")
+
+        return path
+
+    def _binary_log(self, rows):
+        """Return the path of a binary log of rows (Time, A)."""
+        path = os.path.join(self.directory, "log.bin")
+        with open(path, "wb") as log_file:
+            log_file.write(log_writer.binary_header(["Time", "A"]))
+            for row in rows:
+                log_file.write(struct.pack("<2d", *row))
+
+        return path
+
+    def _replay(self, source):
+        """Wait for every sample of a replay, and return them."""
+        samples = []
+        for (row_time, values) in source:
+            self.assertTrue(source.wait(row_time))
+            samples.append((row_time, values))
+
+        return samples
+
+    def test_speed_0(self):
+        """As fast as possible, wait never waits."""
+        path = self._text_log(["%d,%d,0" % (index, index)
+                               for index in range(100)])
+        source = log_replay.ReplaySource(path, speed=0)
+
+        start = time.time()
+        samples = self._replay(source)
+        self.assertTrue(time.time() - start < 1.0)
+
+        self.assertEqual(len(samples), 100)
+        self.assertEqual(samples[-1], (99.0, [99.0, 0.0]))
+        self.assertEqual(source.max_lateness, 0.0)
+
+    def test_speed_1(self):
+        """At speed 1, samples come at the times of the file, the first one
+        at once."""
+        path = self._text_log(["10.0,1,0", "10.05,2,0", "10.15,3,0"])
+        source = log_replay.ReplaySource(path, speed=1)
+
+        start = time.time()
+        times = []
+        for (row_time, _) in source:
+            self.assertTrue(source.wait(row_time))
+            times.append(time.time() - start)
+
+        self.assertTrue(times[0] < 0.02, times)
+        self.assertTrue(0.05 <= times[1] < 0.08, times)
+        self.assertTrue(0.15 <= times[2] < 0.18, times)
+
+    def test_speed(self):
+        """At speed 2, samples come twice faster, on the clock of the
+        replay."""
+        clock = FakeClock(100.0)
+        path = self._text_log(["0.0,1,0", "1.0,2,0"])
+        source = log_replay.ReplaySource(path, speed=2, clock=clock)
+
+        self.assertTrue(source.wait(source.next_row()[0]))
+        clock.now = 100.6
+        self.assertTrue(source.wait(source.next_row()[0]))
+        self.assertAlmostEqual(source.max_lateness, 0.1)
+
+    def test_stop(self):
+        """A stopped replay does not wait anymore."""
+        path = self._text_log(["0.0,1,0", "100.0,2,0"])
+        source = log_replay.ReplaySource(path)
+
+        self.assertTrue(source.wait(source.next_row()[0]))
+        source.stop()
+
+        start = time.time()
+        self.assertFalse(source.wait(source.next_row()[0]))
+        self.assertTrue(time.time() - start < 1.0)
+
+    def test_text_values(self):
+        """Integers come back as floats, empty values and text as None."""
+        path = self._text_log(["0.0,3,", "0.1,abc,2.5"])
+        samples = self._replay(log_replay.ReplaySource(path, speed=0))
+
+        self.assertEqual(samples, [(0.0, [3.0, None]), (0.1, [None, 2.5])])
+        self.assertTrue(isinstance(samples[0][1][0], float))
+
+    def test_binary_values(self):
+        """NaN values of a binary log come back as None."""
+        path = self._binary_log([(0.0, 1.0), (0.1, float("nan"))])
+        samples = self._replay(log_replay.ReplaySource(path, speed=0))
+
+        self.assertEqual(samples, [(0.0, [1.0]), (0.1, [None])])
+
+    def test_chunks(self):
+        """A file longer than a chunk is replayed entirely, in order."""
+        path = self._binary_log([(index, 2 * index) for index in range(25)])
+        source = log_replay.ReplaySource(path, speed=0, chunk_size=10)
+
+        samples = self._replay(source)
+        self.assertEqual([row_time for (row_time, _) in samples],
+                         [float(index) for index in range(25)])
+        self.assertEqual(source.rows, 25)
+
+    def test_end_of_file(self):
+        """At the end of the file, next_row returns None, the replay is
+        finished, and its end time is set once."""
+        clock = FakeClock(10.0)
+        path = self._text_log(["0.0,1,0", "0.1,2,0"])
+        source = log_replay.ReplaySource(path, speed=0, clock=clock)
+
+        self.assertTrue(source.next_row() is not None)
+        clock.now = 12.0
+        self.assertTrue(source.next_row() is not None)
+        self.assertFalse(source.finished)
+        self.assertTrue(source.t_end is None)
+
+        clock.now = 14.0
+        self.assertTrue(source.next_row() is None)
+        self.assertTrue(source.finished)
+        self.assertEqual(source.t_end, 14.0)
+        self.assertEqual(source.rate, 0.5)
+
+        clock.now = 20.0
+        self.assertTrue(source.next_row() is None)
+        self.assertEqual(source.t_end, 14.0)
+
+    def test_invalid(self):
+        """A negative speed, or a file without "Time" first, is refused."""
+        path = self._text_log(["0.0,1"], header="A,Time")
+        self.assertRaises(ValueError, log_replay.ReplaySource, path)
+
+        path = self._text_log(["0.0,1,0"])
+        self.assertRaises(ValueError, log_replay.ReplaySource, path, -1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+@summary: Tests of log_stats : the buckets of a Histogram, its percentiles
+          and its last bucket, for the values longer than every edge.
+"""
+
+import unittest
+
+import tests
+import log_stats
+
+
+class TestHistogram(unittest.TestCase):
+
+    """Buckets, percentiles and overflow of a Histogram."""
+
+    def test_buckets(self):
+        """A value goes to the first bucket whose upper bound is not less
+        than it."""
+        histogram = log_stats.Histogram()
+        edges = log_stats.HISTOGRAM_EDGES
+
+        histogram.add(0.0)
+        histogram.add(edges[0])
+        histogram.add(edges[0] * 1.5)
+        histogram.add(edges[3])
+        histogram.add(edges[3] * 1.01)
+
+        self.assertEqual(histogram.buckets(),
+                         [(edges[0], 2), (edges[1], 1), (edges[3], 1),
+                          (edges[4], 1)])
+        self.assertEqual(histogram.count, 5)
+        self.assertEqual(histogram.minimum, 0.0)
+        self.assertEqual(histogram.maximum, edges[3] * 1.01)
+
+    def test_percentiles(self):
+        """A percentile is the upper bound of the bucket where it falls,
+        at most the maximum."""
+        histogram = log_stats.Histogram(edges=(1.0, 2.0, 4.0, 8.0))
+        for value in [0.5] * 50 + [1.5] * 40 + [3.0] * 9 + [5.0]:
+            histogram.add(value)
+
+        self.assertEqual(histogram.percentile(50), 1.0)
+        self.assertEqual(histogram.percentile(51), 2.0)
+        self.assertEqual(histogram.percentile(90), 2.0)
+        self.assertEqual(histogram.percentile(99), 4.0)
+        self.assertEqual(histogram.percentile(100), 5.0)
+
+        summary = histogram.summary()
+        self.assertEqual(summary["count"], 100)
+        self.assertEqual(summary["min"], 0.5)
+        self.assertEqual(summary["max"], 5.0)
+        self.assertAlmostEqual(summary["mean"], 1.17)
+        self.assertEqual((summary["p50"], summary["p90"], summary["p99"]),
+                         (1.0, 2.0, 4.0))
+
+    def test_overflow(self):
+        """Values longer than the last edge go to the last bucket, whose
+        percentiles are the maximum."""
+        histogram = log_stats.Histogram(edges=(1.0, 2.0))
+        histogram.add(0.5)
+        histogram.add(3.0)
+        histogram.add(30.0)
+
+        self.assertEqual(histogram.buckets(), [(1.0, 1), (None, 2)])
+        self.assertEqual(histogram.percentile(99), 30.0)
+
+        histogram = log_stats.Histogram()
+        histogram.add(60.0)
+        self.assertEqual(histogram.counts[-1], 1)
+        self.assertEqual(histogram.summary()["p50"], 60.0)
+
+    def test_empty(self):
+        """An empty histogram has no percentiles, no mean and no bucket."""
+        histogram = log_stats.Histogram()
+        summary = histogram.summary()
+
+        self.assertEqual(summary["count"], 0)
+        for name in ("mean", "min", "max", "p50", "p90", "p99"):
+            self.assertTrue(summary[name] is None)
+        self.assertEqual(histogram.buckets(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
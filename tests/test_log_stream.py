@@ -0,0 +1,220 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+@summary: Tests of log_stream and log_reader.StreamReader : samples sent to
+          a reader through a socket, and slow subscribers disconnected or
+          downsampled.
+"""
+
+import os
+import sys
+import time
+import socket
+import struct
+import shutil
+import tempfile
+import unittest
+from StringIO import StringIO
+
+import tests
+import log_stream
+import log_reader
+import log_writer
+
+
+HEADERS = ["Time", "A", "B"]
+
+# Columns of the records written to a slow subscriber : big records fill the
+# buffers of the operating system quickly
+WIDE_HEADERS = ["Time"] + ["C" + str(index) for index in range(1000)]
+
+
+def record(values):
+    """Return the binary record of a list of values."""
+    return struct.pack("<" + str(len(values)) + "d", *values)
+
+
+def tcp_address(server):
+    """Return the address to connect to a server listening on tcp port 0."""
+    return "tcp://127.0.0.1:" + str(server.socket_address[1])
+
+
+def numpy_rows(reader):
+    """Return every sample received by a reader until the end of the
+    stream, as a list of lists."""
+    rows = []
+    for array in reader:
+        rows.extend(array.tolist())
+
+    return rows
+
+
+def wait_for(predicate, timeout=2.0):
+    """Wait until predicate returns True, at most timeout seconds."""
+    deadline = time.time() + timeout
+    while not predicate() and time.time() < deadline:
+        time.sleep(0.005)
+
+    return predicate()
+
+
+class TestStream(unittest.TestCase):
+
+    """Samples and columns received by a StreamReader."""
+
+    def setUp(self):
+        self.server = log_stream.StreamServer(
+            "tcp://127.0.0.1:0", log_writer.binary_header(HEADERS))
+
+    def tearDown(self):
+        self.server.close()
+
+    def _reader(self, address):
+        """Return a reader connected to the server."""
+        reader = log_reader.StreamReader(address, timeout=2.0)
+        self.assertTrue(wait_for(lambda: self.server.subscribers == 1))
+        return reader
+
+    def test_round_trip(self):
+        """The records written come back as an array, with the columns of
+        the header, then the reader sees the end of the stream."""
+        reader = self._reader(tcp_address(self.server))
+
+        self.server.write(record([0.0, 1.0, 2.0]))
+        self.server.write(record([0.5, 3.0, 4.0]))
+        self.server.close()
+
+        rows = numpy_rows(reader)
+        reader.close()
+
+        self.assertEqual(reader.columns, HEADERS)
+        self.assertEqual(rows, [[0.0, 1.0, 2.0], [0.5, 3.0, 4.0]])
+        self.assertEqual(reader.received, 2)
+        self.assertEqual(self.server.written, 2)
+        self.assertEqual(self.server.connected, 1)
+
+    def test_new_columns(self):
+        """set_header changes the columns after the records already
+        written."""
+        reader = self._reader(tcp_address(self.server))
+
+        self.server.write(record([0.0, 1.0, 2.0]))
+        self.server.set_header(log_writer.binary_header(["Time", "C"]))
+        self.server.write(record([1.0, 5.0]))
+        self.server.close()
+
+        first = reader.read()
+        self.assertEqual(reader.columns, HEADERS)
+        self.assertEqual(first.tolist(), [[0.0, 1.0, 2.0]])
+
+        second = reader.read()
+        self.assertEqual(reader.columns, ["Time", "C"])
+        self.assertEqual(reader.to_dict(second)["C"].tolist(), [5.0])
+
+        self.assertTrue(reader.read() is None)
+        reader.close()
+
+    @unittest.skipIf(not hasattr(socket, "AF_UNIX"), "No Unix sockets")
+    def test_unix_socket(self):
+        """The same protocol on a Unix domain socket, whose file is removed
+        at close."""
+        directory = tempfile.mkdtemp()
+        try:
+            address = "unix://" + os.path.join(directory, "stream.sock")
+            self.server.close()
+            self.server = log_stream.StreamServer(
+                address, log_writer.binary_header(HEADERS))
+            reader = self._reader(address)
+
+            self.server.write(record([0.0, 1.0, 2.0]))
+            self.server.close()
+
+            self.assertEqual(numpy_rows(reader), [[0.0, 1.0, 2.0]])
+            reader.close()
+            self.assertFalse(os.path.exists(os.path.join(directory,
+                                                         "stream.sock")))
+        finally:
+            shutil.rmtree(directory)
+
+    def test_invalid(self):
+        """Invalid addresses and policies raise ValueError."""
+        self.assertRaises(ValueError, log_stream.parse_address,
+                          "tcp://127.0.0.1")
+        self.assertRaises(ValueError, log_stream.parse_address,
+                          "udp://127.0.0.1:4000")
+        self.assertRaises(ValueError, log_stream.StreamServer,
+                          "tcp://127.0.0.1:0", "", policy="block")
+
+
+class TestSlowSubscriber(unittest.TestCase):
+
+    """A subscriber which does not read, while records keep coming."""
+
+    def setUp(self):
+        self.stderr = sys.stderr
+        sys.stderr = StringIO()
+
+    def tearDown(self):
+        sys.stderr = self.stderr
+
+    def _fill(self, server, predicate):
+        """Write records to server until predicate is True."""
+        values = [0.0] * len(WIDE_HEADERS)
+        for _ in range(100000):
+            server.write(record(values))
+            if predicate():
+                return True
+
+        return False
+
+    def test_dropped(self):
+        """With the drop policy, the slow subscriber is disconnected, and
+        writing does not wait for it."""
+        server = log_stream.StreamServer(
+            "tcp://127.0.0.1:0", log_writer.binary_header(WIDE_HEADERS),
+            buffer_size=4, policy="drop")
+        try:
+            connection = socket.create_connection(("127.0.0.1",
+                                                   server.socket_address[1]))
+            self.assertTrue(wait_for(lambda: server.subscribers == 1))
+
+            start = time.time()
+            self.assertTrue(self._fill(server,
+                                       lambda: server.disconnected == 1))
+            self.assertTrue(time.time() - start < 5.0)
+
+            self.assertEqual(server.subscribers, 0)
+            self.assertTrue("Slow stream subscriber disconnected" in
+                            sys.stderr.getvalue())
+
+            # Records written after are not sent to anybody
+            server.write(record([0.0] * len(WIDE_HEADERS)))
+            self.assertEqual(server.disconnected, 1)
+            connection.close()
+        finally:
+            server.close()
+
+    def test_downsampled(self):
+        """With the downsample policy, the slow subscriber stays connected
+        and records are dropped for it."""
+        server = log_stream.StreamServer(
+            "tcp://127.0.0.1:0", log_writer.binary_header(WIDE_HEADERS),
+            buffer_size=4, policy="downsample")
+        try:
+            connection = socket.create_connection(("127.0.0.1",
+                                                   server.socket_address[1]))
+            self.assertTrue(wait_for(lambda: server.subscribers == 1))
+
+            self.assertTrue(self._fill(server, lambda: server.dropped > 10))
+            self.assertEqual(server.subscribers, 1)
+            self.assertEqual(server.disconnected, 0)
+            self.assertTrue(server.backpressure > 0)
+            self.assertTrue(server.backlog <= 4)
+            connection.close()
+        finally:
+            server.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+@requires: numpy
+
+@summary: Tests of multi_logger.Logger with the simulated ALMemory : the
+          subscriptions get the logged lines, the output file can be read
+          back, a process which is not running gives empty values, and
+          sections of different periods give sparse rows.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import tests
+import log_reader
+import multi_logger
+
+
+CONFIG = """[ALMemory]
+A : Device/A/Value
+B : Device/B/Value
+"""
+
+# Sample period of the test logger, in seconds
+PERIOD = 0.01
+
+
+class TestLogger(unittest.TestCase):
+
+    """Logger : subscriptions and text output."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.config_file_path = os.path.join(self.directory, "test.cfg")
+        with open(self.config_file_path, "w") as config_file:
+            config_file.write(CONFIG)
+
+        self.output = os.path.join(self.directory, "log.csv")
+        self.logger = multi_logger.Logger(
+            "127.0.0.1", self.config_file_path, PERIOD, self.output, 4,
+            class_getter=True)
+
+    def tearDown(self):
+        self.logger.stop()
+        shutil.rmtree(self.directory)
+
+    def test_subscriptions(self):
+        """Each subscription gets every line, in order."""
+        first = self.logger.subscribe()
+        second = self.logger.subscribe()
+        self.logger.log()
+
+        lines = [first.get(5) for _ in range(10)]
+        self.assertEqual(sorted(lines[0]), ["A", "B", "Time"])
+        times = [line["Time"] for line in lines]
+        self.assertEqual(times, sorted(times))
+        self.assertEqual(second.get(5)["Time"], times[0])
+        self.assertEqual(first.dropped, 0)
+
+        second.close()
+        self.assertEqual(self.logger.stats()["consumers"]["subscriptions"],
+                         2)
+
+    @unittest.skipIf(not os.path.exists("/proc/loadavg"), "needs /proc")
+    def test_process_not_running(self):
+        """A process which is not running gives empty values."""
+        with open(self.config_file_path, "a") as config_file:
+            config_file.write("[Process]\nMissing : no_such_process_* rss\n")
+
+        self.logger.stop()
+        self.logger = multi_logger.Logger(
+            "127.0.0.1", self.config_file_path, PERIOD, self.output, 4,
+            class_getter=True)
+        subscription = self.logger.subscribe()
+        self.logger.log()
+        subscription.get(5)
+        self.logger.stop()
+
+        with open(self.output) as log_file:
+            headers = log_file.readline().strip().split(",")
+            values = log_file.readline().strip().split(",")
+
+        self.assertEqual(sorted(headers), ["A", "B", "Missing", "Time"])
+        self.assertEqual(values[headers.index("Missing")], "")
+        self.assertNotEqual(values[headers.index("A")], "")
+
+    def test_output(self):
+        """The lines of the output file are the logged lines."""
+        subscription = self.logger.subscribe()
+        self.logger.log()
+
+        times = [subscription.get(5)["Time"] for _ in range(5)]
+        self.logger.stop()
+
+        data = log_reader.TextLog(self.output).read_range()
+        self.assertEqual(sorted(data), ["A", "B", "Time"])
+        self.assertEqual(data["Time"][:5].tolist(), times)
+
+        output = self.logger.stats()["writers"]["output"]
+        self.assertTrue(output["written"] >= 5)
+        self.assertEqual(output["dropped"], 0)
+        self.assertTrue(output["error"] is None)
+
+
+class TestMultiRate(unittest.TestCase):
+
+    """Logger with sections of different periods : sparse rows."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.config_file_path = os.path.join(self.directory, "test.cfg")
+        with open(self.config_file_path, "w") as config_file:
+            config_file.write(CONFIG + "period : 0.02\n"
+                              "[CPULoad]\nUser : User\n")
+
+        self.output = os.path.join(self.directory, "log.csv")
+        self.logger = multi_logger.Logger(
+            "127.0.0.1", self.config_file_path, PERIOD, self.output)
+
+    def tearDown(self):
+        self.logger.stop()
+        shutil.rmtree(self.directory)
+
+    def test_sparse_rows(self):
+        """A row has the values of the periods due at its tick only, the
+        other columns being empty."""
+        self.assertEqual(self.logger.periods, [PERIOD, 0.02])
+
+        self.logger.log1Line(False, [0])
+        self.logger.log1Line(False, [0, 1])
+        self.logger.log1Line(False, [1])
+        self.logger.stop()
+
+        with open(self.output) as log_file:
+            headers = log_file.readline().strip().split(",")
+            rows = [dict(zip(headers, line.strip().split(",")))
+                    for line in log_file]
+
+        columns = [header for header in headers if header != "Time"]
+        self.assertEqual(sorted(columns), ["A", "B", "User"])
+        self.assertEqual([sorted(key for key in columns if row[key] != "")
+                          for row in rows],
+                         [["User"], ["A", "B", "User"], ["A", "B"]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+@requires: numpy
+
+@summary: Tests of multi_logger.LoggerPool with the simulated ALMemory :
+          merged output, robots without values, and the options a pool
+          cannot honour.
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import threading
+import unittest
+from StringIO import StringIO
+
+import tests
+import simulated_sources
+import multi_logger
+
+
+CONFIG = """[ALMemory]
+A : Device/A/Value
+"""
+
+ROBOTS = ["10.0.0.1", "10.0.0.2"]
+
+# Sample period of the test pool, in seconds
+PERIOD = 0.01
+
+
+class TestLoggerPool(unittest.TestCase):
+
+    """LoggerPool : merged lines and refused options."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.config_file_path = os.path.join(self.directory, "test.cfg")
+        self.output = os.path.join(self.directory, "log.csv")
+        self._write_config(CONFIG)
+
+        self.stdout = sys.stdout
+        sys.stdout = StringIO()
+
+    def tearDown(self):
+        sys.stdout = self.stdout
+        simulated_sources.clear_failures()
+        shutil.rmtree(self.directory)
+
+    def _write_config(self, config):
+        """Write the configuration file of the test."""
+        with open(self.config_file_path, "w") as config_file:
+            config_file.write(config)
+
+    def _pool(self, **options):
+        """Return a LoggerPool of ROBOTS writing to output."""
+        return multi_logger.LoggerPool(ROBOTS, self.config_file_path, PERIOD,
+                                       self.output, **options)
+
+    def test_merged_output(self):
+        """One line per tick, with the columns of every robot."""
+        pool = self._pool()
+        pool.log1Line()
+        pool.stop()
+
+        with open(self.output) as log_file:
+            headers = log_file.readline().strip().split(",")
+            values = log_file.readline().strip().split(",")
+
+        self.assertEqual(headers, ["Time", "10.0.0.1:Time", "10.0.0.1:A",
+                                   "10.0.0.2:Time", "10.0.0.2:A"])
+        self.assertTrue(all(value != "" for value in values))
+
+    def test_robot_without_values(self):
+        """A robot which fails gets empty fields, not "None"."""
+        pool = self._pool()
+        simulated_sources.set_failure("ALMemory", "Device/A/Value")
+        pool.log1Line()
+        pool.stop()
+
+        with open(self.output) as log_file:
+            log_file.readline()
+            values = log_file.readline().strip().split(",")
+
+        self.assertEqual(values[1:], ["", "", "", ""])
+
+    def test_loggers_in_calling_thread(self):
+        """The loggers are created in the thread creating the pool."""
+        threads = []
+        logger_class = multi_logger.Logger
+
+        class RecordingLogger(logger_class):
+
+            """Logger recording the thread creating it."""
+
+            def __init__(self, *args, **kwargs):
+                threads.append(threading.current_thread())
+                logger_class.__init__(self, *args, **kwargs)
+
+        multi_logger.Logger = RecordingLogger
+        try:
+            self._pool().stop()
+        finally:
+            multi_logger.Logger = logger_class
+
+        self.assertEqual(threads, [threading.current_thread()] * 2)
+
+    def test_refused_options(self):
+        """Options ignored by the pool are refused."""
+        self.assertRaises(SystemExit, self._pool, change_only=True)
+        self.assertRaises(SystemExit, self._pool, aggregate_samples=10)
+
+        self._write_config(CONFIG + "period : 0.1\n")
+        self.assertRaises(SystemExit, self._pool)
+        self.assertRaises(SystemExit, self._pool, merge=False)
+        self.assertTrue("own period cannot be logged" in
+                        sys.stdout.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+@requires: numpy
+
+@summary: Tests of logger_process.LoggerProcess with the simulated ALMemory :
+          the engine process stops with stop, and when its parent dies
+          without stopping it.
+
+@platform : Linux (the state of the processes is read in /proc)
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import unittest
+import subprocess
+
+import tests
+import logger_process
+
+
+CONFIG = """[ALMemory]
+A : Device/A/Value
+"""
+
+# Parent process : start an engine, give its PID and die without stopping it
+PARENT = """
+import os
+import sys
+sys.path.insert(0, %r)
+
+import simulated_sources
+simulated_sources.install()
+
+import logger_process
+logger = logger_process.LoggerProcess("127.0.0.1", %r, 0.01, None)
+logger.log()
+sys.stdout.write("ENGINE %%d\\n" %% logger.process.pid)
+sys.stdout.flush()
+os._exit(0)
+"""
+
+# Maximum time for the engine to stop, in seconds
+STOP_TIME = 5 * logger_process.POLL_PERIOD
+
+
+def _alive(pid):
+    """Return True if a process is running (not a zombie)."""
+    try:
+        with open("/proc/" + str(pid) + "/stat") as stat_file:
+            data = stat_file.read()
+    except IOError:
+        return False
+
+    return data[data.rindex(")") + 2] != "Z"
+
+
+@unittest.skipIf(not os.path.exists("/proc/self/stat"), "needs /proc")
+class TestLoggerProcess(unittest.TestCase):
+
+    """LoggerProcess : the engine never outlives its parent."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.config_file_path = os.path.join(self.directory, "test.cfg")
+        with open(self.config_file_path, "w") as config_file:
+            config_file.write(CONFIG)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _wait_end(self, pid):
+        """Return True if the process ends within STOP_TIME."""
+        deadline = time.time() + STOP_TIME
+        while _alive(pid) and time.time() < deadline:
+            time.sleep(0.05)
+
+        return not _alive(pid)
+
+    def test_stop(self):
+        """stop ends the engine and gives its last statistics."""
+        logger = logger_process.LoggerProcess(
+            "127.0.0.1", self.config_file_path, 0.01, None)
+        logger.log()
+        self.assertTrue(logger.get_data(5) is not None)
+
+        logger.stop()
+        self.assertFalse(logger.alive)
+        self.assertTrue(logger.stats()["ticks"] > 0)
+
+    def test_parent_killed(self):
+        """The engine stops when its parent dies without stopping it."""
+        script = os.path.join(self.directory, "parent.py")
+        with open(script, "w") as script_file:
+            script_file.write(PARENT % (tests.ROOT, self.config_file_path))
+
+        parent = subprocess.Popen([sys.executable, script],
+                                  stdout=subprocess.PIPE)
+
+        pid = None
+        for line in iter(parent.stdout.readline, ""):
+            if line.startswith("ENGINE "):
+                pid = int(line.split()[1])
+                break
+        parent.wait()
+
+        self.assertTrue(pid is not None)
+        if not self._wait_end(pid):
+            os.kill(pid, 9)
+            self.fail("The engine process outlived its parent")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+@summary: Tests of plot_channel : samples given without waiting for a busy
+          plot, and coalesced into the next point.
+"""
+
+import sys
+import time
+import threading
+import unittest
+from StringIO import StringIO
+
+import tests
+import plot_channel
+
+
+HEADERS = ["A", "B"]
+
+
+class BusyServer(object):
+
+    """Plot server whose add_list_point waits until release is called."""
+
+    def __init__(self):
+        self.points = []
+        self.called = threading.Event()
+        self._released = threading.Event()
+
+    def add_list_point(self, elapsed_time, points):
+        """Record a point, once released."""
+        self.called.set()
+        self._released.wait(2.0)
+        self.points.append((elapsed_time, points))
+
+    def release(self):
+        """Let every call return at once."""
+        self._released.set()
+
+
+class FailingServer(object):
+
+    """Plot server whose add_list_point always fails."""
+
+    def add_list_point(self, elapsed_time, points):
+        """Raise an error, as a plot which is not running."""
+        raise IOError("Connection refused")
+
+
+def wait_for(predicate, timeout=2.0):
+    """Wait until predicate returns True, at most timeout seconds."""
+    deadline = time.time() + timeout
+    while not predicate() and time.time() < deadline:
+        time.sleep(0.005)
+
+    return predicate()
+
+
+class TestPlotChannel(unittest.TestCase):
+
+    """Samples given to a PlotChannel while its plot server is busy."""
+
+    def setUp(self):
+        self.server = BusyServer()
+        self.channel = plot_channel.PlotChannel(self.server, HEADERS,
+                                                plot_rate=1000)
+
+    def tearDown(self):
+        self.server.release()
+        self.channel.close()
+
+    def test_busy_plot(self):
+        """put does not wait for a busy plot, and the samples given
+        meanwhile are coalesced into the next point."""
+        self.channel.put(0.0, [0.0, 0.0])
+        self.assertTrue(self.server.called.wait(2.0))
+
+        start = time.time()
+        for index in range(1, 101):
+            self.channel.put(index * 0.01, [float(index), 1.0])
+        self.assertTrue(time.time() - start < 0.1)
+
+        self.server.release()
+        self.assertTrue(wait_for(lambda: len(self.server.points) == 2))
+        self.channel.close()
+
+        self.assertEqual(self.server.points[1],
+                         (1.0, [("A", 100.0), ("B", 1.0)]))
+        self.assertEqual(self.channel.received, 101)
+        self.assertEqual(self.channel.sent, 2)
+        self.assertEqual(self.channel.coalesced, 99)
+
+    def test_sparse(self):
+        """Sparse samples keep the previous values of the columns not
+        sampled, and None values are not plotted."""
+        self.channel.put(0.0, [0.0, 0.0])
+        self.assertTrue(self.server.called.wait(2.0))
+
+        self.channel.put(0.1, [1.0, 2.0], sparse=True)
+        self.channel.put(0.2, [None, 3.0], sparse=True)
+        self.channel.put(0.3, [None, None], sparse=True)
+        self.server.release()
+        self.assertTrue(wait_for(lambda: len(self.server.points) == 2))
+
+        self.assertEqual(self.server.points[1],
+                         (0.3, [("A", 1.0), ("B", 3.0)]))
+
+        self.channel.put(0.4, [None, 4.0])
+        self.assertTrue(wait_for(lambda: len(self.server.points) == 3))
+        self.assertEqual(self.server.points[2], (0.4, [("B", 4.0)]))
+
+    def test_close(self):
+        """close sends the sample waiting, then stops the thread."""
+        self.server.release()
+        self.channel.put(0.0, [1.0, 2.0])
+        self.channel.close()
+
+        self.assertEqual(self.server.points, [(0.0, [("A", 1.0),
+                                                     ("B", 2.0)])])
+        self.assertFalse(self.channel._thread.is_alive())
+
+    def test_plot_rate(self):
+        """Points are sent at most plot_rate times per second."""
+        self.server.release()
+        channel = plot_channel.PlotChannel(self.server, HEADERS,
+                                           plot_rate=20)
+        try:
+            start = time.time()
+            while time.time() - start < 0.3:
+                channel.put(time.time() - start, [1.0, 2.0])
+                time.sleep(0.001)
+        finally:
+            channel.close()
+
+        self.assertTrue(channel.sent <= 8, channel.sent)
+        self.assertTrue(channel.coalesced > 100)
+
+    def test_errors(self):
+        """Errors of the plot are counted and reported once."""
+        stderr = sys.stderr
+        sys.stderr = StringIO()
+        try:
+            channel = plot_channel.PlotChannel(FailingServer(), HEADERS,
+                                               plot_rate=1000)
+            for index in range(3):
+                channel.put(float(index), [1.0, 2.0])
+                self.assertTrue(wait_for(lambda: channel.errors == index + 1))
+            channel.close()
+            output = sys.stderr.getvalue()
+        finally:
+            sys.stderr = stderr
+
+        self.assertEqual(output.count("Real time plot failed"), 1)
+        self.assertEqual(channel.sent, 0)
+
+    def test_invalid_rate(self):
+        """The plot rate must be positive."""
+        self.assertRaises(ValueError, plot_channel.PlotChannel,
+                          self.server, HEADERS, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
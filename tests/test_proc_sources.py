@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+@requires: numpy
+
+@summary: Tests of proc_sources on the fixture files of tests/proc : the
+          parsers of /proc/<pid>, CpuLoad, Interrupts and Processes. The
+          fixtures are copied, so that their counters can be changed between
+          two calls.
+
+@platform : Linux
+"""
+
+import os
+import time
+import shutil
+import tempfile
+import unittest
+
+import tests
+
+try:
+    import proc_sources
+except (ImportError, AttributeError, ValueError):
+    # os.sysconf of the clock ticks and of the page size is Unix only
+    proc_sources = None
+
+
+def _read(path):
+    """Return the content of a file."""
+    with open(path) as proc_file:
+        return proc_file.read()
+
+
+@unittest.skipIf(proc_sources is None, "proc_sources needs Linux")
+class TestParsers(unittest.TestCase):
+
+    """Parsers of the files of /proc/<pid>."""
+
+    def _fixture(self, name):
+        """Return the content of a file of the fixture process."""
+        return _read(os.path.join(tests.PROC_FIXTURES, "1234", name))
+
+    def test_parse_stat(self):
+        """CPU time, threads and resident memory, the name containing a
+        space."""
+        self.assertEqual(proc_sources._parse_stat(self._fixture("stat")),
+                         {"cpu": 75, "threads": 3,
+                          "rss": 256 * proc_sources.PAGE_SIZE // 1024})
+
+    def test_parse_status(self):
+        """Voluntary and involuntary context switches."""
+        self.assertEqual(proc_sources._parse_status(self._fixture("status")),
+                         {"ctx": 15})
+
+    def test_parse_io(self):
+        """Bytes read from and written to storage."""
+        self.assertEqual(proc_sources._parse_io(self._fixture("io")),
+                         {"read": 4096, "write": 8192})
+
+
+@unittest.skipIf(proc_sources is None, "proc_sources needs Linux")
+class TestSources(unittest.TestCase):
+
+    """CpuLoad, Interrupts and Processes on a copy of the fixtures."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.proc = os.path.join(self.directory, "proc")
+        shutil.copytree(tests.PROC_FIXTURES, self.proc)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _replace(self, name, old, new):
+        """Replace a text in a fixture file, in place (the file stays
+        open)."""
+        path = os.path.join(self.proc, name)
+        data = _read(path)
+        self.assertTrue(old in data)
+
+        with open(path, "r+") as proc_file:
+            proc_file.truncate()
+            proc_file.write(data.replace(old, new))
+
+    def test_cpu_load(self):
+        """Loads since the boot, then since the last call."""
+        cpu_load = proc_sources.CpuLoad(os.path.join(self.proc, "stat"))
+        keys = ["User", "Idle.cpu1", "System.cpu0"]
+
+        self.assertEqual(cpu_load.calcLoad(keys), [10.0, 80.0, 6.0])
+
+        self._replace("stat", "cpu  100 0 50 800", "cpu  150 0 50 850")
+        self._replace("stat", "cpu1 40 0 20 400", "cpu1 90 0 20 450")
+        self.assertEqual(cpu_load.calcLoad(keys), [50.0, 50.0, 0.0])
+        cpu_load.close()
+
+    def test_cpu_load_unknown_field(self):
+        """A key which is not a field of /proc/stat is refused."""
+        cpu_load = proc_sources.CpuLoad(os.path.join(self.proc, "stat"))
+        self.assertRaises(KeyError, cpu_load.calcLoad, ["Busy"])
+        cpu_load.close()
+
+    def test_interrupts(self):
+        """Interrupts of every CPU or of one CPU, lines with less counters
+        being padded."""
+        interrupts = proc_sources.Interrupts(
+            os.path.join(self.proc, "interrupts"))
+        keys = ["LOC", "0.cpu1", "ERR"]
+
+        self.assertEqual(interrupts.nb_cpus, 2)
+        self.assertEqual(interrupts.calcInterrupts(keys), [3000, 5, 3])
+
+        self._replace("interrupts", "1000       2000", "1100       2050")
+        self.assertEqual(interrupts.calcInterrupts(keys), [150, 0, 0])
+
+        self.assertRaises(KeyError, interrupts.calcInterrupts, ["LOC.cpu2"])
+        interrupts.close()
+
+    def test_processes(self):
+        """Processes found by name, command line or PID, and a pattern
+        matching no process."""
+        processes = proc_sources.Processes(self.proc, rescan_period=0.0)
+        keys = ["my* rss", "*--flag* threads", "1234 ctx", "other rss"]
+
+        self.assertEqual(processes.calcProcesses(keys),
+                         [256 * proc_sources.PAGE_SIZE // 1024, 3, None,
+                          None])
+        self.assertEqual(processes.scans, 1)
+
+        self._replace(os.path.join("1234", "status"), "switches:\t10",
+                      "switches:\t20")
+        self.assertEqual(processes.calcProcesses(keys),
+                         [256 * proc_sources.PAGE_SIZE // 1024, 3, 10, None])
+        self.assertEqual(processes.scans, 1)
+
+        self.assertRaises(KeyError, processes.calcProcesses, ["my* heap"])
+        processes.close()
+
+    def test_new_process(self):
+        """A new process is found by the thread of the search, and its values
+        come at the next calls."""
+        processes = proc_sources.Processes(self.proc, rescan_period=0.0)
+        keys = ["*proc threads"]
+        self.assertEqual(processes.calcProcesses(keys), [3])
+
+        shutil.copytree(os.path.join(self.proc, "1234"),
+                        os.path.join(self.proc, "2345"))
+        self._replace("loadavg", "1/100 1234", "2/101 2345")
+        self.assertEqual(processes.calcProcesses(keys), [3])
+
+        deadline = time.time() + 5
+        while processes.scans < 2 and time.time() < deadline:
+            time.sleep(0.01)
+
+        self.assertEqual(processes.scans, 2)
+        self.assertEqual(processes.calcProcesses(keys), [6])
+        processes.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+@requires: numpy
+
+@summary: Tests of multi_logger.Logger.reload_config_file with the simulated
+          sources : a reload which fails leaves the logger as it was, and
+          the sources replaced or removed are closed.
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from StringIO import StringIO
+
+import tests
+import simulated_sources
+import multi_logger
+
+
+ALMEMORY = """[ALMemory]
+A : Device/A/Value
+"""
+
+CPU_LOAD = """[CPULoad]
+User : User
+"""
+
+INTERRUPTS = """[Interrupts]
+Timer : Timer
+"""
+
+
+class ClosingCpuLoad(simulated_sources.CpuLoad):
+
+    """Simulated CPU load recording its close."""
+
+    closed = []
+
+    def close(self):
+        """Record the close."""
+        ClosingCpuLoad.closed.append(self)
+
+
+class TestReload(unittest.TestCase):
+
+    """reload_config_file : all or nothing, and closed sources."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.config_file_path = os.path.join(self.directory, "test.cfg")
+        multi_logger._CONFIG_CACHE.clear()
+
+        self.module = sys.modules["cpu_interrupt_manager"]
+        self.module.CpuLoad = ClosingCpuLoad
+        del ClosingCpuLoad.closed[:]
+
+        self.stdout = sys.stdout
+        sys.stdout = StringIO()
+
+    def tearDown(self):
+        sys.stdout = self.stdout
+        self.module.CpuLoad = simulated_sources.CpuLoad
+        simulated_sources.clear_failures()
+        shutil.rmtree(self.directory)
+
+    def _write_config(self, config):
+        """Write the configuration file of the test."""
+        with open(self.config_file_path, "w") as config_file:
+            config_file.write(config)
+
+    def _logger(self, config):
+        """Return a logger of config, without output."""
+        self._write_config(config)
+        logger = multi_logger.Logger("127.0.0.1", self.config_file_path,
+                                     0.01, None)
+        self.addCleanup(logger.stop)
+        return logger
+
+    def test_removed_source_closed(self):
+        """A source removed from the configuration file is closed."""
+        logger = self._logger(ALMEMORY + CPU_LOAD)
+        cpu_load = logger.cpu_load
+
+        self._write_config(ALMEMORY)
+        self.assertTrue(logger.reload_config_file())
+
+        self.assertEqual(ClosingCpuLoad.closed, [cpu_load])
+        self.assertTrue(logger.cpu_load is None)
+        self.assertEqual(logger.headers, ["Time", "A"])
+
+    def test_replaced_source_closed(self):
+        """A source removed then added again is a new object, the previous
+        one being closed once."""
+        logger = self._logger(ALMEMORY + CPU_LOAD)
+        cpu_load = logger.cpu_load
+
+        self._write_config(ALMEMORY)
+        logger.reload_config_file()
+        self._write_config(ALMEMORY + CPU_LOAD + "System : System\n")
+        self.assertTrue(logger.reload_config_file())
+
+        self.assertEqual(ClosingCpuLoad.closed, [cpu_load])
+        self.assertTrue(logger.cpu_load not in (None, cpu_load))
+        self.assertEqual(len(logger.sample()), 3)
+
+    def test_failed_reload(self):
+        """If a new source fails, the logger keeps its configuration and
+        its sources, and the new sources already built are closed."""
+        logger = self._logger(ALMEMORY)
+        config_file_dic = logger.config_file_dic
+        plan = logger.plan
+
+        simulated_sources.set_failure("Interrupts", "Timer")
+        self._write_config(ALMEMORY + CPU_LOAD + INTERRUPTS)
+        self.assertFalse(logger.reload_config_file())
+
+        self.assertTrue(logger.config_file_dic is config_file_dic)
+        self.assertTrue(logger.plan is plan)
+        self.assertTrue(logger.cpu_load is None)
+        self.assertEqual(len(ClosingCpuLoad.closed), 1)
+        self.assertTrue("not reloaded" in sys.stdout.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
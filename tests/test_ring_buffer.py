@@ -0,0 +1,238 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+@requires: numpy
+
+@summary: Tests of ring_buffer : views of the history (window and since),
+          values which are not numbers, and subscriptions (drop, lag and
+          timed waits).
+"""
+
+import time
+import threading
+import unittest
+
+import numpy
+
+import tests
+import timing
+import ring_buffer
+
+
+MONOTONIC = timing.monotonic
+
+
+def _filled_ring(samples, capacity=4):
+    """Return a RingBuffer ("Time", "A") with the samples (t, 10 * t) for t
+    in range(samples)."""
+    ring = ring_buffer.RingBuffer(["Time", "A"], capacity)
+    for index in range(samples):
+        ring.append([float(index), 10.0 * index])
+
+    return ring
+
+
+class TestRingBuffer(unittest.TestCase):
+
+    """RingBuffer.window, since and wait."""
+
+    def test_window(self):
+        """The last n samples, oldest first."""
+        ring = _filled_ring(6)
+
+        window = ring.window(3)
+        self.assertEqual(window["Time"].tolist(), [3.0, 4.0, 5.0])
+        self.assertEqual(window["A"].tolist(), [30.0, 40.0, 50.0])
+
+    def test_window_longer_than_history(self):
+        """Only the samples kept are given."""
+        self.assertEqual(_filled_ring(6).window(10)["Time"].tolist(),
+                         [2.0, 3.0, 4.0, 5.0])
+        self.assertEqual(_filled_ring(2).window(10)["Time"].tolist(),
+                         [0.0, 1.0])
+        self.assertEqual(len(_filled_ring(0).window(3)["Time"]), 0)
+
+    def test_window_is_a_view(self):
+        """window does not copy the samples."""
+        ring = _filled_ring(6)
+        self.assertTrue(ring.window(3)["A"].base is not None)
+
+    def test_since(self):
+        """The samples whose time is greater or equal to t."""
+        ring = _filled_ring(6)
+
+        self.assertEqual(ring.since(3.5)["Time"].tolist(), [4.0, 5.0])
+        self.assertEqual(ring.since(4.0)["A"].tolist(), [40.0, 50.0])
+        self.assertEqual(ring.since(0.0)["Time"].tolist(),
+                         [2.0, 3.0, 4.0, 5.0])
+        self.assertEqual(len(ring.since(6.0)["Time"]), 0)
+
+    def test_values_not_numbers(self):
+        """None, strings and lists are NaN in the columns, and given back as
+        they are by latest and the subscriptions."""
+        ring = ring_buffer.RingBuffer(["Time", "A", "B", "C"], 4)
+        subscription = ring_buffer.Subscription(
+            ring, convert=lambda row: dict(zip(ring.headers, row)))
+        ring.append([0.0, None, "text", [1, 2]])
+        ring.append([1.0, 2, 3.5, "4"])
+
+        window = ring.window(2)
+        self.assertTrue(numpy.isnan(window["A"][0]))
+        self.assertTrue(numpy.isnan(window["B"][0]))
+        self.assertTrue(numpy.isnan(window["C"][1]))
+        self.assertEqual(window["A"][1], 2.0)
+
+        self.assertEqual(subscription.get(0),
+                         {"Time": 0.0, "A": None, "B": "text", "C": [1, 2]})
+        self.assertEqual(ring.objects(0), {1: None, 2: "text", 3: [1, 2]})
+        self.assertEqual(ring.latest(),
+                         {"Time": 1.0, "A": 2.0, "B": 3.5, "C": "4"})
+
+        for index in range(3):
+            ring.append([2.0 + index, 0.0, 0.0, 0.0])
+        self.assertTrue(ring.objects(4) is None)
+        self.assertRaises(IndexError, ring.objects, 0)
+
+    def test_shared_values_not_numbers(self):
+        """A shared ring buffer keeps only NaN."""
+        ring = ring_buffer.SharedRingBuffer(["Time", "A"], 4)
+        ring.append([0.0, "text"])
+
+        self.assertTrue(ring.objects(0) is None)
+        self.assertTrue(numpy.isnan(ring.latest()["A"]))
+
+    def test_wait(self):
+        """wait returns when the sample is appended, or after timeout."""
+        ring = _filled_ring(2)
+
+        self.assertTrue(ring.wait(1, 0))
+        self.assertFalse(ring.wait(2, 0.01))
+
+        timer = threading.Timer(0.05, ring.append, ([2.0, 20.0],))
+        timer.start()
+        self.assertTrue(ring.wait(2, 5))
+        timer.join()
+
+
+class TestSubscription(unittest.TestCase):
+
+    """Subscription : every sample in order, drop and lag."""
+
+    def test_get_in_order(self):
+        """Every sample appended after the subscription, in order."""
+        ring = _filled_ring(2)
+        subscription = ring_buffer.Subscription(ring)
+
+        for index in range(2, 5):
+            ring.append([float(index), 10.0 * index])
+
+        self.assertEqual(subscription.lag, 3)
+        self.assertEqual([subscription.get(0)[0] for _ in range(3)],
+                         [2.0, 3.0, 4.0])
+        self.assertEqual(subscription.lag, 0)
+        self.assertEqual(subscription.received, 3)
+        self.assertEqual(subscription.dropped, 0)
+        self.assertTrue(subscription.get(0.01) is None)
+
+    def test_drop_after_max_lag(self):
+        """The oldest samples are skipped and counted."""
+        ring = _filled_ring(0, capacity=10)
+        subscription = ring_buffer.Subscription(ring, max_lag=2)
+
+        for index in range(5):
+            ring.append([float(index), 10.0 * index])
+
+        self.assertEqual(subscription.lag, 5)
+        self.assertEqual(subscription.get(0)[0], 3.0)
+        self.assertEqual(subscription.dropped, 3)
+        self.assertEqual(subscription.get(0)[0], 4.0)
+        self.assertEqual(subscription.lag, 0)
+
+    def test_drop_after_capacity(self):
+        """A subscription cannot be more than capacity samples behind."""
+        ring = _filled_ring(0)
+        subscription = ring_buffer.Subscription(ring, max_lag=100)
+
+        for index in range(7):
+            ring.append([float(index), 10.0 * index])
+
+        self.assertEqual(subscription.get(0)[0], 3.0)
+        self.assertEqual(subscription.dropped, 3)
+
+    def test_convert(self):
+        """convert is applied to a copy of the row."""
+        ring = _filled_ring(0)
+        subscription = ring_buffer.Subscription(ring, convert=list)
+        ring.append([1.0, 10.0])
+
+        self.assertEqual(subscription.get(0), [1.0, 10.0])
+
+    def test_close(self):
+        """A closed subscription stops at once, a closed buffer once its
+        samples are read."""
+        ring = _filled_ring(0)
+        subscription = ring_buffer.Subscription(ring)
+
+        timer = threading.Timer(0.05, subscription.close)
+        timer.start()
+        self.assertTrue(subscription.get(5) is None)
+        timer.join()
+
+        other = ring_buffer.Subscription(ring)
+        ring.append([0.0, 0.0])
+        ring.close()
+        self.assertEqual([row.tolist() for row in other], [[0.0, 0.0]])
+        self.assertTrue(subscription.get(0) is None)
+
+    def test_timed_get_not_woken_by_others(self):
+        """Closing another subscription does not end a timed get early."""
+        ring = _filled_ring(0)
+        subscription = ring_buffer.Subscription(ring)
+        other = ring_buffer.Subscription(ring)
+
+        timer = threading.Timer(0.02, other.close)
+        timer.start()
+        start = time.time()
+        self.assertTrue(subscription.get(0.2) is None)
+        self.assertTrue(time.time() - start >= 0.15)
+        timer.join()
+
+    def test_timed_get_woken_by_append(self):
+        """A timed get returns as soon as a sample is appended."""
+        ring = _filled_ring(0)
+        subscription = ring_buffer.Subscription(ring)
+
+        timer = threading.Timer(0.02, ring.append, ([1.0, 10.0],))
+        timer.start()
+        start = time.time()
+        self.assertEqual(subscription.get(5)[0], 1.0)
+        self.assertTrue(time.time() - start < 1.0)
+        timer.join()
+
+    def test_timed_get_without_timer_threads(self):
+        """Timed gets share the thread of timing, instead of starting a
+        thread each."""
+        ring = _filled_ring(0)
+        subscription = ring_buffer.Subscription(ring)
+        subscription.get(0.001)
+        threads = set(threading.enumerate())
+
+        for _ in range(20):
+            self.assertTrue(subscription.get(0.001) is None)
+        self.assertEqual(set(threading.enumerate()) - threads, set())
+
+    def test_monotonic_deadline(self):
+        """The deadline of a timed wait is on the monotonic clock."""
+        ring = _filled_ring(0)
+        clock = iter([0.0, 10.0])
+        timing.monotonic = lambda: next(clock)
+        try:
+            with ring._condition:
+                self.assertFalse(ring._wait_for(lambda: False, 5))
+        finally:
+            timing.monotonic = MONOTONIC
+
+
+if __name__ == "__main__":
+    unittest.main()
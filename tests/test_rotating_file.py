@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+@summary: Tests of log_writer.RotatingFile : rotation by size and by time,
+          names of the segments, header of each segment, and compression.
+"""
+
+import os
+import bz2
+import gzip
+import shutil
+import tempfile
+import unittest
+
+import tests
+import log_writer
+
+
+HEADER = "Time,A\n"
+
+
+def _read(path):
+    """Return the content of a segment, uncompressed."""
+    if path.endswith(".gz"):
+        with gzip.open(path) as segment:
+            return segment.read()
+
+    if path.endswith(".bz2"):
+        with open(path, "rb") as segment:
+            return bz2.decompress(segment.read())
+
+    with open(path) as segment:
+        return segment.read()
+
+
+class TestRotatingFile(unittest.TestCase):
+
+    """RotatingFile : segments on disk."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "log.csv")
+        self.time = tests.FakeTime(log_writer.time, 1000.0)
+        log_writer.time = self.time
+
+    def tearDown(self):
+        log_writer.time = self.time._time
+        shutil.rmtree(self.directory)
+
+    def _path(self, name):
+        """Return the path of a file of the test directory."""
+        return os.path.join(self.directory, name)
+
+    def test_no_rotation(self):
+        """Without rotation, the output is path itself."""
+        output = log_writer.RotatingFile(self.path, HEADER)
+        output.write("0,1\n")
+        output.close()
+
+        self.assertEqual(output.segment_paths, [self.path])
+        self.assertEqual(_read(self.path), HEADER + "0,1\n")
+
+    def test_rotation_by_size(self):
+        """A new segment is started once the current one reaches
+        max_bytes, each segment beginning with the header."""
+        output = log_writer.RotatingFile(self.path, HEADER,
+                                         max_bytes=len(HEADER) + 8)
+        for index in range(5):
+            output.write("%d,%d\n" % (index, index))
+        output.close()
+
+        self.assertEqual(output.segment_paths,
+                         [self._path("log_0000.csv"),
+                          self._path("log_0001.csv"),
+                          self._path("log_0002.csv")])
+        self.assertEqual([_read(path) for path in output.segment_paths],
+                         [HEADER + "0,0\n1,1\n", HEADER + "2,2\n3,3\n",
+                          HEADER + "4,4\n"])
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_rotation_by_time(self):
+        """A new segment is started once the current one is older than
+        max_seconds."""
+        output = log_writer.RotatingFile(self.path, HEADER, max_seconds=10)
+        output.write("0,0\n")
+        self.time.now += 9.9
+        output.write("1,1\n")
+        self.time.now += 0.1
+        output.write("2,2\n")
+        self.time.now += 5
+        output.write("3,3\n")
+        output.close()
+
+        self.assertEqual([_read(path) for path in output.segment_paths],
+                         [HEADER + "0,0\n1,1\n", HEADER + "2,2\n3,3\n"])
+
+    def test_new_header(self):
+        """set_header continues in a new segment with the new header, even
+        without rotation."""
+        output = log_writer.RotatingFile(self.path, HEADER)
+        output.write("0,0\n")
+        output.set_header("Time,A,B\n")
+        output.write("1,1,1\n")
+        output.close()
+
+        self.assertEqual(output.segment_paths,
+                         [self.path, self._path("log_0001.csv")])
+        self.assertEqual(_read(output.segment_paths[1]),
+                         "Time,A,B\n1,1,1\n")
+
+    def test_compression(self):
+        """Each segment is a complete compressed file, named with the
+        extension of the compression."""
+        for compression in ("gzip", "bz2"):
+            extension = log_writer.COMPRESSION_EXTENSIONS[compression]
+            output = log_writer.RotatingFile(self.path + extension, HEADER,
+                                             compression, max_seconds=10)
+            output.write("0,0\n")
+            output.flush()
+            self.time.now += 10
+            output.write("1,1\n")
+            output.close()
+
+            self.assertEqual(output.segment_paths,
+                             [self._path("log_0000.csv" + extension),
+                              self._path("log_0001.csv" + extension)])
+            self.assertEqual([_read(path) for path in output.segment_paths],
+                             [HEADER + "0,0\n", HEADER + "1,1\n"])
+
+    def test_unknown_compression(self):
+        """An unknown compression is refused."""
+        self.assertRaises(ValueError, log_writer.RotatingFile, self.path,
+                          HEADER, "zip")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+@summary: Tests of multi_logger.DeadlineScheduler and its missed deadline
+          policies, and of multi_logger.MultiRateScheduler, on a simulated
+          clock.
+"""
+
+import sys
+import unittest
+
+import tests
+import multi_logger
+
+
+class TestDeadlineScheduler(unittest.TestCase):
+
+    """DeadlineScheduler : absolute deadlines and missed deadlines."""
+
+    def setUp(self):
+        self.time = tests.FakeTime(multi_logger.time)
+        multi_logger.time = self.time
+
+    def tearDown(self):
+        multi_logger.time = self.time._time
+
+    def _scheduler(self, policy):
+        """Return a scheduler of period 1 started at 0."""
+        scheduler = multi_logger.DeadlineScheduler(1.0, policy,
+                                                   self.time.clock)
+        scheduler.start(0.0)
+        return scheduler
+
+    def test_on_time(self):
+        """Deadlines are t_start + k * period, whatever the time spent
+        between two ticks."""
+        scheduler = self._scheduler("skip")
+
+        self.assertEqual(scheduler.wait(), 1.0)
+        self.time.now += 0.7
+        self.assertEqual(scheduler.wait(), 2.0)
+        self.assertEqual(self.time.now, 2.0)
+        self.assertEqual(scheduler.ticks, 2)
+        self.assertEqual(scheduler.overruns, 0)
+
+    def test_skip(self):
+        """The ticks late by a period or more are dropped, the last missed
+        tick is fired at once, and the grid is kept."""
+        scheduler = self._scheduler("skip")
+        self.time.now = 3.5
+
+        self.assertEqual(scheduler.wait(), 3.0)
+        self.assertEqual(self.time.now, 3.5)
+        self.assertEqual(scheduler.overruns, 1)
+        self.assertEqual(scheduler.skipped, 2)
+        self.assertEqual(scheduler.max_lateness, 2.5)
+        self.assertEqual(scheduler.wait(), 4.0)
+        self.assertEqual(self.time.now, 4.0)
+
+    def test_skip_boundary(self):
+        """A tick is skipped only when it is late by a period or more."""
+        scheduler = self._scheduler("skip")
+        self.time.now = 1.000001
+
+        self.assertEqual(scheduler.wait(), 1.0)
+        self.assertEqual(scheduler.overruns, 1)
+        self.assertEqual(scheduler.skipped, 0)
+
+        self.time.now = 2.999999
+        self.assertEqual(scheduler.wait(), 2.0)
+        self.assertEqual(scheduler.skipped, 0)
+
+        self.time.now = 4.0
+        self.assertEqual(scheduler.wait(), 4.0)
+        self.assertEqual(scheduler.skipped, 1)
+        self.assertEqual(scheduler.overruns, 3)
+        self.assertEqual(scheduler.ticks, 3)
+
+    def test_catch_up(self):
+        """The missed ticks are fired at once, until the grid is reached."""
+        scheduler = self._scheduler("catch_up")
+        self.time.now = 3.5
+
+        self.assertEqual([scheduler.wait() for _ in range(4)],
+                         [1.0, 2.0, 3.0, 4.0])
+        self.assertEqual(self.time.now, 4.0)
+        self.assertEqual(scheduler.overruns, 3)
+        self.assertEqual(scheduler.skipped, 0)
+        self.assertEqual(scheduler.ticks, 4)
+
+    def test_stretch(self):
+        """The grid restarts from the late tick."""
+        scheduler = self._scheduler("stretch")
+        self.time.now = 3.5
+
+        self.assertEqual(scheduler.wait(), 3.5)
+        self.assertEqual(scheduler.wait(), 4.5)
+        self.assertEqual(self.time.now, 4.5)
+        self.assertEqual(scheduler.overruns, 1)
+        self.assertEqual(scheduler.skipped, 0)
+
+    def test_monotonic_clock(self):
+        """The clock of the scheduler is monotonic on Linux, OS X and
+        Windows, not the time of the system."""
+        clock = multi_logger.monotonic
+        if sys.platform.startswith("linux") or \
+                sys.platform in ("darwin", "win32"):
+            self.assertTrue(clock is not self.time._time.time)
+
+        times = [clock() for _ in range(1000)]
+        self.assertEqual(times, sorted(times))
+
+    def test_unknown_policy(self):
+        """An unknown policy is refused."""
+        self.assertRaises(ValueError, multi_logger.DeadlineScheduler, 1.0,
+                          "later")
+
+
+class TestMultiRateScheduler(unittest.TestCase):
+
+    """MultiRateScheduler : one grid of deadlines per period."""
+
+    def setUp(self):
+        self.time = tests.FakeTime(multi_logger.time)
+        multi_logger.time = self.time
+
+    def tearDown(self):
+        multi_logger.time = self.time._time
+
+    def _scheduler(self, periods, policy="skip"):
+        """Return a scheduler of periods started at 0."""
+        scheduler = multi_logger.MultiRateScheduler(periods, policy,
+                                                    self.time.clock)
+        scheduler.start(0.0)
+        return scheduler
+
+    def _ticks(self, scheduler, count):
+        """Return the (deadline, due) of the next count ticks."""
+        ticks = []
+        for _ in range(count):
+            deadline = scheduler.wait()
+            ticks.append((round(deadline, 6), list(scheduler.due)))
+
+        return ticks
+
+    def test_own_deadlines(self):
+        """Each period fires on its own grid, together when their deadlines
+        are the same."""
+        scheduler = self._scheduler([0.1, 0.25])
+
+        self.assertEqual(self._ticks(scheduler, 7),
+                         [(0.1, [0]), (0.2, [0]), (0.25, [1]), (0.3, [0]),
+                          (0.4, [0]), (0.5, [0, 1]), (0.6, [0])])
+        self.assertEqual(round(self.time.now, 6), 0.6)
+        self.assertEqual(scheduler.ticks, 8)
+        self.assertEqual(scheduler.overruns, 0)
+
+    def test_late_tick(self):
+        """A late tick fires every period whose deadline passed, and each
+        period skips on its own grid."""
+        scheduler = self._scheduler([1.0, 3.0])
+        self.time.now = 3.5
+
+        self.assertEqual(self._ticks(scheduler, 2),
+                         [(3.0, [0, 1]), (4.0, [0])])
+        self.assertEqual(scheduler.skipped, 2)
+        self.assertEqual(scheduler.overruns, 2)
+        self.assertEqual(scheduler.max_lateness, 2.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
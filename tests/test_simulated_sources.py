@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+@summary: Tests of simulated_sources : values reproducible with a seed, the
+          latency of the calls, and the failures of chosen keys.
+"""
+
+import os
+import time
+import shutil
+import tempfile
+import unittest
+
+import tests
+import simulated_sources
+import multi_logger
+
+
+KEYS = ["Device/A/Value", "Device/B/Value"]
+
+
+class TestSimulatedSources(unittest.TestCase):
+
+    """Seed, latency and failures of the simulated sources, on a simulated
+    clock."""
+
+    def setUp(self):
+        self.time = tests.FakeTime(simulated_sources.time, 100.0)
+        simulated_sources.time = self.time
+
+    def tearDown(self):
+        simulated_sources.time = self.time._time
+        for source in simulated_sources.LATENCIES:
+            simulated_sources.set_latency(source, 0.0)
+        simulated_sources.set_noise(0.0)
+        simulated_sources.clear_failures()
+        simulated_sources.seed()
+
+    def _tc08(self):
+        """Return a simulated TC08 with channels 1 and 2."""
+        tc08 = simulated_sources.ModuleTc08()
+        tc08.setChannel(1, "K")
+        tc08.setChannel(2, "K")
+        return tc08
+
+    def _values(self, seed):
+        """Return the values of ALMemory and TC08 at the same times, the
+        random numbers starting from seed."""
+        simulated_sources.seed(seed)
+        proxy = simulated_sources.ALProxy("ALMemory")
+        tc08 = self._tc08()
+
+        values = []
+        for _ in range(3):
+            self.time.now += 0.5
+            values.append(proxy.getListData(KEYS))
+            values.append(list(tc08.getValues().values()))
+
+        return values
+
+    def test_signal(self):
+        """Without noise, each key is a sine wave of its own."""
+        proxy = simulated_sources.ALProxy("ALMemory")
+        self.time.now += 2.0
+
+        self.assertEqual(proxy.getListData(KEYS),
+                         [simulated_sources.math.sin(1.0),
+                          simulated_sources.math.sin(2.0)])
+        self.assertEqual(proxy.getData(KEYS[1]),
+                         simulated_sources.math.sin(2.0))
+
+    def test_seed(self):
+        """The same seed gives the same noisy values, another seed other
+        values."""
+        simulated_sources.set_noise(0.1)
+
+        values = self._values(3)
+        self.assertEqual(self._values(3), values)
+        self.assertNotEqual(self._values(4), values)
+
+        simulated_sources.set_noise(0.0)
+        self.assertEqual(self._values(3), self._values(4))
+
+    def test_latency(self):
+        """Each call sleeps the latency, plus a jitter reproducible with the
+        seed."""
+        simulated_sources.set_latency("TC08", 0.01)
+        tc08 = self._tc08()
+
+        tc08.getValues()
+        self.assertEqual(self.time.sleeps, [0.01])
+
+        simulated_sources.set_latency("TC08", 0.01, 0.005)
+        simulated_sources.seed(1)
+        del self.time.sleeps[:]
+        for _ in range(20):
+            tc08.getValues()
+        sleeps = list(self.time.sleeps)
+
+        self.assertTrue(all(0.005 <= latency <= 0.015 for latency in sleeps))
+        self.assertTrue(len(set(sleeps)) > 1)
+
+        simulated_sources.seed(1)
+        del self.time.sleeps[:]
+        for _ in range(20):
+            tc08.getValues()
+        self.assertEqual(self.time.sleeps, sleeps)
+
+        self.assertRaises(ValueError, simulated_sources.set_latency,
+                          "Camera", 0.01)
+
+    def test_real_latency(self):
+        """The latency is spent in the call."""
+        simulated_sources.time = self.time._time
+        simulated_sources.set_latency("ALMemory", 0.02)
+        proxy = simulated_sources.ALProxy("ALMemory")
+
+        start = time.time()
+        proxy.getListData(KEYS)
+        self.assertTrue(time.time() - start >= 0.02)
+
+    def test_failure(self):
+        """A call reading a failing key raises RuntimeError, the others
+        succeed."""
+        simulated_sources.set_failure("ALMemory", KEYS[1])
+        simulated_sources.set_failure("TC08", 2)
+        proxy = simulated_sources.ALProxy("ALMemory")
+
+        self.assertEqual(len(proxy.getListData(KEYS[:1])), 1)
+        self.assertRaises(RuntimeError, proxy.getListData, KEYS)
+        self.assertRaises(RuntimeError, proxy.getData, KEYS[1])
+        self.assertRaises(RuntimeError, self._tc08().getValues)
+
+        cpu_load = simulated_sources.CpuLoad()
+        self.assertEqual(len(cpu_load.calcLoad(["User"])), 1)
+
+        simulated_sources.clear_failures()
+        self.assertEqual(len(proxy.getListData(KEYS)), 2)
+
+        self.assertRaises(ValueError, simulated_sources.set_failure,
+                          "Camera", "Front")
+
+
+class TestLoggerFailure(unittest.TestCase):
+
+    """A failing key of the simulated ALMemory, seen by a Logger."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.config_file_path = os.path.join(self.directory, "test.cfg")
+        with open(self.config_file_path, "w") as config_file:
+            config_file.write("[ALMemory]\nA : Device/A/Value\n"
+                              "[CPULoad]\nUser : User\n")
+
+    def tearDown(self):
+        simulated_sources.clear_failures()
+        shutil.rmtree(self.directory)
+
+    def test_concurrent_failure(self):
+        """With concurrent acquisition, the failing source is counted in its
+        errors and gets None values, the other source is read."""
+        simulated_sources.set_failure("ALMemory", "Device/A/Value")
+        logger = multi_logger.Logger("127.0.0.1", self.config_file_path,
+                                     0.01, None, acquisition="concurrent")
+
+        values = logger.sample()
+        logger.stop()
+
+        headers = logger.rt_headers
+        self.assertTrue(values[headers.index("A")] is None)
+        self.assertTrue(values[headers.index("User")] is not None)
+        self.assertEqual(logger.stats()["sources"]["ALMemory"]["errors"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+@summary: Tests of timing : timed waits on condition variables, woken up by
+          the notifier thread at their deadline.
+"""
+
+import threading
+import unittest
+
+import tests
+import timing
+
+
+class TestTimedWait(unittest.TestCase):
+
+    """timed_wait and Notifier."""
+
+    def _timed_wait(self, condition, timeout):
+        """Return the time spent in timed_wait."""
+        start = timing.monotonic()
+        with condition:
+            timing.timed_wait(condition, timeout)
+        return timing.monotonic() - start
+
+    def test_timeout(self):
+        """Without notification, the wait ends at the deadline."""
+        elapsed = self._timed_wait(threading.Condition(), 0.05)
+        self.assertTrue(0.05 <= elapsed < 0.07)
+
+    def test_notified(self):
+        """A notification ends the wait at once, not at the next check of
+        a polling wait (up to 50 ms in Python 2)."""
+        condition = threading.Condition()
+        waiting = threading.Event()
+        woken = []
+
+        def wait():
+            """Wait 5 s at most, record the time of the wakeup."""
+            with condition:
+                waiting.set()
+                timing.timed_wait(condition, 5)
+                woken.append(timing.monotonic())
+
+        thread = threading.Thread(target=wait)
+        thread.start()
+        waiting.wait(5)
+        # The waiting thread releases the condition once in its wait
+        with condition:
+            notified = timing.monotonic()
+            condition.notify_all()
+        thread.join(5)
+
+        self.assertTrue(woken[0] - notified < 0.005)
+
+    def test_earlier_alarm(self):
+        """An alarm earlier than the next one wakes up the notifier."""
+        condition = threading.Condition()
+        alarm = timing._NOTIFIER.add(timing.monotonic() + 10, condition)
+        try:
+            self.assertTrue(self._timed_wait(threading.Condition(),
+                                             0.02) < 0.04)
+        finally:
+            timing._NOTIFIER.cancel(alarm)
+
+    def test_one_thread(self):
+        """Every timed wait shares the thread of the notifier."""
+        condition = threading.Condition()
+        self._timed_wait(condition, 0.001)
+        threads = set(threading.enumerate())
+
+        for _ in range(20):
+            self._timed_wait(condition, 0.001)
+        self.assertEqual(set(threading.enumerate()) - threads, set())
+
+
+if __name__ == "__main__":
+    unittest.main()
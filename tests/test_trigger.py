@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+@summary: Tests of log_writer.Trigger and log_writer.TriggeredCapture, with
+          synthetic rows (Time, A).
+"""
+
+import unittest
+
+import tests
+import log_writer
+
+
+def _capture(pre_time=1.5, post_time=1.0, hold_off=0.0, rearm=None):
+    """Return a TriggeredCapture of the rows (Time, A), triggered by
+    A > 1."""
+    trigger = log_writer.Trigger("High", "A", ">", 1.0, rearm)
+    return log_writer.TriggeredCapture(["Time", "A"], [trigger], pre_time,
+                                       post_time, hold_off)
+
+
+def _times(items):
+    """Return the times of the rows given by TriggeredCapture.add."""
+    return [row[0] for row in items]
+
+
+class TestTrigger(unittest.TestCase):
+
+    """Trigger : fires once, armed again below the rearm level."""
+
+    def test_rearm(self):
+        """The trigger fires when the condition becomes true."""
+        trigger = log_writer.Trigger("High", "A", ">", 1.0)
+
+        self.assertEqual([trigger.check(value)
+                          for value in (0.0, 2.0, 3.0, 0.5, 2.0)],
+                         [False, True, False, False, True])
+
+    def test_hysteresis(self):
+        """With a rearm level, the trigger fires again only after the value
+        went down to this level."""
+        trigger = log_writer.Trigger("High", "A", ">", 1.0, 0.5)
+
+        self.assertEqual([trigger.check(value)
+                          for value in (2.0, 0.8, 2.0, 0.5, 2.0)],
+                         [True, False, False, False, True])
+
+    def test_not_numbers(self):
+        """None and NaN are ignored."""
+        trigger = log_writer.Trigger("High", "A", ">", 1.0)
+
+        self.assertFalse(trigger.check(None))
+        self.assertFalse(trigger.check(float("nan")))
+        self.assertTrue(trigger.check(2))
+
+    def test_unknown_column(self):
+        """A trigger on a column which is not logged is refused."""
+        trigger = log_writer.Trigger("High", "B", ">", 1.0)
+        self.assertRaises(ValueError, log_writer.TriggeredCapture,
+                          ["Time", "A"], [trigger])
+
+
+class TestTriggeredCapture(unittest.TestCase):
+
+    """TriggeredCapture : rows of the pre and post windows of the events."""
+
+    def test_pre_and_post_windows(self):
+        """An event gives the rows of the last pre_time seconds, then the rows
+        until post_time seconds after it."""
+        capture = _capture()
+
+        for row_time in (0.0, 1.0, 2.0):
+            self.assertEqual(capture.add([row_time, 0.0]), [])
+
+        self.assertEqual(_times(capture.add([2.5, 2.0])), [1.0, 2.0, 2.5])
+        self.assertEqual(_times(capture.add([3.0, 0.0])), [3.0])
+        self.assertEqual(_times(capture.add([3.5, 0.0])), [3.5])
+        self.assertEqual(capture.add([4.0, 0.0]), [])
+        self.assertEqual(capture.events, [(2.5, ["High"])])
+        self.assertEqual(capture.written, 5)
+        self.assertEqual(capture.rows, 7)
+
+    def test_item(self):
+        """The item given with a row is returned instead of the row."""
+        capture = _capture()
+        capture.add([0.0, 0.0], "line 0")
+
+        self.assertEqual(capture.add([1.0, 2.0], "line 1"),
+                         ["line 0", "line 1"])
+
+    def test_rearm_gives_a_new_event(self):
+        """A trigger armed again gives a new event, with its own pre
+        window."""
+        capture = _capture(pre_time=10.0, post_time=0.5)
+        rows = [(0.0, 2.0), (0.5, 0.0), (1.0, 0.0), (2.0, 0.0), (2.5, 0.0),
+                (3.0, 2.0)]
+
+        written = []
+        for row in rows:
+            written.extend(_times(capture.add(list(row))))
+
+        self.assertEqual(written, [0.0, 0.5, 1.0, 2.0, 2.5, 3.0])
+        self.assertEqual([event_time for event_time, _ in capture.events],
+                         [0.0, 3.0])
+
+    def test_hold_off(self):
+        """Events less than hold_off seconds after the previous one are
+        ignored."""
+        capture = _capture(pre_time=10.0, post_time=0.0, hold_off=2.0)
+        rows = [(0.0, 2.0), (0.5, 0.0), (1.0, 2.0), (1.5, 0.0), (2.5, 2.0)]
+
+        written = []
+        for row in rows:
+            written.extend(_times(capture.add(list(row))))
+
+        self.assertEqual(written, [0.0, 0.5, 1.0, 1.5, 2.5])
+        self.assertEqual(capture.held_off, 1)
+        self.assertEqual(len(capture.events), 2)
+
+    def test_event_in_post_window(self):
+        """An event during the post window extends it, without giving the
+        pre window again."""
+        capture = _capture(pre_time=1.0, post_time=1.0)
+        capture.add([0.5, 0.0])
+
+        self.assertEqual(_times(capture.add([1.0, 2.0])), [0.5, 1.0])
+        self.assertEqual(_times(capture.add([1.5, 0.0])), [1.5])
+        self.assertEqual(_times(capture.add([1.8, 2.0])), [1.8])
+        for row_time in (2.0, 2.5, 2.8):
+            self.assertEqual(_times(capture.add([row_time, 0.0])),
+                             [row_time])
+        self.assertEqual(capture.add([3.0, 0.0]), [])
+        self.assertEqual([event_time for event_time, _ in capture.events],
+                         [1.0, 1.8])
+
+    def test_pre_window_boundary(self):
+        """The pre window keeps the rows up to pre_time seconds before the
+        event, the boundary included."""
+        capture = _capture(pre_time=1.0)
+        for index in range(6):
+            capture.add([index / 2.0, 0.0])
+
+        self.assertEqual(_times(capture.add([3.0, 2.0])), [2.0, 2.5, 3.0])
+
+        capture = _capture(pre_time=0.0)
+        for index in range(6):
+            capture.add([index / 2.0, 0.0])
+
+        self.assertEqual(_times(capture.add([3.0, 2.0])), [3.0])
+        self.assertEqual(capture.buffered, 0)
+
+    def test_hold_off_rearmed(self):
+        """A trigger firing during the hold off must be armed again before
+        giving an event."""
+        capture = _capture(pre_time=0.0, post_time=0.0, hold_off=2.0)
+        rows = [(0.0, 2.0), (0.5, 0.0), (1.0, 2.0), (1.5, 2.0), (2.0, 2.0),
+                (2.2, 0.0), (2.4, 2.0)]
+
+        written = []
+        for row in rows:
+            written.extend(_times(capture.add(list(row))))
+
+        self.assertEqual(written, [0.0, 2.4])
+        self.assertEqual(capture.held_off, 1)
+        self.assertEqual([event_time for event_time, _ in capture.events],
+                         [0.0, 2.4])
+
+    def test_negative_times(self):
+        """Trigger times must be positive."""
+        self.assertRaises(ValueError, _capture, -1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,229 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+@summary: Clocks and timed waits of multi_logger : the monotonic clock of the
+          scheduler, and timed waits on condition variables which do not
+          poll.
+
+          Condition.wait(timeout) of Python 2 polls : it sleeps up to 50 ms
+          between two checks, so a notification is seen up to 50 ms late. A
+          timed wait (see timed_wait) is an untimed Condition.wait instead,
+          and one long-lived thread (see Notifier) notifies the condition at
+          the deadline.
+
+@platform : Windows, Linux, OS X
+"""
+
+import os
+import sys
+import time
+import heapq
+import itertools
+import threading
+import multiprocessing
+
+
+def _monotonic_clock():
+    """
+        Return the best monotonic clock function available on this platform :
+        CLOCK_MONOTONIC on Linux, mach_absolute_time on OS X,
+        QueryPerformanceCounter on Windows. Elsewhere, time.time is used : it
+        is not monotonic, and a step of the system clock shifts the ticks.
+    """
+    if hasattr(time, "monotonic"):
+        return time.monotonic
+
+    if sys.platform.startswith("linux"):
+        try:
+            import ctypes
+            import ctypes.util
+
+            class Timespec(ctypes.Structure):
+                """struct timespec of clock_gettime"""
+                _fields_ = [("tv_sec", ctypes.c_long),
+                            ("tv_nsec", ctypes.c_long)]
+
+            librt = ctypes.CDLL(ctypes.util.find_library("rt") or
+                                ctypes.util.find_library("c"))
+            clock_gettime = librt.clock_gettime
+            clock_gettime.argtypes = [ctypes.c_int, ctypes.POINTER(Timespec)]
+            clock_monotonic = 1
+
+            def monotonic_linux():
+                """Read CLOCK_MONOTONIC, in seconds."""
+                timespec = Timespec()
+                clock_gettime(clock_monotonic, ctypes.byref(timespec))
+                return timespec.tv_sec + timespec.tv_nsec * 1e-9
+
+            return monotonic_linux
+        except (OSError, AttributeError):
+            pass
+
+    if sys.platform == "darwin":
+        try:
+            import ctypes
+            import ctypes.util
+
+            class TimebaseInfo(ctypes.Structure):
+                """struct mach_timebase_info"""
+                _fields_ = [("numer", ctypes.c_uint32),
+                            ("denom", ctypes.c_uint32)]
+
+            libc = ctypes.CDLL(ctypes.util.find_library("c"))
+            mach_absolute_time = libc.mach_absolute_time
+            mach_absolute_time.restype = ctypes.c_uint64
+            timebase = TimebaseInfo()
+            libc.mach_timebase_info(ctypes.byref(timebase))
+            seconds_per_tick = 1e-9 * timebase.numer / timebase.denom
+
+            def monotonic_darwin():
+                """Read mach_absolute_time, in seconds."""
+                return mach_absolute_time() * seconds_per_tick
+
+            return monotonic_darwin
+        except (OSError, AttributeError, ZeroDivisionError):
+            pass
+
+    if sys.platform == "win32":
+        # On Windows, time.clock is based on QueryPerformanceCounter
+        return time.clock
+
+    return time.time
+
+monotonic = _monotonic_clock()
+
+
+class _EventWakeup(object):
+
+    """Wakeup of the notifier thread when the semaphores of the operating
+    system are not available : threading.Event, whose timed wait polls."""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def sleep(self, timeout=None):
+        """Wait until interrupt is called, at most timeout seconds."""
+        self._event.wait(timeout)
+        self._event.clear()
+
+    def interrupt(self):
+        """Wake up the thread sleeping."""
+        self._event.set()
+
+
+class _SemaphoreWakeup(object):
+
+    """Wakeup of the notifier thread : a semaphore of the operating system,
+    whose timed acquire does not poll (except on OS X, which has no
+    sem_timedwait)."""
+
+    def __init__(self):
+        self._semaphore = multiprocessing.Semaphore(0)
+
+    def sleep(self, timeout=None):
+        """Wait until interrupt is called, at most timeout seconds."""
+        if timeout is None:
+            self._semaphore.acquire()
+        else:
+            self._semaphore.acquire(True, timeout)
+
+    def interrupt(self):
+        """Wake up the thread sleeping."""
+        self._semaphore.release()
+
+
+class Notifier(object):
+
+    """
+        Notify condition variables at given times, from one long-lived
+        thread, started at the first alarm (and again in a forked process).
+        The thread sleeps until the next alarm, and is woken up when an
+        earlier alarm is added.
+    """
+
+    def __init__(self, clock=monotonic):
+        """
+            - clock (optional) : Clock of the deadlines
+        """
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._numbers = itertools.count()
+        self._alarms = []
+        self._wakeup = None
+        self._pid = None
+
+    def _start(self):
+        """Start the thread (with the lock acquired)."""
+        try:
+            self._wakeup = _SemaphoreWakeup()
+        except (OSError, ImportError):
+            self._wakeup = _EventWakeup()
+
+        self._alarms = []
+        self._pid = os.getpid()
+
+        thread = threading.Thread(target=self._run)
+        thread.daemon = True
+        thread.start()
+
+    def add(self, deadline, condition):
+        """Notify every thread waiting on condition at deadline (a time of
+        clock). Return the alarm, to give to cancel."""
+        alarm = [deadline, next(self._numbers), condition]
+
+        with self._lock:
+            if self._pid != os.getpid():
+                self._start()
+
+            heapq.heappush(self._alarms, alarm)
+            if self._alarms[0] is alarm:
+                self._wakeup.interrupt()
+
+        return alarm
+
+    def cancel(self, alarm):
+        """Forget an alarm which is not needed anymore."""
+        alarm[2] = None
+
+    def _run(self):
+        """Notify the conditions of the alarms at their deadline."""
+        alarms = self._alarms
+        wakeup = self._wakeup
+
+        while True:
+            due = []
+            with self._lock:
+                now = self.clock()
+                while alarms and (alarms[0][0] <= now or
+                                  alarms[0][2] is None):
+                    condition = heapq.heappop(alarms)[2]
+                    if condition is not None:
+                        due.append(condition)
+
+                timeout = None
+                if alarms:
+                    timeout = alarms[0][0] - now
+
+            for condition in due:
+                with condition:
+                    condition.notify_all()
+
+            if not due:
+                wakeup.sleep(timeout)
+
+
+_NOTIFIER = Notifier()
+
+
+def timed_wait(condition, timeout):
+    """
+        Wait on condition (already acquired) until it is notified, at most
+        timeout seconds, without polling. As with Condition.wait, the caller
+        checks again what it is waiting for.
+    """
+    alarm = _NOTIFIER.add(_NOTIFIER.clock() + timeout, condition)
+    try:
+        condition.wait()
+    finally:
+        _NOTIFIER.cancel(alarm)